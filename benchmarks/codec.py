@@ -0,0 +1,69 @@
+"""Cost of the JSON codecs and of the response writes for typical responses.
+
+Usage: python -m benchmarks.codec [--number 20000] [--ids 100]
+"""
+
+import socket
+import threading
+from argparse import ArgumentParser
+
+from benchmarks.common import timeit, user_request
+from src.codec import CODECS, codec as current_codec
+
+INTERESTS = ["cars", "pets", "travel", "hi-tech", "sport", "music", "books", "tv", "cinema", "geek", "otus"]
+
+
+def drain(sock: socket.socket) -> None:
+    while sock.recv(65536):
+        pass
+
+
+def bench_writes(body: bytes, number: int) -> tuple[float, float]:
+    """The previous handler wrote the status line with the headers and the body separately."""
+
+    head = b"HTTP/1.1 200 OK\r\nServer: x\r\nDate: x\r\nContent-Type: application/json\r\nContent-Length: %d\r\n\r\n"
+    head %= len(body)
+    writer, reader = socket.socketpair()
+    thread = threading.Thread(target=drain, args=(reader,), daemon=True)
+    thread.start()
+
+    def two_writes():
+        writer.sendall(head)
+        writer.sendall(body)
+
+    two = timeit(two_writes, number)
+    one = timeit(lambda: writer.sendall(head + body), number)
+    writer.close()
+    thread.join()
+    reader.close()
+    return two, one
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("--number", type=int, default=20000)
+    parser.add_argument("--ids", type=int, default=100)
+    args = parser.parse_args()
+
+    score_request = user_request("online_score", {"phone": "79175002040", "email": "stupnikov@otus.ru"})
+    interests_request = user_request("clients_interests", {"client_ids": list(range(args.ids))})
+    cases = {
+        "online_score": (score_request, {"response": {"score": 3.0}, "code": 200}),
+        "clients_interests": (interests_request, {"response": {str(i): INTERESTS[i % 8:i % 8 + 3]
+                                                               for i in range(args.ids)}, "code": 200}),
+    }
+
+    print("%-18s %-8s %12s %12s" % ("response", "codec", "loads, us", "dumps, us"))
+    for case, (request, response) in cases.items():
+        encoded = CODECS["json"].dumps(request)
+        for name, codec in CODECS.items():
+            print("%-18s %-8s %12.2f %12.2f" % (
+                case, name, timeit(lambda: codec.loads(encoded), args.number) * 1e6,
+                timeit(lambda: codec.dumps(response), args.number) * 1e6,
+            ))
+
+    print("\n%-18s %14s %14s" % ("response", "2 writes, us", "1 write, us"))
+    for case, (_, response) in cases.items():
+        two, one = bench_writes(CODECS["json"].dumps(response), args.number)
+        print("%-18s %14.2f %14.2f" % (case, two * 1e6, one * 1e6))
+    print("\ncodec in use: %s" % current_codec.name)
@@ -0,0 +1,149 @@
+"""Shared helpers for the benchmarks."""
+
+import hashlib
+import json
+import statistics
+import threading
+import time
+from http.server import HTTPServer
+from typing import Any, Callable
+
+from src.api import MainHTTPHandler
+from src.constants import SALT
+from src.store import StorageManager
+
+
+class MemoryStorageManager(StorageManager):
+    """In-memory storage with an artificial round-trip latency."""
+
+    client = {}
+    latency = 0.0
+
+    @classmethod
+    def wait(cls) -> None:
+        if cls.latency:
+            time.sleep(cls.latency)
+
+    @classmethod
+    def get_cache(cls, key: str, local: bool = True) -> Any:
+        cls.wait()
+        return cls.client.get(key)
+
+    @classmethod
+    def set_cache(cls, key: str, value: Any, ttl: int | None = None) -> None:
+        cls.wait()
+        cls.client[key] = value
+
+    @classmethod
+    def get_many_cache(cls, keys: list[str]) -> list:
+        cls.wait()
+        return [cls.client.get(key) for key in keys]
+
+    @classmethod
+    def set_many_cache(cls, data: dict[str, Any], ttl: int | None = None) -> None:
+        cls.wait()
+        cls.client.update(data)
+
+    @classmethod
+    def set_list_data(cls, key: str, values: list) -> None:
+        cls.client[key] = values
+
+    @classmethod
+    def replace_many_list_data(cls, data: dict[str, list]) -> None:
+        cls.client.update(data)
+
+    @classmethod
+    def get_all_list_data(cls, key: str) -> list:
+        cls.wait()
+        return cls.client.get(key, [])
+
+    @classmethod
+    def get_many_list_data(cls, keys: list[str]) -> list[list]:
+        cls.wait()
+        return [cls.client.get(key, []) for key in keys]
+
+
+def make_handler(store: type[StorageManager]) -> type[MainHTTPHandler]:
+    """The method creates a quiet handler working with the given storage."""
+
+    return type("BenchHandler", (MainHTTPHandler,), {"store": store, "log_message": lambda *args: None})
+
+
+def run_server(server: HTTPServer) -> threading.Thread:
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return thread
+
+
+def user_request(method: str, arguments: dict, account: str = "horns&hoofs", login: str = "h&f") -> dict:
+    """The method builds a request with a valid token."""
+
+    token = hashlib.sha512((account + login + SALT).encode('utf-8')).hexdigest()
+    return {"account": account, "login": login, "method": method, "token": token, "arguments": arguments}
+
+
+def percentile(values: list[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def timeit(func: Callable, number: int) -> float:
+    """The method returns the mean time of one call in seconds."""
+
+    start = time.perf_counter()
+    for _ in range(number):
+        func()
+    return (time.perf_counter() - start) / number
+
+
+def summary(latencies: list[float], elapsed: float) -> dict[str, float]:
+    return {
+        "rps": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 0.5) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "mean_ms": statistics.fmean(latencies) * 1000,
+    }
+
+
+def report(name: str, latencies: list[float], elapsed: float) -> dict[str, float]:
+    result = summary(latencies, elapsed)
+    print("%-28s %8.0f req/s  p50 %7.2f ms  p95 %7.2f ms  p99 %7.2f ms  mean %7.2f ms" % (
+        name, result["rps"], result["p50_ms"], result["p95_ms"], result["p99_ms"], result["mean_ms"],
+    ))
+    return result
+
+
+def save_baseline(path: str, results: dict[str, dict], options: dict) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"options": options, "results": results}, f, indent=2, sort_keys=True)
+    print("Baseline saved to %s" % path)
+
+
+def compare_baseline(path: str, results: dict[str, dict], options: dict, threshold: float) -> list[str]:
+    """The method prints the changes against the saved results and returns the regressed ones.
+
+    `rps` is better when higher, the other metrics are times and are better when lower.
+    A change within `threshold` (0.1 - 10%) is noise.
+    """
+
+    with open(path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline.get("options") != options:
+        print("Warning: the baseline was taken with other options: %s" % baseline.get("options"))
+
+    regressions = []
+    print("\n%-36s %12s %12s %8s" % ("metric", "baseline", "current", "change"))
+    for name, metrics in results.items():
+        for metric, value in metrics.items():
+            old = baseline["results"].get(name, {}).get(metric)
+            if not old:
+                continue
+            change = (value - old) / old
+            worse = -change if metric == "rps" else change
+            flag = ""
+            if worse > threshold:
+                flag = "  REGRESSION"
+                regressions.append("%s %s" % (name, metric))
+            print("%-36s %12.3f %12.3f %+7.1f%%%s" % ("%s %s" % (name, metric), old, value, change * 100, flag))
+    return regressions
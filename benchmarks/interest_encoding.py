@@ -0,0 +1,57 @@
+"""Memory use and fetch latency of the plain and the encoded interest lists, needs a running Redis.
+
+Usage: python -m benchmarks.interest_encoding [--clients 100000] [--sizes 10 100 1000] [--repeat 20]
+"""
+
+import random
+from argparse import ArgumentParser
+
+from benchmarks.common import timeit
+from benchmarks.interests import INTERESTS
+from src.interests import InterestDictionary
+from src.store import StorageManager
+
+
+def memory_usage(keys: list[str]) -> int:
+    pipe = StorageManager.client.pipeline(transaction=False)
+    for key in keys:
+        pipe.memory_usage(key, samples=0)
+    return sum(size or 0 for size in pipe.execute())
+
+
+def fill(prefix: str, lists: list[list[str]]) -> list[str]:
+    keys = ["%s:%s" % (prefix, i) for i in range(len(lists))]
+    for key, values in zip(keys, lists):
+        StorageManager.set_list_data(key, values)
+    return keys
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("--clients", type=int, default=100000)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    lists = [random.sample(INTERESTS, random.randint(1, 4)) for _ in range(args.clients)]
+    dictionary = InterestDictionary("bench:interests:dict")
+    plain_keys = fill("bench:plain", lists)
+    StorageManager.interests = dictionary
+    encoded_keys = fill("bench:encoded", lists)
+    try:
+        plain, encoded = memory_usage(plain_keys), memory_usage(encoded_keys)
+        print("memory, bytes per client: plain %.1f, encoded %.1f (%.1fx less)"
+              % (plain / args.clients, encoded / args.clients, plain / encoded))
+
+        print("%8s %12s %14s %8s" % ("ids", "plain, ms", "encoded, ms", "speedup"))
+        for size in args.sizes:
+            StorageManager.interests = None
+            old = timeit(lambda: StorageManager.get_many_list_data(plain_keys[:size]), args.repeat)
+            StorageManager.interests = dictionary
+            new = timeit(lambda: StorageManager.get_many_list_data(encoded_keys[:size]), args.repeat)
+            print("%8d %12.2f %14.2f %7.1fx" % (size, old * 1000, new * 1000, old / new))
+    finally:
+        StorageManager.interests = None
+        for i in range(0, args.clients, 10000):
+            StorageManager.del_many_data(*plain_keys[i:i + 10000], *encoded_keys[i:i + 10000])
+        StorageManager.del_many_data(dictionary.key)
@@ -0,0 +1,37 @@
+"""Latency of the interests lookup versus the number of client ids, needs a running Redis.
+
+Usage: python -m benchmarks.interests [--sizes 1 10 100 500 1000] [--repeat 20]
+"""
+
+from argparse import ArgumentParser
+
+from benchmarks.common import timeit
+from src.store import StorageManager
+
+INTERESTS = ["cars", "pets", "travel", "hi-tech", "sport", "music", "books", "tv", "cinema", "geek", "otus"]
+
+
+def per_key(keys: list[str]) -> list[list]:
+    """The previous implementation: llen and lrange for every client."""
+
+    client = StorageManager.client
+    return [client.lrange(key, 0, client.llen(key)) for key in keys]
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 100, 500, 1000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    keys = ["bench:interests:%s" % i for i in range(max(args.sizes))]
+    for key in keys:
+        StorageManager.set_list_data(key, INTERESTS[:3])
+    try:
+        print("%8s %14s %14s %8s" % ("ids", "per key, ms", "pipeline, ms", "speedup"))
+        for size in args.sizes:
+            old = timeit(lambda: per_key(keys[:size]), args.repeat)
+            new = timeit(lambda: StorageManager.get_many_list_data(keys[:size]), args.repeat)
+            print("%8d %14.2f %14.2f %7.1fx" % (size, old * 1000, new * 1000, old / new))
+    finally:
+        StorageManager.del_many_data(*keys)
@@ -0,0 +1,52 @@
+"""Throughput of a new connection per request versus persistent HTTP/1.1 connections.
+
+Usage: python -m benchmarks.keepalive [--threads 16] [--clients 16] [--requests 5000] [--latency 0]
+"""
+
+import json
+import threading
+import time
+from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
+from http import client
+
+from benchmarks.common import MemoryStorageManager, make_handler, run_server, user_request, report
+from src.server import make_server
+
+
+def load(port: int, clients: int, requests: int, keep_alive: bool) -> tuple[list[float], float]:
+    body = json.dumps(user_request("online_score", {"phone": "79175002040", "email": "stupnikov@otus.ru"}))
+    local = threading.local()
+
+    def call(_):
+        start = time.perf_counter()
+        if not keep_alive or not hasattr(local, "conn"):
+            local.conn = client.HTTPConnection("localhost", port)
+        local.conn.request("POST", "/online_score", body=body)
+        local.conn.getresponse().read()
+        if not keep_alive:
+            local.conn.close()
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(clients) as executor:
+        latencies = list(executor.map(call, range(requests)))
+    return latencies, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--latency", type=float, default=0.0, help="simulated storage round-trip, seconds")
+    args = parser.parse_args()
+    MemoryStorageManager.latency = args.latency
+
+    server = make_server(("localhost", 0), make_handler(MemoryStorageManager), threads=args.threads)
+    run_server(server)
+    for name, keep_alive in (("connection per request", False), ("keep-alive", True)):
+        latencies, elapsed = load(server.server_address[1], args.clients, args.requests, keep_alive)
+        report(name, latencies, elapsed)
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,218 @@
+"""Load test of the API with a reproducible mix of online_score and clients_interests requests.
+
+The requests are synthesized from a seed, or replayed from a JSONL file with one API request per line,
+the synthesized ones can be written to such a file with `--record`. A closed loop keeps `--clients`
+requests in flight, an open loop (`--rate`) sends the requests at Poisson arrival times and counts
+the latency from the planned time, so a slow server is not hidden by the clients waiting for it.
+
+A synthesized online_score request is a cache hit with the probability `--hit-ratio`: it repeats one
+of the `--hot` users requested before the run, otherwise it is a new user. The number of client ids
+of a clients_interests request is taken from the `--ids` sizes with their weights.
+
+With `--redis` the server works with the Redis at host:port. The synthesized interests are stored
+under the ids from 900000000, they and the cached scores are deleted after the run.
+
+Usage: python -m benchmarks.load [--requests 20000] [--clients 16] [--rate 2000] [--threads 16] [--seed 0]
+    [--mix online_score:0.8,clients_interests:0.2] [--hit-ratio 0.9] [--hot 1000] [--ids 1:0.5,10:0.4,100:0.1]
+    [--replay FILE | --record FILE] [--redis localhost:6379] [--save FILE | --compare FILE [--threshold 0.1]]
+"""
+
+import itertools
+import json
+import random
+import sys
+import threading
+import time
+from argparse import ArgumentParser
+from http import client
+
+from benchmarks.common import (
+    MemoryStorageManager, make_handler, run_server, user_request, report, save_baseline, compare_baseline,
+)
+from src.schemas import OnlineScoreRequest
+from src.scoring import get_score_key
+from src.server import make_server
+from src.sharding import parse_node
+from src.store import StorageManager
+
+INTERESTS = ["cars", "pets", "travel", "hi-tech", "sport", "music", "books", "tv", "cinema", "geek", "otus"]
+FIRST_ID = 900000000
+
+
+def parse_weights(value: str) -> dict[str, float]:
+    """The method parses "name:weight,name:weight", a name without a weight weighs 1."""
+
+    weights = {}
+    for item in value.split(","):
+        name, _, weight = item.partition(":")
+        weights[name.strip()] = float(weight or 1)
+    return weights
+
+
+def make_user(rng: random.Random, number: int) -> dict:
+    arguments = {"phone": "7%010d" % number, "email": "user%s@otus.ru" % number}
+    if rng.random() < 0.5:
+        arguments.update(first_name="first%s" % number, last_name="last%s" % number, gender=rng.choice([0, 1, 2]),
+                         birthday="%02d.%02d.%d" % (rng.randint(1, 28), rng.randint(1, 12), rng.randint(1960, 2005)))
+    return arguments
+
+
+def synthesize(
+        count: int, mix: dict[str, float], hit_ratio: float, hot: int, sizes: dict[str, float], rng: random.Random,
+) -> tuple[list[dict], list[dict], dict[str, list]]:
+    """The method returns the requests, the requests warming the cache and the interests to store."""
+
+    hot_users = [make_user(rng, i) for i in range(hot)]
+    size_values = [int(size) for size in sizes]
+    pool = max(size_values) * 10
+    interests = {str(FIRST_ID + i): rng.sample(INTERESTS, rng.randint(1, 4)) for i in range(pool)}
+
+    methods = rng.choices(list(mix), list(mix.values()), k=count)
+    requests = []
+    for n, method in enumerate(methods):
+        if method == "online_score":
+            hit = hot_users and rng.random() < hit_ratio
+            arguments = rng.choice(hot_users) if hit else make_user(rng, hot + n)
+        else:
+            size = rng.choices(size_values, list(sizes.values()))[0]
+            arguments = {"client_ids": rng.sample(range(FIRST_ID, FIRST_ID + pool), size), "date": "20.07.2017"}
+        requests.append(user_request(method, arguments))
+    return requests, [user_request("online_score", arguments) for arguments in hot_users], interests
+
+
+def read_requests(path: str) -> list[dict]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def write_requests(path: str, requests: list[dict]) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        f.writelines(json.dumps(request) + "\n" for request in requests)
+
+
+def score_keys(requests: list[dict]) -> set[str]:
+    return {
+        get_score_key(OnlineScoreRequest.from_dict(request["arguments"]))
+        for request in requests if request.get("method") == "online_score"
+    }
+
+
+def run(
+        port: int, requests: list[dict], clients: int, rate: float | None = None, seed: int = 0,
+) -> tuple[list[float], list[bool], float]:
+    """The method sends the requests over `clients` persistent connections.
+
+    Returns the latency of every request, whether it failed and the time of the whole run.
+    """
+
+    bodies = [("/%s" % request.get("method", ""), json.dumps(request)) for request in requests]
+    planned = None
+    if rate:
+        rng = random.Random(seed)
+        planned = list(itertools.accumulate(rng.expovariate(rate) for _ in bodies))
+    latencies = [0.0] * len(bodies)
+    failed = [False] * len(bodies)
+    indexes = itertools.count()
+    start = time.perf_counter()
+
+    def worker() -> None:
+        conn = client.HTTPConnection("localhost", port)
+        while (i := next(indexes)) < len(bodies):
+            begin = time.perf_counter()
+            if planned is not None:
+                begin = start + planned[i]
+                if (delay := begin - time.perf_counter()) > 0:
+                    time.sleep(delay)
+            path, body = bodies[i]
+            try:
+                conn.request("POST", path, body=body)
+                response = conn.getresponse()
+                response.read()
+                failed[i] = response.status != 200
+            except (OSError, client.HTTPException):
+                failed[i] = True
+                conn.close()
+            latencies[i] = time.perf_counter() - begin
+        conn.close()
+
+    threads = [threading.Thread(target=worker) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, failed, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--clients", type=int, default=16, help="connections, the requests in flight of a closed loop")
+    parser.add_argument("--rate", type=float, default=None, help="requests per second of an open loop")
+    parser.add_argument("--threads", type=int, default=16, help="threads of the server")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--mix", default="online_score:0.8,clients_interests:0.2")
+    parser.add_argument("--hit-ratio", type=float, default=0.9)
+    parser.add_argument("--hot", type=int, default=1000, help="users repeated by the cache hits")
+    parser.add_argument("--ids", default="1:0.5,10:0.4,100:0.1", help="client_ids sizes with their weights")
+    parser.add_argument("--replay", help="JSONL file of the requests to send")
+    parser.add_argument("--record", help="JSONL file to write the synthesized requests to")
+    parser.add_argument("--redis", help="host:port of the Redis, the in-memory store if not given")
+    parser.add_argument("--latency", type=float, default=0.0, help="simulated round-trip of the in-memory store")
+    parser.add_argument("--save", help="JSON file to save the results to as the baseline")
+    parser.add_argument("--compare", help="JSON file of the baseline to compare the results with")
+    parser.add_argument("--threshold", type=float, default=0.1, help="change counted as a regression")
+    args = parser.parse_args()
+
+    if args.replay:
+        requests, warmup, interests = read_requests(args.replay), [], {}
+        if not args.redis:
+            ids = {
+                client_id for request in requests if request.get("method") == "clients_interests"
+                for client_id in (request.get("arguments") or {}).get("client_ids") or []
+            }
+            interests = {str(client_id): INTERESTS[:3] for client_id in ids}
+    else:
+        requests, warmup, interests = synthesize(
+            args.requests, parse_weights(args.mix), args.hit_ratio, args.hot, parse_weights(args.ids),
+            random.Random(args.seed),
+        )
+    if args.record:
+        write_requests(args.record, requests)
+
+    if args.redis:
+        store = StorageManager
+        store.connect(*parse_node(args.redis))
+    else:
+        store = MemoryStorageManager
+        store.latency = args.latency
+    if interests:
+        store.replace_many_list_data(interests)
+
+    server = make_server(("localhost", 0), make_handler(store), threads=args.threads)
+    run_server(server)
+    port = server.server_address[1]
+    try:
+        run(port, warmup, args.clients)
+        latencies, failed, elapsed = run(port, requests, args.clients, args.rate, args.seed)
+    finally:
+        server.shutdown()
+        server.server_close()
+        if args.redis and not args.replay:
+            store.del_many_data(*interests, *score_keys(warmup + requests))
+
+    loop = "open loop %.0f req/s" % args.rate if args.rate else "closed loop %s clients" % args.clients
+    print("%s requests, %s, %s failed" % (len(requests), loop, sum(failed)))
+    results = {"all": report("all", latencies, elapsed)}
+    for method in sorted({request.get("method", "") for request in requests}):
+        method_latencies = [latency for latency, request in zip(latencies, requests) if request.get("method") == method]
+        # the throughput of a method is its share of the requests of the whole run
+        results[method] = report(method, method_latencies, elapsed)
+
+    options = {
+        name: value for name, value in vars(args).items()
+        if name not in ("record", "save", "compare", "threshold")
+    }
+    if args.save:
+        save_baseline(args.save, results, options)
+    if args.compare and compare_baseline(args.compare, results, options, args.threshold):
+        sys.exit(1)
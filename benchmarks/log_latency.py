@@ -0,0 +1,53 @@
+"""Request latency with the synchronous file logging versus the queue handler with sampling.
+
+Usage: python -m benchmarks.log_latency [--threads 16] [--clients 16] [--requests 5000] [--sample-rate 0.1]
+"""
+
+import logging
+import os
+import tempfile
+from argparse import ArgumentParser
+
+from benchmarks.common import MemoryStorageManager, make_handler, run_server, report
+from benchmarks.keepalive import load
+from src.log import TEXT_FORMAT, DATE_FORMAT, setup_logging, stop_logging
+from src.server import make_server
+
+
+def sync_logging(filename: str) -> None:
+    """The previous setup: the request thread formats and writes every record."""
+
+    stop_logging()
+    for handler in logging.getLogger().handlers:
+        handler.close()
+    logging.getLogger().handlers = []
+    logging.basicConfig(filename=filename, level=logging.INFO, format=TEXT_FORMAT, datefmt=DATE_FORMAT, force=True)
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--sample-rate", type=float, default=0.1)
+    args = parser.parse_args()
+
+    server = make_server(("localhost", 0), make_handler(MemoryStorageManager), threads=args.threads)
+    run_server(server)
+    filename = os.path.join(tempfile.mkdtemp(), "requests.log")
+    setups = (
+        ("synchronous text", lambda: sync_logging(filename)),
+        ("queue, text", lambda: setup_logging(filename)),
+        ("queue, json", lambda: setup_logging(filename, structured=True)),
+        ("queue, json, sampled", lambda: setup_logging(filename, structured=True, sample_rate=args.sample_rate)),
+    )
+    for name, setup in setups:
+        setup()
+        load(server.server_address[1], args.clients, args.requests // 10, True)
+        latencies, elapsed = load(server.server_address[1], args.clients, args.requests, True)
+        stop_logging()
+        report(name, latencies, elapsed)
+    server.shutdown()
+    server.server_close()
+    os.remove(filename)
+    os.rmdir(os.path.dirname(filename))
@@ -0,0 +1,42 @@
+"""Cost of recording the metrics of one request and of rendering GET /metrics.
+
+Usage: python -m benchmarks.metrics [--number 200000]
+"""
+
+import time
+from argparse import ArgumentParser
+
+from benchmarks.common import timeit
+from src.api import APIHandlerMixin, api_latency, api_requests
+from src.metrics import registry
+from src.scoring import score_cache
+from src.store import redis_latency
+
+
+def record_online_score() -> None:
+    """What an online_score request records: the request, one cache lookup and its two Redis round-trips."""
+
+    start = time.perf_counter()
+    redis_latency.observe(time.perf_counter() - start, "PIPELINE")
+    score_cache.inc("miss")
+    redis_latency.observe(time.perf_counter() - start, "SET")
+    APIHandlerMixin.record_request("online_score", {"code": 200}, start)
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("--number", type=int, default=200000)
+    args = parser.parse_args()
+
+    cases = {
+        "time.perf_counter": time.perf_counter,
+        "counter.inc": lambda: api_requests.inc("online_score", "200"),
+        "histogram.observe": lambda: api_latency.observe(0.003, "online_score"),
+        "record_request": lambda: APIHandlerMixin.record_request("online_score", {"code": 200}, 0.0),
+        "online_score request": record_online_score,
+    }
+    print("%-24s %10s" % ("operation", "us"))
+    for name, func in cases.items():
+        # the best of several rounds, the noise of a shared machine only adds time
+        print("%-24s %10.3f" % (name, min(timeit(func, args.number) for _ in range(5)) * 1e6))
+    print("%-24s %10.3f" % ("render", timeit(registry.render, 1000) * 1e6))
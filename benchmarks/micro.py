@@ -0,0 +1,99 @@
+"""Time of one call of the functions on the request path.
+
+get_score and get_interests work with the in-memory store, or with the Redis at `--redis` host:port.
+The best time of `--rounds` is taken, the results can be saved as the baseline and compared with it
+like the ones of `benchmarks.load`.
+
+Usage: python -m benchmarks.micro [--number 20000] [--rounds 5] [--redis localhost:6379]
+    [--save FILE | --compare FILE [--threshold 0.1]]
+"""
+
+import sys
+from argparse import ArgumentParser
+
+from benchmarks.common import MemoryStorageManager, timeit, user_request, save_baseline, compare_baseline
+from benchmarks.load import INTERESTS, FIRST_ID
+from src.schemas import OnlineScoreRequest, ClientsInterestsRequest, MethodRequest
+from src.scoring import get_score, get_interests, get_score_key
+from src.sharding import parse_node
+from src.store import StorageManager
+from src.utils import check_auth, generate_uid
+
+ONLINE_SCORE = user_request("online_score", {
+    "phone": "79175002040", "email": "stupnikov@otus.ru", "first_name": "a", "last_name": "b",
+    "birthday": "01.01.2000", "gender": 1,
+})
+SIZES = (1, 10, 100)
+
+
+def validate(request: dict, schema) -> None:
+    MethodRequest.from_dict(request)
+    schema.from_dict(request["arguments"])
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("--number", type=int, default=20000)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--redis", help="host:port of the Redis, the in-memory store if not given")
+    parser.add_argument("--save", help="JSON file to save the results to as the baseline")
+    parser.add_argument("--compare", help="JSON file of the baseline to compare the results with")
+    parser.add_argument("--threshold", type=float, default=0.1, help="change counted as a regression")
+    args = parser.parse_args()
+
+    if args.redis:
+        store = StorageManager
+        store.connect(*parse_node(args.redis))
+    else:
+        store = MemoryStorageManager
+
+    auth = MethodRequest.from_dict(ONLINE_SCORE)
+    wrong_token = MethodRequest.from_dict(dict(ONLINE_SCORE, token="0" * 128))
+    score = OnlineScoreRequest.from_dict(ONLINE_SCORE["arguments"])
+    # every miss is a new user, so nothing is read from the cache
+    misses = [
+        OnlineScoreRequest.from_dict({"phone": "7%010d" % i, "email": "user%s@otus.ru" % i})
+        for i in range(args.number * args.rounds)
+    ]
+    interests = {str(FIRST_ID + i): INTERESTS[:3] for i in range(max(SIZES))}
+    store.replace_many_list_data(interests)
+    by_size = {
+        size: ClientsInterestsRequest.from_dict({"client_ids": list(range(FIRST_ID, FIRST_ID + size))})
+        for size in SIZES
+    }
+    interests_requests = {
+        size: user_request("clients_interests", {"client_ids": list(range(size)), "date": "20.07.2017"})
+        for size in SIZES
+    }
+
+    benchmarks = {
+        "check_auth": lambda: check_auth(auth),
+        "check_auth wrong token": lambda: check_auth(wrong_token),
+        "validation online_score": lambda: validate(ONLINE_SCORE, OnlineScoreRequest),
+        "generate_uid": lambda: generate_uid(["a", "b", "79175002040", "20000101"]),
+        "get_score hit": lambda: get_score(store, score, "h&f"),
+        "get_score miss": lambda request=iter(misses): get_score(store, next(request), "h&f"),
+    }
+    for size in SIZES:
+        benchmarks["validation clients_interests %s" % size] = (
+            lambda request=interests_requests[size]: validate(request, ClientsInterestsRequest)
+        )
+        benchmarks["get_interests %s" % size] = lambda request=by_size[size]: get_interests(store, request, "h&f")
+
+    results = {}
+    try:
+        get_score(store, score, "h&f")
+        print("%-36s %12s" % ("function", "us per call"))
+        for name, func in benchmarks.items():
+            seconds = min(timeit(func, args.number) for _ in range(args.rounds))
+            results[name] = {"us": seconds * 1e6}
+            print("%-36s %12.2f" % (name, seconds * 1e6))
+    finally:
+        if args.redis:
+            store.del_many_data(*interests, get_score_key(score), *(get_score_key(request) for request in misses))
+
+    options = {"number": args.number, "rounds": args.rounds, "redis": args.redis}
+    if args.save:
+        save_baseline(args.save, results, options)
+    if args.compare and compare_baseline(args.compare, results, options, args.threshold):
+        sys.exit(1)
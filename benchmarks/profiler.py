@@ -0,0 +1,47 @@
+"""Throughput of the threaded server with and without the sampling profiler running.
+
+Usage: python -m benchmarks.profiler [--threads 16] [--clients 16] [--requests 5000] [--interval 0.01] [--rounds 3]
+"""
+
+import os
+import tempfile
+from argparse import ArgumentParser
+
+from benchmarks.common import MemoryStorageManager, make_handler, run_server, report, timeit
+from benchmarks.keepalive import load
+from src.profiler import Profiler, Sampler
+from src.server import make_server
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--interval", type=float, default=0.01)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    server = make_server(("localhost", 0), make_handler(MemoryStorageManager), threads=args.threads)
+    run_server(server)
+    port = server.server_address[1]
+    load(port, args.clients, args.requests // 10, True)
+
+    directory = tempfile.mkdtemp()
+    profiler = Profiler(args.interval, directory)
+    # the rounds alternate, so that a drift of the machine speed hits both cases
+    for _ in range(args.rounds):
+        for running in (False, True):
+            if running:
+                profiler.start(3600)
+            latencies, elapsed = load(port, args.clients, args.requests, True)
+            profiler.stop()
+            report("profiler running" if running else "no profiler", latencies, elapsed)
+
+    sample = timeit(Sampler().sample, 1000)
+    print("\none sample of %d threads: %.1f us, %.2f%% of the time at %s s interval"
+          % (args.threads + 1, sample * 1e6, sample / args.interval * 100, args.interval))
+    server.shutdown()
+    server.server_close()
+    for name in os.listdir(directory):
+        os.remove(os.path.join(directory, name))
+    os.rmdir(directory)
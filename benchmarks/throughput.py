@@ -0,0 +1,48 @@
+"""Throughput of the serial server versus the thread pool server.
+
+Usage: python -m benchmarks.throughput [--threads 16] [--clients 32] [--requests 2000] [--latency 0.002]
+"""
+
+import json
+import time
+from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
+from http import client
+
+from benchmarks.common import MemoryStorageManager, make_handler, run_server, user_request, report
+from src.server import make_server
+
+
+def load(port: int, clients: int, requests: int) -> tuple[list[float], float]:
+    body = json.dumps(user_request("online_score", {"phone": "79175002040", "email": "stupnikov@otus.ru"}))
+
+    def call(_):
+        start = time.perf_counter()
+        conn = client.HTTPConnection("localhost", port)
+        conn.request("POST", "/online_score", body=body)
+        conn.getresponse().read()
+        conn.close()
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(clients) as executor:
+        latencies = list(executor.map(call, range(requests)))
+    return latencies, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--latency", type=float, default=0.002, help="simulated storage round-trip, seconds")
+    args = parser.parse_args()
+    MemoryStorageManager.latency = args.latency
+
+    for name, threads in (("serial", 0), ("threads=%s" % args.threads, args.threads)):
+        server = make_server(("localhost", 0), make_handler(MemoryStorageManager), threads=threads)
+        run_server(server)
+        latencies, elapsed = load(server.server_address[1], args.clients, args.requests)
+        server.shutdown()
+        server.server_close()
+        report(name, latencies, elapsed)
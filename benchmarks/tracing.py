@@ -0,0 +1,53 @@
+"""Cost of the tracing of one request with tracing off and on.
+
+Usage: python -m benchmarks.tracing [--number 100000]
+"""
+
+import time
+from argparse import ArgumentParser
+
+from benchmarks.common import timeit
+from src.tracing import CLIENT, tracer
+
+
+def untraced_request() -> None:
+    """The timing the request does anyway: the request and the Redis round-trips are timed for the metrics."""
+
+    time.perf_counter()
+    for _ in ("PIPELINE", "SET"):
+        time.perf_counter()
+        time.perf_counter()
+
+
+def traced_request() -> None:
+    """The tracing of an online_score request, as done by the handler: five phases and two Redis round-trips."""
+
+    start = time.perf_counter()
+    if tracer.enabled:
+        tracer.start("1799be0adb23402d84b919aee0ebef54", start)
+    for name in ("parse", "auth", "validation", "scoring"):
+        if tracer.enabled:
+            tracer.phase(name)
+    for command in ("PIPELINE", "SET"):
+        start = time.perf_counter()
+        end = time.perf_counter()
+        if tracer.enabled:
+            tracer.record("redis", start, end, CLIENT, command=command)
+    if tracer.enabled:
+        tracer.phase("write")
+    if tracer.enabled:
+        tracer.finish("online_score", code=200)
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("--number", type=int, default=100000)
+    args = parser.parse_args()
+
+    print("%-36s %10s" % ("tracing", "us"))
+    # the best of several rounds, the noise of a shared machine only adds time
+    print("%-36s %10.3f" % ("no tracing", min(timeit(untraced_request, args.number) for _ in range(5)) * 1e6))
+    print("%-36s %10.3f" % ("off: request", min(timeit(traced_request, args.number) for _ in range(5)) * 1e6))
+    # the slow request log only, the traces are not exported
+    tracer.configure(slow_threshold=1000)
+    print("%-36s %10.3f" % ("on: request", min(timeit(traced_request, args.number) for _ in range(5)) * 1e6))
@@ -0,0 +1,48 @@
+"""Per-request validation cost of the descriptor dataclasses versus the compiled schemas.
+
+Usage: python -m benchmarks.validation [--number 100000]
+"""
+
+from argparse import ArgumentParser
+
+from benchmarks.common import timeit, user_request
+from src.schemas import OnlineScoreRequest, ClientsInterestsRequest, MethodRequest
+
+ONLINE_SCORE = user_request("online_score", {
+    "phone": "79175002040", "email": "stupnikov@otus.ru", "first_name": "a", "last_name": "b",
+    "birthday": "01.01.2000", "gender": 1,
+})
+CLIENTS_INTERESTS = user_request("clients_interests", {"client_ids": [1, 2, 3, 4], "date": "20.07.2017"})
+
+
+def dataclass_validation(request: dict, schema) -> None:
+    """The previous way: a dataclass with descriptors, the arguments are fetched once per field."""
+
+    MethodRequest(
+        account=request.get("account"),
+        login=request.get("login"),
+        token=request.get("token"),
+        arguments=request.get("arguments"),
+        method=request.get("method"),
+    )
+    schema(**{name: request.get("arguments").get(name) for name in schema.__dataclass_fields__})
+
+
+def compiled_validation(request: dict, schema) -> None:
+    MethodRequest.from_dict(request)
+    schema.from_dict(request.get("arguments"))
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("--number", type=int, default=100000)
+    args = parser.parse_args()
+
+    print("%-20s %14s %14s %8s" % ("request", "dataclass, us", "compiled, us", "speedup"))
+    for name, request, schema in (
+            ("online_score", ONLINE_SCORE, OnlineScoreRequest),
+            ("clients_interests", CLIENTS_INTERESTS, ClientsInterestsRequest),
+    ):
+        old = timeit(lambda: dataclass_validation(request, schema), args.number)
+        new = timeit(lambda: compiled_validation(request, schema), args.number)
+        print("%-20s %14.2f %14.2f %7.1fx" % (name, old * 1e6, new * 1e6, old / new))
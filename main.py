@@ -1,23 +1,148 @@
 """Main entrypoint."""
 
+import asyncio
 import logging
-from argparse import ArgumentParser
-from http.server import HTTPServer
+import signal
+import threading
+from argparse import ArgumentParser, ArgumentTypeError, Namespace
 
-from src.api import MainHTTPHandler
+from src.api import APIHandlerMixin, MainHTTPHandler
+from src.async_api import AsyncAPIServer, run_async_server
+from src.compression import ENCODERS, compressor
+from src.constants import (
+    REDIS_HOST, REDIS_PORT, REPLICA_STRATEGY, KEEPALIVE_TIMEOUT, COMPRESSION_MIN_SIZE, LOG_SAMPLE_RATE,
+)
+from src.log import setup_logging, stop_logging
+from src.profiler import profiler
+from src.server import make_server, PreforkSupervisor
+from src.sharding import ShardedStorageManager, parse_node
+from src.store import StorageManager
+from src.tracing import tracer
+
+
+def connect_store(args: Namespace) -> type[StorageManager]:
+    """The method connects the storage: one Redis node or several shards."""
+
+    nodes = args.redis or ["%s:%s" % (REDIS_HOST, REDIS_PORT)]
+    if len(nodes) > 1:
+        ShardedStorageManager.configure(nodes, max_connections=args.threads or None)
+        return ShardedStorageManager
+
+    StorageManager.connect(*parse_node(nodes[0]), max_connections=args.threads or None)
+    if args.replica:
+        StorageManager.connect_replicas([parse_node(node) for node in args.replica], args.replica_strategy,
+                                        max_connections=args.threads or None)
+    return StorageManager
+
+
+def compression_level(value: str) -> tuple[str, int]:
+    """The argument type "encoding=level"."""
+
+    encoding, _, level = value.partition("=")
+    if encoding not in ENCODERS or not level.isdigit():
+        raise ArgumentTypeError("expected ENCODING=LEVEL, ENCODING is one of: %s" % ", ".join(ENCODERS))
+    return encoding, int(level)
+
+
+def flush() -> None:
+    """The method writes the running profile, the waiting traces and the queued log records.
+
+    A worker process exits without it.
+    """
+
+    profiler.stop()
+    tracer.close()
+    stop_logging()
+
+
+def serve(args: Namespace) -> None:
+    """The method runs the server until SIGTERM or SIGINT."""
+
+    if args.keepalive_timeout is None:
+        # an idle connection would block the serial server
+        args.keepalive_timeout = KEEPALIVE_TIMEOUT if args.threads or args.use_async else 0
+    MainHTTPHandler.keepalive_timeout = AsyncAPIServer.keepalive_timeout = args.keepalive_timeout
+    APIHandlerMixin.compression_min_size = args.compression_min_size
+    for encoding, level in args.compression_level or ():
+        compressor.levels[encoding] = level
+    profiler.directory = args.profile_dir
+    signal.signal(signal.SIGUSR1, profiler.handle_signal)
+
+    if args.use_async:
+        redis_host, redis_port = parse_node(args.redis[0]) if args.redis else (REDIS_HOST, REDIS_PORT)
+        try:
+            asyncio.run(run_async_server(
+                "localhost", args.port, args.workers > 0, redis_host, redis_port, args.encode_interests
+            ))
+        finally:
+            flush()
+        return
+
+    # each process creates its own connection pool, sockets are never shared across fork
+    store = MainHTTPHandler.store = connect_store(args)
+    if args.encode_interests:
+        store.encode_interests()
+    server = make_server(("localhost", args.port), MainHTTPHandler, threads=args.threads, reuse_port=args.workers > 0)
+
+    def stop(signum, frame):
+        threading.Thread(target=server.shutdown).start()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        store.close()
+        flush()
 
 
 if __name__ == "__main__":
     parser = ArgumentParser()
     parser.add_argument("-p", "--port", action="store", type=int, default=8080)
     parser.add_argument("-l", "--log", action="store", default=None)
+    parser.add_argument("--log-format", choices=("json", "text"), default="text")
+    parser.add_argument("--log-sample-rate", action="store", type=float, default=LOG_SAMPLE_RATE,
+                        help="share of the successful requests written to the log")
+    parser.add_argument("--trace", action="store", default=None, metavar="FILE|URL",
+                        help="export the request traces as OTLP JSON to the file or the collector URL")
+    parser.add_argument("--trace-slow", action="store", type=float, default=None, metavar="MS",
+                        help="log the phases of the requests slower than MS milliseconds")
+    parser.add_argument("--profile-dir", action="store", default=None,
+                        help="directory of the profiles taken on SIGUSR1 or the profile method, by default the "
+                             "system temporary directory")
+    parser.add_argument("-t", "--threads", action="store", type=int, default=0,
+                        help="number of threads handling connections, 0 - serial server")
+    parser.add_argument("-w", "--workers", action="store", type=int, default=0,
+                        help="number of pre-forked worker processes sharing the port, 0 - single process")
+    parser.add_argument("-a", "--async", action="store_true", dest="use_async",
+                        help="asyncio server, --threads is ignored")
+    parser.add_argument("-k", "--keepalive-timeout", action="store", type=float, default=None,
+                        help="idle seconds of a persistent connection, 0 - one request per connection, "
+                             "by default %s s, 0 for the serial server" % KEEPALIVE_TIMEOUT)
+    parser.add_argument("--compression-min-size", action="store", type=int, default=COMPRESSION_MIN_SIZE,
+                        help="smallest response body compressed for the clients accepting it, 0 - no compression")
+    parser.add_argument("--compression-level", action="append", type=compression_level, default=None,
+                        metavar="ENCODING=LEVEL", help="compression level of gzip, deflate, br or zstd")
+    parser.add_argument("-r", "--redis", action="append", default=None, metavar="HOST:PORT",
+                        help="Redis node, repeat to shard the keys over several nodes")
+    parser.add_argument("--replica", action="append", default=None, metavar="HOST:PORT",
+                        help="Redis read replica of the node, repeat for several replicas")
+    parser.add_argument("--replica-strategy", choices=("round_robin", "least_latency"), default=REPLICA_STRATEGY)
+    parser.add_argument("--encode-interests", action="store_true",
+                        help="interest lists are stored encoded, migrate them first: python -m src.interests")
     args = parser.parse_args()
-    logging.basicConfig(filename=args.log, level=logging.INFO,
-                        format='[%(asctime)s] %(levelname).1s %(message)s', datefmt='%Y.%m.%d %H:%M:%S')
-    server = HTTPServer(("localhost", args.port), MainHTTPHandler)
+    if args.use_async and args.redis and len(args.redis) > 1:
+        parser.error("sharding is not supported by the asyncio server")
+    if args.replica and (args.use_async or args.redis and len(args.redis) > 1):
+        parser.error("read replicas are supported by the single-node synchronous server only")
+    setup_logging(args.log, args.log_format == "json", args.log_sample_rate)
+    tracer.configure(args.trace, args.trace_slow)
     logging.info("Starting server at %s" % args.port)
     try:
-        server.serve_forever()
-    except KeyboardInterrupt:
-        pass
-    server.server_close()
+        if args.workers > 0:
+            PreforkSupervisor(args.workers, lambda: serve(args)).run()
+        else:
+            serve(args)
+    finally:
+        flush()
@@ -1,23 +1,49 @@
 """Main handler."""
 
-import json
+import email.utils
 import logging
+import select
+import time
 import uuid
+from http import HTTPStatus
 from http.server import BaseHTTPRequestHandler
 from email.message import Message
+from typing import Any
 
-from src.constants import INVALID_REQUEST, NOT_FOUND, INTERNAL_ERROR, ERRORS, OK, BAD_REQUEST, FORBIDDEN
-from src.schemas import OnlineScoreRequest, ClientsInterestsRequest
-from src.scoring import get_score, get_interests
+from src.codec import loads, dumps
+from src.compression import compressor, negotiate
+from src.constants import (
+    INVALID_REQUEST, NOT_FOUND, INTERNAL_ERROR, ERRORS, OK, BAD_REQUEST, FORBIDDEN, NDJSON, KEEPALIVE_TIMEOUT,
+    KEEPALIVE_MAX_REQUESTS, KEEPALIVE_POLL_INTERVAL, COMPRESSION_MIN_SIZE, ADMIN_LOGIN,
+)
+from src.log import log_request
+from src.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, registry
+from src.profiler import start_profile
+from src.schemas import OnlineScoreRequest, ClientsInterestsRequest, OnlineScoreBatchRequest, ProfileRequest
+from src.scoring import get_score, get_interests, get_scores, iter_interests
 from src.store import StorageManager
+from src.tracing import tracer
 from src.utils import is_online_score_request_valid, check_auth, get_auth_data
 
+api_requests = registry.counter("api_requests_total", "API requests by method and response code.", ("method", "code"))
+api_latency = registry.histogram(
+    "api_request_duration_seconds", "API request handling time by method, streams included.", ("method",)
+)
 
-class MainHTTPHandler(BaseHTTPRequestHandler):
-    """The request handler."""
 
-    router = {"online_score": get_score, "clients_interests": get_interests}
+class APIHandlerMixin:
+    """The request pipeline shared by the synchronous and the asynchronous servers."""
+
+    router = {
+        "online_score": get_score,
+        "clients_interests": get_interests,
+        "online_score_batch": get_scores,
+        "profile": start_profile,
+    }
+    streamers = {"clients_interests": iter_interests}
     store = StorageManager
+    compressor = compressor
+    compression_min_size = COMPRESSION_MIN_SIZE
 
     @staticmethod
     def get_request_id(headers: Message) -> str:
@@ -25,99 +51,384 @@ class MainHTTPHandler(BaseHTTPRequestHandler):
 
         return headers.get('HTTP_X_REQUEST_ID', uuid.uuid4().hex)
 
-    def method_handler(self, request: dict, path: str, response: dict, code: int) -> tuple[dict, int]:
-        """The method is a handler for specific requests."""
+    @staticmethod
+    def authenticate(data_string: bytes | None, path: str) -> tuple[dict | None, int]:
+        """The method parses the request body and checks the authorization data."""
+
+        if tracer.enabled:
+            tracer.phase("parse")
+        try:
+            request = loads(data_string)
+        except:
+            return None, BAD_REQUEST
+
+        if not path or not isinstance(request, dict) or not request.get("login"):
+            return request, INVALID_REQUEST
+        if tracer.enabled:
+            tracer.phase("auth")
+        if not (auth_data := get_auth_data(request)):
+            return request, INVALID_REQUEST
+        if not check_auth(auth_data):
+            return request, FORBIDDEN
+        return request, OK
+
+    @staticmethod
+    def get_online_score_data(arguments: dict) -> OnlineScoreRequest | None:
+        """The method validates the arguments of one rating request."""
+
+        try:
+            request_data = OnlineScoreRequest.from_dict(arguments)
+        except AttributeError as e:
+            logging.error("Attribute error: %s", e)
+            return None
+        except ValueError as e:
+            logging.error("Value error: %s", e)
+            return None
+
+        if not is_online_score_request_valid(request_data):
+            logging.error("Value error: there are no minimum required fields "
+                            "(phone-email or first name-last name or gender-birthday)")
+            return None
+
+        return request_data
+
+    @classmethod
+    def get_request_data(cls, request: dict, path: str) -> tuple[Any, int]:
+        """The method validates the arguments of the requested method."""
 
         if path == "online_score":
+            if (request_data := cls.get_online_score_data(request.get("arguments"))) is None:
+                return None, INVALID_REQUEST
+
+        elif path == "online_score_batch":
             try:
-                request_data = OnlineScoreRequest(
-                    first_name=request.get("arguments").get("first_name"),
-                    last_name=request.get("arguments").get("last_name"),
-                    email=request.get("arguments").get("email"),
-                    phone=request.get("arguments").get("phone"),
-                    birthday=request.get("arguments").get("birthday"),
-                    gender=request.get("arguments").get("gender"),
-                )
+                batch = OnlineScoreBatchRequest.from_dict(request.get("arguments"))
             except AttributeError as e:
-                logging.exception("Attribute error: %s" % e)
-                return response, INVALID_REQUEST
+                logging.error("Attribute error: %s", e)
+                return None, INVALID_REQUEST
             except ValueError as e:
-                logging.exception("Value error: %s" % e)
-                return response, INVALID_REQUEST
+                logging.error("Value error: %s", e)
+                return None, INVALID_REQUEST
 
-            if not is_online_score_request_valid(request_data):
-                logging.exception("Value error: there are no minimum required fields "
-                                  "(phone-email or first name-last name or gender-birthday)")
-                return response, INVALID_REQUEST
+            # invalid items get their own errors in the response, the rest are scored
+            request_data = [cls.get_online_score_data(item) for item in batch.items]
 
         elif path == "clients_interests":
             try:
-                request_data = ClientsInterestsRequest(
-                    client_ids=request.get("arguments").get("client_ids"),
-                    date=request.get("arguments").get("date"),
-                )
+                request_data = ClientsInterestsRequest.from_dict(request.get("arguments"))
+            except AttributeError as e:
+                logging.error("Attribute error: %s", e)
+                return None, INVALID_REQUEST
+            except ValueError as e:
+                logging.error("Value error: %s", e)
+                return None, INVALID_REQUEST
+
+        elif path == "profile":
+            if request.get("login") != ADMIN_LOGIN:
+                return None, FORBIDDEN
+            try:
+                request_data = ProfileRequest.from_dict(request.get("arguments") or {})
             except AttributeError as e:
-                logging.exception("Attribute error: %s" % e)
-                return response, INVALID_REQUEST
+                logging.error("Attribute error: %s", e)
+                return None, INVALID_REQUEST
             except ValueError as e:
-                logging.exception("Value error: %s" % e)
-                return response, INVALID_REQUEST
+                logging.error("Value error: %s", e)
+                return None, INVALID_REQUEST
+
+        else:
+            return None, NOT_FOUND
+
+        return request_data, OK
+
+    @classmethod
+    def wants_stream(cls, headers: Message, path: str) -> bool:
+        """The method checks if the client accepts NDJSON and the method can be streamed."""
+
+        return path in cls.streamers and NDJSON in (headers.get("Accept") or "")
+
+    def make_response(
+            self,
+            code: int,
+            body: bytes,
+            content_type: str = "application/json",
+            keep_alive: bool = True,
+            chunked: bool = False,
+            content_encoding: str | None = None,
+            version: str = "HTTP/1.1",
+    ) -> bytes:
+        """The method creates the status line, the headers and the body of the response, to be sent in one write.
+
+        A kept HTTP/1.0 connection is confirmed with `Connection: keep-alive`, HTTP/1.1 ones are persistent by default.
+        """
+
+        if not keep_alive:
+            connection = "Connection: close\r\n"
+        elif version == "HTTP/1.0":
+            connection = "Connection: keep-alive\r\n"
+        else:
+            connection = ""
+
+        return (
+            "%s %d %s\r\nServer: %s\r\nDate: %s\r\nContent-Type: %s\r\n%s%s%s\r\n" % (
+                self.protocol_version,
+                code,
+                HTTPStatus(code).phrase,
+                self.version_string(),
+                email.utils.formatdate(usegmt=True),
+                content_type,
+                "Transfer-Encoding: chunked\r\n" if chunked else "Content-Length: %d\r\n" % len(body),
+                connection,
+                "Content-Encoding: %s\r\nVary: Accept-Encoding\r\n" % content_encoding if content_encoding else "",
+            )
+        ).encode('latin-1', 'strict') + body
+
+    def compress(self, body: bytes, accept_encoding: str | None) -> tuple[bytes, str | None]:
+        """The method compresses a body of at least `compression_min_size` bytes if the client accepts it."""
+
+        if not self.compression_min_size or len(body) < self.compression_min_size:
+            return body, None
+        if (encoding := negotiate(accept_encoding, self.compressor.encoders)) is None:
+            return body, None
+        return self.compressor.compress(body, encoding), encoding
+
+    @staticmethod
+    def get_stream_body(chunk: dict) -> bytes:
+        """The method turns a part of the response into NDJSON, one line per key."""
+
+        return b"".join(dumps({key: value}) + b"\n" for key, value in chunk.items())
+
+    @staticmethod
+    def make_chunk(data: bytes) -> bytes:
+        """The method frames the data for the chunked transfer encoding, an empty chunk ends the body."""
+
+        return b"%x\r\n%s\r\n" % (len(data), data)
+
+    @staticmethod
+    def get_stream_error(code: int, context: dict) -> bytes:
+        """The method creates the last line of a stream broken by an error."""
+
+        context.update(code=code)
+        log_request(context)
+        return dumps({"error": ERRORS[code], "code": code}) + b"\n"
+
+    @classmethod
+    def record_request(cls, path: str, context: dict, start: float) -> None:
+        """The method counts the finished request and ends its trace, unknown paths share one label."""
+
+        method = path if path in cls.router else "other"
+        api_requests.inc(method, str(context.get("code")))
+        api_latency.observe(time.perf_counter() - start, method)
+        if tracer.enabled:
+            tracer.finish(method, code=context.get("code"))
+
+    @staticmethod
+    def get_metrics(path: str) -> tuple[int, bytes]:
+        """The method answers a GET request: the metrics on /metrics, the other paths are not found."""
+
+        if path.strip("/") != "metrics":
+            return NOT_FOUND, b""
+        return OK, registry.render()
+
+    @staticmethod
+    def get_response_body(response: dict, code: int, context: dict) -> bytes:
+        """The method creates the response body."""
 
+        if code not in ERRORS:
+            r = {"response": response, "code": code}
         else:
-            return response, NOT_FOUND
+            r = {"error": response or ERRORS.get(code, "Unknown Error"), "code": code}
+        context.update(r)
+        log_request(context)
+        return dumps(r)
+
+
+class MainHTTPHandler(APIHandlerMixin, BaseHTTPRequestHandler):
+    """The request handler.
+
+    HTTP/1.1 connections are kept open for `keepalive_timeout` seconds of idleness
+    and at most `keepalive_requests` requests, 0 timeout closes them after every response.
+    """
+
+    protocol_version = "HTTP/1.1"
+    # the parts of a streamed response are separate writes, Nagle's algorithm would hold them
+    # until the client's delayed ACK on a persistent connection
+    disable_nagle_algorithm = True
+    keepalive_timeout = KEEPALIVE_TIMEOUT
+    keepalive_requests = KEEPALIVE_MAX_REQUESTS
+
+    def setup(self) -> None:
+        self.timeout = self.keepalive_timeout or None
+        self.requests = 0
+        self.log_sampled = False
+        super().setup()
+
+    def handle(self) -> None:
+        self.close_connection = True
+        self.handle_one_request()
+        while not self.close_connection and self.wait_request():
+            self.handle_one_request()
+
+    def wait_request(self) -> bool:
+        """The method waits for the next request of a persistent connection, returns if it has come.
+
+        The idle connection is given up after `keepalive_timeout` seconds, or as soon as another
+        connection waits for the thread.
+        """
 
+        # a pipelined request may be read into the buffer already
+        self.connection.setblocking(False)
+        try:
+            if self.rfile.peek(1):
+                return True
+        finally:
+            self.connection.settimeout(self.timeout)
+
+        deadline = time.monotonic() + self.keepalive_timeout
+        while (remaining := deadline - time.monotonic()) > 0:
+            if select.select([self.connection], [], [], min(remaining, KEEPALIVE_POLL_INTERVAL))[0]:
+                return True
+            if self.server.is_saturated():
+                return False
+        return False
+
+    def log_request(self, code: int | str = "-", size: int | str = "-") -> None:
+        """The access line of a successful request is sampled like its request record."""
+
+        self.log_sampled = code == OK
+        super().log_request(code, size)
+
+    def log_message(self, format: str, *args) -> None:
+        """The access and error lines go to the logging queue instead of stderr."""
+
+        logging.info("%s " + format, self.address_string(), *args, extra={"sampled": self.log_sampled})
+        self.log_sampled = False
+
+    def method_handler(self, request: dict, path: str, response: dict, code: int) -> tuple[dict, int]:
+        """The method is a handler for specific requests."""
+
+        if tracer.enabled:
+            tracer.phase("validation")
+        request_data, code = self.get_request_data(request, path)
+        if code != OK:
+            return response, code
+
+        if tracer.enabled:
+            tracer.phase("scoring")
         try:
             response = self.router[path](self.store, request_data, request.get("login"))
         except Exception as e:
             logging.exception("Unexpected error: %s" % e)
             code = INTERNAL_ERROR
+            if tracer.enabled:
+                tracer.fail(e)
 
         return response, code
 
     def send_response_data(self, response: dict, code: int, context: dict) -> None:
-        """The method that returns the result."""
+        """The method that returns the result, the status line, the headers and the body go out in one write."""
 
-        self.send_response(code)
-        self.send_header("Content-Type", "application/json")
-        self.end_headers()
-        if code not in ERRORS:
-            r = {"response": response, "code": code}
+        body = self.get_response_body(response, code, context)
+        body, encoding = self.compress(body, self.headers["Accept-Encoding"])
+        self.log_request(code)
+        keep_alive = not self.close_connection
+        self.wfile.write(self.make_response(
+            code, body, keep_alive=keep_alive, content_encoding=encoding, version=self.request_version
+        ))
+
+    def send_stream(self, path: str, request_data: Any, login: str, context: dict) -> None:
+        """The method writes the response part by part as NDJSON.
+
+        The headers are sent with the first part, so an error before it gets the usual error response.
+        An error after it ends the stream with an error line. HTTP/1.1 clients get the chunked
+        transfer encoding, the connection of HTTP/1.0 ones is closed after the body.
+        """
+
+        chunks = self.streamers[path](self.store, request_data, login)
+        try:
+            chunk = next(chunks, None)
+        except Exception as e:
+            logging.exception("Unexpected error: %s" % e)
+            self.send_response_data({}, INTERNAL_ERROR, context)
+            return
+
+        chunked = self.request_version == "HTTP/1.1"
+        if not chunked:
+            self.close_connection = True
+        self.log_request(OK)
+        pending = self.make_response(OK, b"", NDJSON, not self.close_connection, chunked)
+
+        def frame(data: bytes) -> bytes:
+            return self.make_chunk(data) if chunked and data else data
+
+        try:
+            while chunk is not None:
+                self.wfile.write(pending + frame(self.get_stream_body(chunk)))
+                pending = b""
+                chunk = next(chunks, None)
+        except ConnectionError:
+            raise
+        except Exception as e:
+            logging.exception("Unexpected error: %s" % e)
+            pending += frame(self.get_stream_error(INTERNAL_ERROR, context))
         else:
-            r = {"error": response or ERRORS.get(code, "Unknown Error"), "code": code}
-        context.update(r)
-        logging.info(context)
-        self.wfile.write(json.dumps(r).encode('utf-8'))
+            context.update(code=OK)
+            log_request(context)
+        self.wfile.write(pending + (self.make_chunk(b"") if chunked else b""))
+
+    def count_request(self) -> None:
+        """The method closes the connection after this request if it is the last one allowed.
+
+        The connection is closed as well when another one is waiting for a thread of the server.
+        """
+
+        self.requests += 1
+        if not self.keepalive_timeout or self.requests >= self.keepalive_requests or self.server.is_saturated():
+            self.close_connection = True
+
+    def do_GET(self) -> None:
+        """Metrics."""
+
+        self.count_request()
+        code, body = self.get_metrics(self.path)
+        self.log_request(code)
+        self.wfile.write(self.make_response(
+            code, body, METRICS_CONTENT_TYPE, not self.close_connection, version=self.request_version
+        ))
 
     def do_POST(self) -> None:
         """Post API."""
 
-        response, code = {}, OK
+        start = time.perf_counter()
+        self.count_request()
+        response = {}
         context = {"request_id": self.get_request_id(self.headers)}
-        request = None
+        if tracer.enabled:
+            tracer.start(context["request_id"], start)
         try:
             data_string = self.rfile.read(int(self.headers['Content-Length']))
-            request = json.loads(data_string)
         except:
-            code = BAD_REQUEST
+            data_string = None
+            # the unread body would be taken for the next request
+            self.close_connection = True
 
         path = self.path.strip("/")
-        if not path or not request.get("login"):
-            code = INVALID_REQUEST
-
-        else:
-            if request:
-                if not (auth_data := get_auth_data(request)):
-                    code = INVALID_REQUEST
-                else:
-                    if not check_auth(auth_data):
-                        code = FORBIDDEN
-                    else:
-                        logging.info("%s: %s %s" % (self.path, data_string, context["request_id"]))
-
-                        response, code = self.method_handler(request, path, response, code)
-
-            elif request is not None:
-                code = INVALID_REQUEST
+        request, code = self.authenticate(data_string, path)
+        if code == OK:
+            logging.info("%s: %s %s", self.path, data_string, context["request_id"], extra={"sampled": True})
+            if self.wants_stream(self.headers, path):
+                if tracer.enabled:
+                    tracer.phase("validation")
+                request_data, code = self.get_request_data(request, path)
+                if code == OK:
+                    if tracer.enabled:
+                        tracer.phase("stream")
+                    self.send_stream(path, request_data, request.get("login"), context)
+                    self.record_request(path, context, start)
+                    return
+            else:
+                response, code = self.method_handler(request, path, response, code)
 
+        if tracer.enabled:
+            tracer.phase("write")
         self.send_response_data(response, code, context)
-        return
+        self.record_request(path, context, start)
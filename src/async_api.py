@@ -0,0 +1,231 @@
+"""Asynchronous main handler."""
+
+import asyncio
+import logging
+import signal
+import time
+from email.parser import BytesHeaderParser
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler
+from typing import Any
+
+from src.api import APIHandlerMixin
+from src.async_store import AsyncStorageManager
+from src.constants import (
+    OK, INTERNAL_ERROR, REQUEST_QUEUE_SIZE, MAX_HEADERS, REDIS_HOST, REDIS_PORT, NDJSON, KEEPALIVE_TIMEOUT,
+    KEEPALIVE_MAX_REQUESTS,
+)
+from src.log import log_request
+from src.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE
+from src.profiler import start_profile_async
+from src.scoring import get_score_async, get_interests_async, get_scores_async, iter_interests_async
+from src.tracing import tracer
+
+
+class AsyncAPIServer(APIHandlerMixin):
+    """The asyncio server with the same request pipeline and responses as `MainHTTPHandler`."""
+
+    router = {
+        "online_score": get_score_async,
+        "clients_interests": get_interests_async,
+        "online_score_batch": get_scores_async,
+        "profile": start_profile_async,
+    }
+    streamers = {"clients_interests": iter_interests_async}
+    store = AsyncStorageManager
+    protocol_version = "HTTP/1.1"
+    keepalive_timeout = KEEPALIVE_TIMEOUT
+    keepalive_requests = KEEPALIVE_MAX_REQUESTS
+    server_version = BaseHTTPRequestHandler.server_version + " " + BaseHTTPRequestHandler.sys_version
+
+    async def method_handler(self, request: dict, path: str, response: dict, code: int) -> tuple[dict, int]:
+        """The method is a handler for specific requests."""
+
+        if tracer.enabled:
+            tracer.phase("validation")
+        request_data, code = self.get_request_data(request, path)
+        if code != OK:
+            return response, code
+
+        if tracer.enabled:
+            tracer.phase("scoring")
+        try:
+            response = await self.router[path](self.store, request_data, request.get("login"))
+        except Exception as e:
+            logging.exception("Unexpected error: %s" % e)
+            code = INTERNAL_ERROR
+            if tracer.enabled:
+                tracer.fail(e)
+
+        return response, code
+
+    def version_string(self) -> str:
+        return self.server_version
+
+    async def send_stream(
+            self,
+            writer: asyncio.StreamWriter,
+            path: str,
+            request_data: Any,
+            login: str,
+            context: dict,
+            chunked: bool,
+            keep_alive: bool,
+    ) -> None:
+        """The method writes the response part by part as NDJSON, like `MainHTTPHandler.send_stream`."""
+
+        chunks = self.streamers[path](self.store, request_data, login)
+        try:
+            chunk = await anext(chunks, None)
+        except Exception as e:
+            logging.exception("Unexpected error: %s" % e)
+            body = self.get_response_body({}, INTERNAL_ERROR, context)
+            writer.write(self.make_response(INTERNAL_ERROR, body, keep_alive=keep_alive))
+            return
+
+        pending = self.make_response(OK, b"", NDJSON, keep_alive, chunked)
+
+        def frame(data: bytes) -> bytes:
+            return self.make_chunk(data) if chunked and data else data
+
+        try:
+            while chunk is not None:
+                writer.write(pending + frame(self.get_stream_body(chunk)))
+                pending = b""
+                await writer.drain()
+                chunk = await anext(chunks, None)
+        except ConnectionError:
+            raise
+        except Exception as e:
+            logging.exception("Unexpected error: %s" % e)
+            pending += frame(self.get_stream_error(INTERNAL_ERROR, context))
+        else:
+            context.update(code=OK)
+            log_request(context)
+        writer.write(pending + (self.make_chunk(b"") if chunked else b""))
+
+    async def handle_request(
+            self, request_line: bytes, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, last: bool
+    ) -> bool:
+        """The method reads the rest of one request and writes the response, returns if the connection is kept."""
+
+        start = time.perf_counter()
+        request_line = request_line.decode('iso-8859-1').split()
+        header_lines = []
+        while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+            header_lines.append(line)
+            if len(header_lines) > MAX_HEADERS:
+                break
+
+        if len(request_line) != 3 or len(header_lines) > MAX_HEADERS:
+            writer.write(self.make_response(HTTPStatus.BAD_REQUEST, b"", "text/plain", keep_alive=False))
+            return False
+        command, target, version = request_line
+        if command not in ("POST", "GET"):
+            writer.write(self.make_response(HTTPStatus.NOT_IMPLEMENTED, b"", "text/plain", keep_alive=False))
+            return False
+
+        headers = BytesHeaderParser().parsebytes(b"".join(header_lines))
+        connection = (headers.get("Connection") or "").lower()
+        keep_alive = not last and bool(self.keepalive_timeout) and (
+            connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+        )
+        if command == "GET":
+            code, body = self.get_metrics(target)
+            writer.write(self.make_response(code, body, METRICS_CONTENT_TYPE, keep_alive, version=version))
+            await writer.drain()
+            return keep_alive
+
+        response = {}
+        context = {"request_id": self.get_request_id(headers)}
+        if tracer.enabled:
+            tracer.start(context["request_id"], start)
+        try:
+            data_string = await reader.readexactly(int(headers['Content-Length']))
+        except (TypeError, ValueError, asyncio.IncompleteReadError):
+            data_string = None
+            # the unread body would be taken for the next request
+            keep_alive = False
+
+        path = target.strip("/")
+        request, code = self.authenticate(data_string, path)
+        if code == OK:
+            logging.info("%s: %s %s", target, data_string, context["request_id"], extra={"sampled": True})
+            if self.wants_stream(headers, path):
+                if tracer.enabled:
+                    tracer.phase("validation")
+                request_data, code = self.get_request_data(request, path)
+                if code == OK:
+                    # HTTP/1.0 clients read the body until the connection is closed
+                    chunked = version == "HTTP/1.1"
+                    keep_alive = keep_alive and chunked
+                    if tracer.enabled:
+                        tracer.phase("stream")
+                    await self.send_stream(
+                        writer, path, request_data, request.get("login"), context, chunked, keep_alive
+                    )
+                    await writer.drain()
+                    self.record_request(path, context, start)
+                    return keep_alive
+            else:
+                response, code = await self.method_handler(request, path, response, code)
+
+        if tracer.enabled:
+            tracer.phase("write")
+        body, encoding = self.compress(self.get_response_body(response, code, context), headers["Accept-Encoding"])
+        writer.write(self.make_response(
+            code, body, keep_alive=keep_alive, content_encoding=encoding, version=version
+        ))
+        await writer.drain()
+        self.record_request(path, context, start)
+        return keep_alive
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """The method handles the requests of the connection until it is closed.
+
+        An idle connection is closed after `keepalive_timeout` seconds, any one after `keepalive_requests` requests.
+        """
+
+        try:
+            for number in range(1, self.keepalive_requests + 1):
+                try:
+                    request_line = await asyncio.wait_for(reader.readline(), self.keepalive_timeout or None)
+                except TimeoutError:
+                    break
+                if not request_line:
+                    break
+                if not await self.handle_request(request_line, reader, writer, number == self.keepalive_requests):
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host: str, port: int, reuse_port: bool = False) -> asyncio.Server:
+        """The method starts listening, connections are handled until the server is closed."""
+
+        return await asyncio.start_server(
+            self.handle_connection, host, port, reuse_port=reuse_port, backlog=REQUEST_QUEUE_SIZE
+        )
+
+
+async def run_async_server(
+        host: str, port: int, reuse_port: bool = False, redis_host: str = REDIS_HOST, redis_port: int = REDIS_PORT,
+        encode_interests: bool = False,
+) -> None:
+    """The method runs the asynchronous server until SIGTERM or SIGINT."""
+
+    AsyncStorageManager.connect(redis_host, redis_port)
+    if encode_interests:
+        await AsyncStorageManager.encode_interests()
+    server = await AsyncAPIServer().start(host, port, reuse_port)
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signum, stop.set)
+
+    try:
+        async with server:
+            await stop.wait()
+    finally:
+        await AsyncStorageManager.close()
@@ -0,0 +1,223 @@
+"""Asynchronous cache storage module."""
+
+import time
+from typing import Any
+
+from redis.asyncio import Redis
+from redis.asyncio.client import Pipeline
+from redis.asyncio.retry import Retry
+from redis.backoff import ExponentialBackoff
+from redis.exceptions import BusyLoadingError, ConnectionError, TimeoutError
+
+from src.breaker import AsyncCircuitBreaker
+from src.cache import LRUCache, should_refresh_early
+from src.constants import (
+    TIMEOUT, RETRY, TTL, REDIS_HOST, REDIS_PORT, L1_CACHE_SIZE, L1_CACHE_TTL, BREAKER_FAILURES,
+    BREAKER_RECOVERY_TIMEOUT, EARLY_REFRESH_BETA, EARLY_REFRESH_DELTA,
+)
+from src.interests import InterestDictionary
+from src.metrics import registry
+from src.store import redis_errors, redis_latency
+from src.tracing import CLIENT, tracer
+
+
+class AsyncTimedPipeline(Pipeline):
+
+    async def execute(self, raise_on_error: bool = True) -> list:
+        command = "MULTI" if self.is_transaction else "PIPELINE"
+        start = time.perf_counter()
+        try:
+            return await super().execute(raise_on_error)
+        except Exception:
+            redis_errors.inc(command)
+            raise
+        finally:
+            end = time.perf_counter()
+            redis_latency.observe(end - start, command)
+            if tracer.enabled:
+                tracer.record("redis", start, end, CLIENT, command=command)
+
+
+class AsyncTimedRedis(Redis):
+    """The asynchronous version of `TimedRedis`, the metrics are shared with it."""
+
+    async def execute_command(self, *args, **options) -> Any:
+        start = time.perf_counter()
+        try:
+            return await super().execute_command(*args, **options)
+        except Exception:
+            redis_errors.inc(args[0])
+            raise
+        finally:
+            end = time.perf_counter()
+            redis_latency.observe(end - start, args[0])
+            if tracer.enabled:
+                tracer.record("redis", start, end, CLIENT, command=args[0])
+
+    def pipeline(self, transaction: bool = True, shard_hint: str | None = None) -> AsyncTimedPipeline:
+        return AsyncTimedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+
+def make_async_client(host: str = REDIS_HOST, port: int = REDIS_PORT, max_connections: int | None = None) -> Redis:
+    """The method for creating an asyncio Redis client."""
+
+    return AsyncTimedRedis(
+        host=host,
+        port=port,
+        socket_timeout=TIMEOUT,
+        retry=Retry(ExponentialBackoff(), RETRY),
+        retry_on_error=[BusyLoadingError, ConnectionError, TimeoutError],
+        decode_responses=True,
+        max_connections=max_connections,
+    )
+
+
+class AsyncStorageManager:
+    """The asyncio counterpart of `StorageManager` with the same methods."""
+
+    client = make_async_client()
+    local_cache = LRUCache(L1_CACHE_SIZE, L1_CACHE_TTL)
+    early_refreshes = 0
+    interests = None
+    breaker = AsyncCircuitBreaker(BREAKER_FAILURES, BREAKER_RECOVERY_TIMEOUT, probe=client.ping, name="async cache")
+
+    @classmethod
+    def connect(cls, host: str = REDIS_HOST, port: int = REDIS_PORT, max_connections: int | None = None) -> None:
+        """The method replaces the client with a new one, it must be called inside the running event loop."""
+
+        cls.client = make_async_client(host, port, max_connections)
+        cls.breaker.probe = cls.client.ping
+
+    @classmethod
+    async def encode_interests(cls) -> None:
+        """The method switches the list methods to the encoded interest lists, see `src.interests`."""
+
+        cls.interests = InterestDictionary()
+        await cls.interests.refresh_async(cls.client)
+
+    @classmethod
+    async def decode_interests(cls, values: list[str | None]) -> list[list]:
+        if not all(cls.interests.is_known(value) for value in values):
+            await cls.interests.refresh_async(cls.client)
+        return [cls.interests.decode(value) for value in values]
+
+    @classmethod
+    async def close(cls) -> None:
+        await cls.client.aclose()
+
+    @classmethod
+    async def get_cache(cls, key: str, local: bool = True) -> Any:
+        """The method reads the in-process cache first, then Redis, `local=False` reads only Redis.
+
+        A value read from Redis is kept in the process no longer than its remaining Redis TTL.
+        A value close to expiration may be reported as missing, so that it is recomputed early.
+        """
+
+        if local and (value := cls.local_cache.get(key)) is not None:
+            return value
+
+        pipe = cls.client.pipeline(transaction=False)
+        pipe.get(key)
+        pipe.ttl(key)
+        async with cls.breaker:
+            value, ttl = await pipe.execute()
+        if value is None:
+            return None
+        if should_refresh_early(ttl, EARLY_REFRESH_DELTA, EARLY_REFRESH_BETA):
+            cls.early_refreshes += 1
+            return None
+        if ttl > 0:
+            cls.local_cache.set(key, value, ttl)
+        return value
+
+    @classmethod
+    async def set_cache(cls, key: str, value: Any, ttl: int | None = None) -> None:
+        async with cls.breaker:
+            await cls.client.set(key, value, ex=ttl or TTL)
+        cls.local_cache.set(key, value, ttl or TTL)
+
+    @classmethod
+    async def get_many_cache(cls, keys: list[str]) -> list[Any]:
+        """The method reads many keys: the in-process cache first, then one MGET for the rest."""
+
+        values = [cls.local_cache.get(key) for key in keys]
+        if missing := [key for key, value in zip(keys, values) if value is None]:
+            async with cls.breaker:
+                found = dict(zip(missing, await cls.get_many_data(missing)))
+            values = [found[key] if value is None else value for key, value in zip(keys, values)]
+        return values
+
+    @classmethod
+    async def set_many_cache(cls, data: dict[str, Any], ttl: int | None = None) -> None:
+        """The method writes many keys with expiration in one pipelined round-trip."""
+
+        pipe = cls.client.pipeline(transaction=False)
+        for key, value in data.items():
+            pipe.set(key, value, ex=ttl or TTL)
+        async with cls.breaker:
+            await pipe.execute()
+        for key, value in data.items():
+            cls.local_cache.set(key, value, ttl or TTL)
+
+    # imitating another db
+    @classmethod
+    async def get_data(cls, key: str) -> str:
+        return await cls.client.get(key)
+
+    @classmethod
+    async def get_many_data(cls, keys: list[str]) -> list[str]:
+        return await cls.client.mget(keys)
+
+    @classmethod
+    async def get_all_list_data(cls, key: str) -> list:
+        if cls.interests is not None:
+            return (await cls.get_many_list_data([key]))[0]
+        return await cls.client.lrange(key, 0, -1)
+
+    @classmethod
+    async def get_many_list_data(cls, keys: list[str]) -> list[list]:
+        """The method fetches many lists in one round-trip, like `StorageManager.get_many_list_data`."""
+
+        if cls.interests is None:
+            return await cls.get_many_lists(keys)
+
+        packed = await cls.client.mget(keys)
+        values = await cls.decode_interests(packed)
+        # MGET returns None both for a missing key and for a list
+        if missing := [key for key, value in zip(keys, packed) if value is None]:
+            lists = iter(await cls.get_many_lists(missing))
+            values = [next(lists) if value is None else decoded for value, decoded in zip(packed, values)]
+        return values
+
+    @classmethod
+    async def get_many_lists(cls, keys: list[str]) -> list[list]:
+        pipe = cls.client.pipeline(transaction=False)
+        for key in keys:
+            pipe.lrange(key, 0, -1)
+        return await pipe.execute()
+
+    @classmethod
+    async def set_data(cls, key: str, value: Any) -> None:
+        await cls.client.set(key, value)
+
+    @classmethod
+    async def set_many_data(cls, data: dict[str, Any]) -> None:
+        await cls.client.mset(data)
+
+    @classmethod
+    async def set_list_data(cls, key: str, values: list) -> None:
+        if cls.interests is not None:
+            await cls.interests.intern_async(cls.client, values)
+            await cls.client.append(key, cls.interests.encode(values))
+            return
+        await cls.client.lpush(key, *values)
+
+    @classmethod
+    async def del_many_data(cls, *args) -> None:
+        await cls.client.delete(*args)
+        cls.local_cache.delete(*args)
+
+
+registry.add_stats("async_cache_breaker", AsyncStorageManager.breaker.stats, "transition")
+registry.add_stats("async_local_cache", AsyncStorageManager.local_cache.stats)
+registry.add_stats("async_cache", lambda: {"early_refreshes": AsyncStorageManager.early_refreshes})
@@ -0,0 +1,150 @@
+"""Circuit breaker module."""
+
+import asyncio
+import logging
+import threading
+import time
+from collections import Counter
+from typing import Awaitable, Callable
+
+from redis.exceptions import RedisError
+
+
+class CircuitOpenError(Exception):
+    """The call was rejected without trying because the circuit is open."""
+
+
+class CircuitBreaker:
+    """The circuit breaker used as a context manager around storage calls.
+
+    After `failure_threshold` failures in a row the circuit opens and every call fails
+    instantly with `CircuitOpenError`. After `recovery_timeout` seconds the next call starts
+    `probe` in a background thread (half-open state); the circuit closes if the probe succeeds
+    and opens again otherwise. Without a probe the next call itself is the trial one.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+            self,
+            failure_threshold: int,
+            recovery_timeout: float,
+            probe: Callable[[], object] | None = None,
+            name: str = "",
+            exceptions: tuple[type[BaseException], ...] = (RedisError,),
+    ):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.probe = probe
+        self.name = name
+        self.exceptions = exceptions
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.rejected = 0
+        self.transitions = Counter()
+        self.lock = threading.Lock()
+
+    def set_state(self, state: str) -> None:
+        """The method changes the state, must be called with the lock held."""
+
+        if state == self.state:
+            return
+        self.transitions["%s->%s" % (self.state, state)] += 1
+        log = logging.error if state == self.OPEN else logging.info
+        log("Circuit breaker %s: %s -> %s." % (self.name, self.state, state))
+        self.state = state
+        if state == self.OPEN:
+            self.opened_at = time.monotonic()
+        elif state == self.CLOSED:
+            self.failures = 0
+
+    def run_probe(self) -> None:
+        try:
+            self.probe()
+        except Exception:
+            with self.lock:
+                self.set_state(self.OPEN)
+        else:
+            with self.lock:
+                self.set_state(self.CLOSED)
+
+    def start_probe(self) -> None:
+        threading.Thread(target=self.run_probe, name="breaker-probe", daemon=True).start()
+
+    def allow(self) -> bool:
+        """The method decides whether the call may go to the storage."""
+
+        with self.lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.recovery_timeout:
+                self.set_state(self.HALF_OPEN)
+                if self.probe is None:
+                    return True
+                self.start_probe()
+            self.rejected += 1
+            return False
+
+    def record_success(self) -> None:
+        with self.lock:
+            self.failures = 0
+            self.set_state(self.CLOSED)
+
+    def record_failure(self) -> None:
+        with self.lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.set_state(self.OPEN)
+
+    def __enter__(self) -> "CircuitBreaker":
+        if not self.allow():
+            raise CircuitOpenError(self.name)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.record_success()
+        elif issubclass(exc_type, self.exceptions):
+            self.record_failure()
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "rejected": self.rejected,
+            "transitions": dict(self.transitions),
+        }
+
+
+class AsyncCircuitBreaker(CircuitBreaker):
+    """The circuit breaker of the asyncio storage, used as an async context manager.
+
+    The probe is a coroutine function run as a task of the event loop, so probing does not block it.
+    """
+
+    def __init__(self, *args, probe: Callable[[], Awaitable[object]] | None = None, **kwargs):
+        super().__init__(*args, probe=probe, **kwargs)
+        self.probe_task = None
+
+    def start_probe(self) -> None:
+        # the loop keeps only a weak reference to the task
+        self.probe_task = asyncio.get_running_loop().create_task(self.run_probe_async())
+
+    async def run_probe_async(self) -> None:
+        try:
+            await self.probe()
+        except Exception:
+            with self.lock:
+                self.set_state(self.OPEN)
+        else:
+            with self.lock:
+                self.set_state(self.CLOSED)
+
+    async def __aenter__(self) -> "AsyncCircuitBreaker":
+        return self.__enter__()
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        self.__exit__(exc_type, exc, tb)
@@ -0,0 +1,163 @@
+"""Bulk loading of the client interests.
+
+Streams a JSONL file (`{"client_id": 1, "interests": ["cars", "pets"]}` per line) or a CSV file
+(`client_id,interest,interest,...` per line, an optional `client_id` header) into the storage.
+Every chunk of lines replaces the lists of its clients in one pipelined transaction, several chunks
+are written in parallel. After each written chunk the number of loaded lines is saved to the checkpoint
+file, a restarted load skips them.
+
+Usage: python -m src.bulk_loader interests.jsonl [--format csv] [--chunk-size 1000] [--workers 4]
+       [--checkpoint interests.checkpoint] [--redis HOST:PORT ...] [--encode-interests]
+"""
+
+import csv
+import logging
+import os
+import sys
+import time
+from argparse import ArgumentParser
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Iterable, TextIO
+
+from src.codec import loads
+from src.store import StorageManager
+
+
+def parse_jsonl(lines: Iterable[str]) -> tuple[dict[str, list], int]:
+    """The method returns the lists by client id and the number of invalid lines."""
+
+    data, invalid = {}, 0
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            record = loads(line)
+            client_id, interests = record["client_id"], record["interests"]
+            if not isinstance(interests, list) or not all(isinstance(value, str) for value in interests):
+                raise ValueError
+        except (KeyError, TypeError, ValueError):
+            invalid += 1
+            continue
+        data[str(client_id)] = interests
+    return data, invalid
+
+
+def parse_csv(lines: Iterable[str]) -> tuple[dict[str, list], int]:
+    """The method returns the lists by client id and the number of invalid lines."""
+
+    data, invalid = {}, 0
+    for row in csv.reader(lines):
+        if not row or row[0] == "client_id":
+            continue
+        if not row[0].strip():
+            invalid += 1
+            continue
+        data[row[0].strip()] = [value.strip() for value in row[1:] if value.strip()]
+    return data, invalid
+
+
+PARSERS = {"jsonl": parse_jsonl, "csv": parse_csv}
+
+
+def read_checkpoint(path: str | None) -> int:
+    if path is None or not os.path.exists(path):
+        return 0
+    with open(path, encoding="utf-8") as f:
+        return int(f.read().strip() or 0)
+
+
+def write_checkpoint(path: str | None, lines: int) -> None:
+    """The method replaces the checkpoint file atomically, so it is never left half-written."""
+
+    if path is None:
+        return
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        f.write(str(lines))
+    os.replace(path + ".tmp", path)
+
+
+def load_chunk(store: type[StorageManager], lines: list[str], file_format: str) -> tuple[int, int]:
+    data, invalid = PARSERS[file_format](lines)
+    if data:
+        store.replace_many_list_data(data)
+    return len(data), invalid
+
+
+def load_file(
+        source: TextIO,
+        store: type[StorageManager],
+        file_format: str = "jsonl",
+        chunk_size: int = 1000,
+        workers: int = 4,
+        checkpoint: str | None = None,
+) -> int:
+    """The method loads the interests from `source`, returns the number of loaded clients.
+
+    At most two chunks per worker are held in memory. The chunks are finished in the file order,
+    so the checkpoint always covers a prefix of the file. The chunks are written concurrently,
+    so a client listed twice in different chunks may keep either list.
+    """
+
+    done = read_checkpoint(checkpoint)
+    if done:
+        logging.info("Resuming after %s lines." % done)
+    lines = islice(source, done, None)
+    loaded = invalid = 0
+    start = time.perf_counter()
+
+    def finish(size: int, future) -> None:
+        nonlocal done, loaded, invalid
+        chunk_loaded, chunk_invalid = future.result()
+        done += size
+        loaded += chunk_loaded
+        invalid += chunk_invalid
+        write_checkpoint(checkpoint, done)
+        logging.info("Loaded %s clients (%s invalid lines), %.0f clients/s."
+                     % (loaded, invalid, loaded / (time.perf_counter() - start)))
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="loader") as executor:
+        pending = deque()
+        while chunk := list(islice(lines, chunk_size)):
+            pending.append((len(chunk), executor.submit(load_chunk, store, chunk, file_format)))
+            if len(pending) >= workers * 2:
+                finish(*pending.popleft())
+        while pending:
+            finish(*pending.popleft())
+    return loaded
+
+
+if __name__ == "__main__":
+    from src.sharding import ShardedStorageManager, parse_node
+
+    parser = ArgumentParser()
+    parser.add_argument("source", help="JSONL or CSV file with the interests, - for stdin")
+    parser.add_argument("--format", choices=tuple(PARSERS), default=None, dest="file_format",
+                        help="by default the file extension, jsonl for stdin")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--checkpoint", default=None, help="file with the number of loaded lines")
+    parser.add_argument("-r", "--redis", action="append", default=None, metavar="HOST:PORT",
+                        help="Redis node, repeat to shard the keys over several nodes")
+    parser.add_argument("--encode-interests", action="store_true", help="store the lists encoded")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr,
+                        format='[%(asctime)s] %(levelname).1s %(message)s', datefmt='%Y.%m.%d %H:%M:%S')
+
+    file_format = args.file_format or ("csv" if args.source.endswith(".csv") else "jsonl")
+    if args.redis and len(args.redis) > 1:
+        ShardedStorageManager.configure(args.redis, max_connections=args.workers)
+        storage = ShardedStorageManager
+    else:
+        StorageManager.connect(*parse_node(args.redis[0]) if args.redis else (), max_connections=args.workers)
+        storage = StorageManager
+    if args.encode_interests:
+        storage.encode_interests()
+
+    source = sys.stdin if args.source == "-" else open(args.source, encoding="utf-8", newline="")
+    try:
+        load_file(source, storage, file_format, args.chunk_size, args.workers, args.checkpoint)
+    finally:
+        source.close()
+        storage.close()
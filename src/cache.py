@@ -0,0 +1,87 @@
+"""In-process cache module."""
+
+import math
+import random
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable
+
+
+class LRUCache:
+    """Thread-safe bounded cache with LRU eviction and per-entry expiration.
+
+    `maxsize=0` disables the cache. The expiration of an entry is the smaller of the cache `ttl`
+    and the `ttl` passed to `set`, so entries never outlive the source they were copied from.
+    """
+
+    def __init__(self, maxsize: int, ttl: float | None = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self.lock:
+            item = self.data.get(key)
+            if item is None:
+                self.misses += 1
+                return default
+            expires_at, value = item
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self.data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self.data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None) -> None:
+        if not self.maxsize:
+            return
+        if ttl is None or self.ttl is not None and self.ttl < ttl:
+            ttl = self.ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        with self.lock:
+            self.data[key] = (expires_at, value)
+            self.data.move_to_end(key)
+            while len(self.data) > self.maxsize:
+                self.data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, *keys: Hashable) -> None:
+        with self.lock:
+            for key in keys:
+                self.data.pop(key, None)
+
+    def clear(self) -> None:
+        with self.lock:
+            self.data.clear()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "size": len(self.data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+def should_refresh_early(ttl: float, delta: float, beta: float) -> bool:
+    """The method decides whether to treat a cached value as expired before its TTL ends.
+
+    Probabilistic early expiration (XFetch): the closer the expiration, the higher the chance,
+    `delta` is the expected recompute time in seconds, `beta` > 1 favours earlier refreshes,
+    `beta=0` disables it. Spreads the refreshes of a hot key instead of a stampede at expiration.
+    """
+
+    return beta > 0 and ttl >= 0 and -delta * beta * math.log(1.0 - random.random()) >= ttl
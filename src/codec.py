@@ -0,0 +1,55 @@
+"""JSON codec module.
+
+The fastest installed library is used: orjson, then ujson, then the standard json.
+`JSON_CODEC` or the environment variable of the same name pins one of them.
+"""
+
+import json
+import os
+from typing import Any, Callable, NamedTuple
+
+from src.constants import JSON_CODEC
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+
+class Codec(NamedTuple):
+    name: str
+    loads: Callable[[bytes | str], Any]
+    dumps: Callable[[Any], bytes]
+
+
+def make_codecs() -> dict[str, Codec]:
+    """The method returns the installed codecs from the fastest one, all of them decode bytes and encode to bytes."""
+
+    codecs = {}
+    if orjson is not None:
+        codecs["orjson"] = Codec("orjson", orjson.loads, orjson.dumps)
+    if ujson is not None:
+        codecs["ujson"] = Codec("ujson", ujson.loads, lambda obj: ujson.dumps(obj, ensure_ascii=False).encode('utf-8'))
+    codecs["json"] = Codec("json", json.loads, lambda obj: json.dumps(obj).encode('utf-8'))
+    return codecs
+
+
+CODECS = make_codecs()
+
+
+def get_codec(name: str | None = None) -> Codec:
+    if name is None:
+        return next(iter(CODECS.values()))
+    if name not in CODECS:
+        raise ValueError("JSON codec %s is not installed." % name)
+    return CODECS[name]
+
+
+codec = get_codec(os.environ.get("JSON_CODEC") or JSON_CODEC)
+loads = codec.loads
+dumps = codec.dumps
@@ -0,0 +1,98 @@
+"""Response compression module.
+
+gzip and deflate are always available, zstd and br when `zstandard` and `brotli` are installed.
+"""
+
+import gzip
+import threading
+import time
+import zlib
+from typing import Callable
+
+from src.constants import COMPRESSION_LEVELS
+from src.metrics import registry
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def make_encoders() -> dict[str, Callable[[bytes, int], bytes]]:
+    """The method returns the available encoders in the order of preference for equal client weights."""
+
+    encoders = {}
+    if zstandard is not None:
+        encoders["zstd"] = lambda data, level: zstandard.ZstdCompressor(level=level).compress(data)
+    if brotli is not None:
+        encoders["br"] = lambda data, level: brotli.compress(data, quality=level)
+    encoders["gzip"] = lambda data, level: gzip.compress(data, compresslevel=level, mtime=0)
+    # "deflate" in HTTP is the zlib format, not the raw deflate stream
+    encoders["deflate"] = lambda data, level: zlib.compress(data, level)
+    return encoders
+
+
+ENCODERS = make_encoders()
+
+
+def negotiate(accept_encoding: str | None, encoders: dict = ENCODERS) -> str | None:
+    """The method picks the encoding with the highest weight in `Accept-Encoding`, None - send as is."""
+
+    if not accept_encoding:
+        return None
+
+    weights = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        weight = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[name.strip().lower()] = weight
+
+    default = weights.get("*", 0.0)
+    candidates = [(weights.get(name, default), -i, name) for i, name in enumerate(encoders)]
+    weight, _, name = max(candidates)
+    return name if weight > 0 else None
+
+
+class Compressor:
+    """The compressor of the response bodies with the counters of the compressed responses."""
+
+    def __init__(self, levels: dict[str, int] = COMPRESSION_LEVELS, encoders: dict = ENCODERS):
+        self.levels = dict(levels)
+        self.encoders = encoders
+        self.lock = threading.Lock()
+        self.counters = {name: {"responses": 0, "bytes_in": 0, "bytes_out": 0, "seconds": 0.0} for name in encoders}
+
+    def compress(self, data: bytes, encoding: str) -> bytes:
+        start = time.perf_counter()
+        result = self.encoders[encoding](data, self.levels[encoding])
+        elapsed = time.perf_counter() - start
+
+        with self.lock:
+            counters = self.counters[encoding]
+            counters["responses"] += 1
+            counters["bytes_in"] += len(data)
+            counters["bytes_out"] += len(result)
+            counters["seconds"] += elapsed
+        return result
+
+    def stats(self) -> dict[str, dict]:
+        with self.lock:
+            return {
+                name: dict(counters, bytes_saved=counters["bytes_in"] - counters["bytes_out"])
+                for name, counters in self.counters.items()
+            }
+
+
+compressor = Compressor()
+registry.add_stats("compression", compressor.stats, "encoding")
@@ -23,7 +23,84 @@ GENDERS = {
     FEMALE: "female",
 }
 
+# Auth: cached token checks, seconds around the hour change the admin token of the other hour is accepted
+AUTH_CACHE_SIZE = 10000
+ADMIN_TOKEN_GRACE = 30
+
+# API
+BATCH_MAX_SIZE = 1000
+DATE_CACHE_SIZE = 4096
+# clients_interests with "Accept: application/x-ndjson" is streamed by chunks of ids
+NDJSON = "application/x-ndjson"
+STREAM_CHUNK_SIZE = 1000
+
+# Profiler: the profile API method and SIGUSR1, see src.profiler; None - the system temporary directory
+PROFILE_SECONDS = 30
+PROFILE_MAX_SECONDS = 600
+PROFILE_INTERVAL = 0.01
+PROFILE_DIR = None
+
+# Score weights
+PHONE_WEIGHT = 1.5
+EMAIL_WEIGHT = 1.5
+BIRTHDAY_GENDER_WEIGHT = 1.5
+NAME_WEIGHT = 0.5
+
 # Redis
 RETRY = 3
 TIMEOUT = 3
 TTL = 1200
+REDIS_HOST = "0.0.0.0"
+REDIS_PORT = 6379
+VNODES = 160
+
+# Read replicas: "round_robin" or "least_latency"
+REPLICA_STRATEGY = "round_robin"
+REPLICA_COOLDOWN = 10
+REPLICA_LATENCY_ALPHA = 0.2
+
+# Interest lists are stored under the client ids, the Redis hash keeps the ids of the encoded interests
+INTERESTS_KEY_MATCH = "[0-9]*"
+INTERESTS_DICT_KEY = "interests:dict"
+
+# In-process cache in front of Redis, 0 entries disables it
+L1_CACHE_SIZE = 10000
+L1_CACHE_TTL = 60
+
+# Probabilistic early refresh of the score cache, 0 disables it
+EARLY_REFRESH_BETA = 0
+EARLY_REFRESH_DELTA = 1
+
+# Circuit breaker of the score cache
+BREAKER_FAILURES = 3
+BREAKER_RECOVERY_TIMEOUT = 5
+
+# Server
+REQUEST_QUEUE_SIZE = 128
+WORKER_STOP_TIMEOUT = 10
+WORKER_RESTART_DELAY = 0.5
+MAX_HEADERS = 100
+# idle seconds and requests per persistent connection, 0 timeout disables keep-alive
+KEEPALIVE_TIMEOUT = 5
+KEEPALIVE_MAX_REQUESTS = 1000
+# seconds between the checks of an idle connection of the thread pool for a connection waiting for its thread
+KEEPALIVE_POLL_INTERVAL = 0.1
+
+# Responses
+# "orjson", "ujson" or "json", None - the fastest installed one
+JSON_CODEC = None
+# responses of at least COMPRESSION_MIN_SIZE bytes are compressed if the client accepts it, 0 - never
+COMPRESSION_MIN_SIZE = 1024
+COMPRESSION_LEVELS = {"zstd": 3, "br": 5, "gzip": 6, "deflate": 6}
+
+# Logging: share of the successful requests written to the log
+LOG_SAMPLE_RATE = 1.0
+
+# Metrics: upper bounds of the latency histograms of GET /metrics, seconds
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# Tracing, see src.tracing
+TRACE_SERVICE_NAME = "scoring-api"
+TRACE_BATCH_SIZE = 100
+TRACE_FLUSH_INTERVAL = 1
+TRACE_QUEUE_SIZE = 10000
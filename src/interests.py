@@ -0,0 +1,181 @@
+"""Interest dictionary encoding module.
+
+In the encoded mode every interest name is interned into a small integer id kept in the Redis hash
+`INTERESTS_DICT_KEY` and every client list is stored as one string value with one character per id:
+`chr(id)`, so the first 127 interests take one byte each. Ids are appended in the order they were
+pushed, and decoded in reverse, so the lists are the same as the ones built by LPUSH.
+
+Usage: python -m src.interests [--redis HOST:PORT] [--match PATTERN] [--batch 1000] [--decode]
+"""
+
+import logging
+import sys
+from argparse import ArgumentParser
+from typing import Iterable
+
+from redis.asyncio import Redis as AsyncRedis
+from redis.client import Redis
+
+from src.constants import INTERESTS_DICT_KEY, INTERESTS_KEY_MATCH, REDIS_HOST, REDIS_PORT
+
+# the ids must be valid characters outside the surrogate range
+MAX_INTEREST_ID = 0xD7FF
+
+# the hash holds nothing but the names, so the next id is its length; fields are never deleted
+INTERN = """
+local id = redis.call("HGET", KEYS[1], ARGV[1])
+if not id then
+    id = redis.call("HLEN", KEYS[1]) + 1
+    redis.call("HSET", KEYS[1], ARGV[1], id)
+end
+return id
+"""
+
+
+class InterestDictionary:
+    """The in-process copy of the interest dictionary.
+
+    Unknown names are interned and unknown ids are loaded by the storage, the copy only grows.
+    """
+
+    def __init__(self, key: str = INTERESTS_DICT_KEY):
+        self.key = key
+        self.ids = {}
+        self.names = {}
+
+    def load(self, mapping: dict[str, str | int]) -> None:
+        """The method adds the name -> id pairs read from the Redis hash."""
+
+        for name, interest_id in mapping.items():
+            if int(interest_id) > MAX_INTEREST_ID:
+                raise OverflowError("The interest dictionary is full.")
+            self.ids[name] = int(interest_id)
+            self.names[int(interest_id)] = name
+
+    def missing(self, values: Iterable[str]) -> list[str]:
+        return [value for value in dict.fromkeys(values) if value not in self.ids]
+
+    def is_known(self, packed: str | None) -> bool:
+        return not packed or all(ord(char) in self.names for char in packed)
+
+    def encode(self, values: Iterable[str]) -> str:
+        return "".join(chr(self.ids[value]) for value in values)
+
+    def decode(self, packed: str | None) -> list[str]:
+        return [self.names[ord(char)] for char in reversed(packed)] if packed else []
+
+    def intern(self, client: Redis, values: Iterable[str]) -> None:
+        """The method gives ids to the new names, one atomic script call per name."""
+
+        if missing := self.missing(values):
+            script = client.register_script(INTERN)
+            self.load({name: script(keys=[self.key], args=[name]) for name in missing})
+
+    def refresh(self, client: Redis) -> None:
+        self.load(client.hgetall(self.key))
+
+    async def intern_async(self, client: AsyncRedis, values: Iterable[str]) -> None:
+        """The asynchronous version of `intern`."""
+
+        if missing := self.missing(values):
+            script = client.register_script(INTERN)
+            self.load({name: await script(keys=[self.key], args=[name]) for name in missing})
+
+    async def refresh_async(self, client: AsyncRedis) -> None:
+        self.load(await client.hgetall(self.key))
+
+
+# the list is replaced only if nothing was pushed to it since it was read
+REPLACE_LIST = """
+if redis.call("LLEN", KEYS[1]) ~= tonumber(ARGV[1]) then
+    return 0
+end
+redis.call("DEL", KEYS[1])
+if ARGV[2] ~= "" then
+    redis.call("SET", KEYS[1], ARGV[2])
+end
+return 1
+"""
+
+
+def migrate(
+        client: Redis, dictionary: InterestDictionary, match: str = INTERESTS_KEY_MATCH, batch: int = 1000
+) -> int:
+    """The method replaces the plain interest lists with the encoded strings, returns the number of keys.
+
+    Every batch is read and replaced in two pipelines, a list changed in between is left
+    as it is and migrated by the next run.
+    """
+
+    replace = client.register_script(REPLACE_LIST)
+    migrated = 0
+    keys = []
+    for key in client.scan_iter(match=match, count=batch, _type="list"):
+        keys.append(key)
+        if len(keys) == batch:
+            migrated += _migrate_batch(client, replace, dictionary, keys)
+            keys = []
+    if keys:
+        migrated += _migrate_batch(client, replace, dictionary, keys)
+    return migrated
+
+
+def _migrate_batch(client: Redis, replace, dictionary: InterestDictionary, keys: list[str]) -> int:
+    pipe = client.pipeline(transaction=False)
+    for key in keys:
+        pipe.lrange(key, 0, -1)
+    lists = pipe.execute()
+    dictionary.intern(client, (value for values in lists for value in values))
+
+    pipe = client.pipeline(transaction=False)
+    for key, values in zip(keys, lists):
+        # LRANGE returns the last pushed value first
+        replace(keys=[key], args=[len(values), dictionary.encode(reversed(values))], client=pipe)
+    migrated = sum(pipe.execute())
+    logging.info("Migrated %s of %s keys." % (migrated, len(keys)))
+    return migrated
+
+
+def rollback(
+        client: Redis, dictionary: InterestDictionary, match: str = INTERESTS_KEY_MATCH, batch: int = 1000
+) -> int:
+    """The method turns the encoded strings matching the pattern back into lists.
+
+    Strings with characters missing from the dictionary are left as they are.
+    """
+
+    dictionary.refresh(client)
+    restored = 0
+    for key in client.scan_iter(match=match, count=batch, _type="string"):
+        if not dictionary.is_known(packed := client.get(key)):
+            continue
+        pipe = client.pipeline(transaction=True)
+        pipe.delete(key)
+        if values := dictionary.decode(packed):
+            pipe.rpush(key, *values)
+        pipe.execute()
+        restored += 1
+    return restored
+
+
+if __name__ == "__main__":
+    from src.sharding import parse_node
+    from src.store import make_client
+
+    parser = ArgumentParser()
+    parser.add_argument("-r", "--redis", default="%s:%s" % (REDIS_HOST, REDIS_PORT), metavar="HOST:PORT")
+    parser.add_argument("--match", default=INTERESTS_KEY_MATCH, help="pattern of the interest keys")
+    parser.add_argument("--batch", type=int, default=1000)
+    parser.add_argument("--decode", action="store_true",
+                        help="turn the encoded strings back into lists, --match must match the interest keys only")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr,
+                        format='[%(asctime)s] %(levelname).1s %(message)s', datefmt='%Y.%m.%d %H:%M:%S')
+    if args.decode and args.match == "*":
+        parser.error("--decode needs the pattern of the interest keys, other string keys could be decoded by mistake")
+
+    redis_client = make_client(*parse_node(args.redis))
+    if args.decode:
+        logging.info("Restored %s keys." % rollback(redis_client, InterestDictionary(), args.match, args.batch))
+    else:
+        logging.info("Migrated %s keys." % migrate(redis_client, InterestDictionary(), args.match, args.batch))
@@ -0,0 +1,136 @@
+"""Logging setup module.
+
+The request threads only put the records into a queue, a background thread formats and writes them.
+Records of successful requests are sampled, the others are always written.
+"""
+
+import copy
+import logging
+import os
+import queue
+import random
+from logging.handlers import QueueHandler, QueueListener
+
+from src.codec import dumps
+from src.constants import OK, LOG_SAMPLE_RATE
+
+TEXT_FORMAT = '[%(asctime)s] %(levelname).1s %(message)s'
+DATE_FORMAT = '%Y.%m.%d %H:%M:%S'
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line: time, level, message, the `fields` of the record and the traceback if any."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "time": self.formatTime(record, self.datefmt),
+            "level": record.levelname,
+            "message": record.getMessage(),
+        }
+        data.update(getattr(record, "fields", None) or {})
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data["traceback"] = record.exc_text
+        return dumps(data).decode('utf-8')
+
+
+class TextFormatter(logging.Formatter):
+    """The previous text format, the `fields` of the record follow the message."""
+
+    def formatMessage(self, record: logging.LogRecord) -> str:
+        message = super().formatMessage(record)
+        if fields := getattr(record, "fields", None):
+            message += " %s" % fields
+        return message
+
+
+class SamplingFilter(logging.Filter):
+    """Passes `rate` of the records marked with `sampled=True` and all the other records."""
+
+    def __init__(self, rate: float = LOG_SAMPLE_RATE):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return not getattr(record, "sampled", False) or self.rate >= 1 or random.random() < self.rate
+
+
+class StructuredQueueHandler(QueueHandler):
+    """Only merges the message with its arguments on the calling thread, the rest is done by the listener.
+
+    The record is copied, so the arguments and the fields must not be changed after the call.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg, record.args = record.getMessage(), None
+        if record.exc_info:
+            # the traceback keeps the frames of the calling thread alive, it is formatted right away
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+listener = None
+target = None
+sampling = SamplingFilter()
+
+
+def setup_logging(
+        filename: str | None = None, structured: bool = False, sample_rate: float = LOG_SAMPLE_RATE,
+        level: int = logging.INFO,
+) -> None:
+    """The method replaces the handlers of the root logger with the queue one.
+
+    The file or stderr is written by the listener thread, a forked process starts its own listener.
+    """
+
+    global target
+    stop_logging()
+    if target is not None:
+        target.close()
+    target = logging.FileHandler(filename) if filename else logging.StreamHandler()
+    target.setFormatter(JSONFormatter(datefmt=DATE_FORMAT) if structured else TextFormatter(TEXT_FORMAT, DATE_FORMAT))
+    sampling.rate = sample_rate
+    logging.getLogger().setLevel(level)
+    start_listener()
+
+
+def start_listener() -> None:
+    global listener
+    records = queue.SimpleQueue()
+    handler = StructuredQueueHandler(records)
+    handler.addFilter(sampling)
+    logging.getLogger().handlers = [handler]
+    listener = QueueListener(records, target)
+    listener.start()
+
+
+def stop_logging() -> None:
+    """The method writes the queued records and switches to writing on the calling thread."""
+
+    global listener
+    if listener is None:
+        return
+    listener.stop()
+    listener = None
+    target.addFilter(sampling)
+    logging.getLogger().handlers = [target]
+
+
+def restart_after_fork() -> None:
+    global listener
+    if listener is not None:
+        # the listener thread of the parent does not exist in the child
+        listener = None
+        start_listener()
+
+
+os.register_at_fork(after_in_child=restart_after_fork)
+
+
+def log_request(context: dict) -> None:
+    """The method logs the result of a request, the successful ones are sampled."""
+
+    logging.info("request", extra={"fields": context, "sampled": context.get("code") == OK})
@@ -0,0 +1,209 @@
+"""Metrics module.
+
+Counters and latency histograms of the process, and the `stats()` of the caches, breakers, replicas
+and the compressor, exported in the Prometheus text format by `GET /metrics`.
+Every worker process has its own metrics.
+"""
+
+import threading
+from bisect import bisect_left
+from typing import Callable, Iterator
+
+from src.constants import LATENCY_BUCKETS
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def format_labels(names: tuple[str, ...], values: tuple) -> str:
+    if not names:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for value in values)
+    return "{%s}" % ",".join('%s="%s"' % pair for pair in zip(names, escaped))
+
+
+def format_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(int(value))
+
+
+class Metric:
+    """The base of the metrics recorded without locks.
+
+    Every thread writes its own shard, the shards are summed on export.
+    The shards of the finished threads are kept, so nothing is lost.
+    """
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.local = threading.local()
+        self.shards = []
+        self.lock = threading.Lock()
+
+    def shard(self) -> dict:
+        try:
+            return self.local.shard
+        except AttributeError:
+            shard = self.local.shard = {}
+            with self.lock:
+                self.shards.append(shard)
+            return shard
+
+    def snapshot(self) -> list[dict]:
+        """The method copies the shards, a copy of a dict is atomic for the writing threads."""
+
+        with self.lock:
+            shards = list(self.shards)
+        return [shard.copy() for shard in shards]
+
+
+class Counter(Metric):
+    """A counter with a series per combination of the label values."""
+
+    kind = "counter"
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        shard = self.shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+    def get(self, *labels: str) -> float:
+        return sum(shard.get(labels, 0) for shard in self.snapshot())
+
+    def samples(self) -> Iterator[str]:
+        values = {}
+        for shard in self.snapshot():
+            for labels, value in shard.items():
+                values[labels] = values.get(labels, 0) + value
+        for labels, value in values.items():
+            yield "%s%s %s" % (self.name, format_labels(self.labelnames, labels), format_value(value))
+
+
+class Histogram(Metric):
+    """A histogram of durations in seconds with fixed buckets.
+
+    Every series keeps the count of each bucket, the cumulative counts are computed on export.
+    """
+
+    kind = "histogram"
+
+    def __init__(
+            self,
+            name: str,
+            documentation: str,
+            labelnames: tuple[str, ...] = (),
+            buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels: str) -> None:
+        shard = self.shard()
+        if (series := shard.get(labels)) is None:
+            # the last slot counts the values above the largest bucket, the one after it is the sum
+            series = shard[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def merged(self) -> dict[tuple, list]:
+        merged = {}
+        for shard in self.snapshot():
+            for labels, series in shard.items():
+                if (total := merged.get(labels)) is None:
+                    merged[labels] = list(series)
+                else:
+                    merged[labels] = [a + b for a, b in zip(total, series)]
+        return merged
+
+    def count(self, *labels: str) -> int:
+        series = self.merged().get(labels)
+        return sum(series[:-1]) if series else 0
+
+    def samples(self) -> Iterator[str]:
+        names = self.labelnames + ("le",)
+        for labels, series in self.merged().items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(float(bound))
+                yield "%s_bucket%s %d" % (self.name, format_labels(names, labels + (le,)), cumulative)
+            yield "%s_sum%s %r" % (self.name, format_labels(self.labelnames, labels), series[-1])
+            yield "%s_count%s %d" % (self.name, format_labels(self.labelnames, labels), cumulative)
+
+
+def flatten(name: str, stats: dict, labelnames: tuple[str, ...], labels: tuple = ()) -> Iterator[tuple]:
+    """The method turns the `stats()` dict into (name, label names, label values, value) samples.
+
+    A dict of dicts is a level of series: its keys are the values of the next label name. A dict of
+    numbers under a key is one metric with the keys as the values of the next label name.
+    A string value is exported as 1 with the string as the label named after the key.
+    """
+
+    names = labelnames[:len(labels)]
+    if stats and all(isinstance(value, dict) for value in stats.values()):
+        for key, value in stats.items():
+            yield from flatten(name, value, labelnames, labels + (key,))
+        return
+
+    for key, value in stats.items():
+        metric = "%s_%s" % (name, key)
+        if isinstance(value, dict):
+            label = labelnames[len(labels)]
+            for sub_key, sub_value in value.items():
+                yield metric, names + (label,), labels + (sub_key,), sub_value
+        elif isinstance(value, str):
+            yield metric, names + (key,), labels + (value,), 1
+        elif isinstance(value, (int, float)):
+            yield metric, names, labels, value
+
+
+class Registry:
+    """The metrics of the process and the `stats()` functions exported with them."""
+
+    def __init__(self):
+        self.metrics = {}
+        self.collectors = {}
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self.metrics:
+            raise ValueError("Metric %s is already registered." % metric.name)
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(
+            self, name: str, documentation: str, labelnames: tuple[str, ...] = (), buckets=LATENCY_BUCKETS
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def add_stats(self, name: str, func: Callable[[], dict | None], *labelnames: str) -> None:
+        """The method exports the dict returned by `func` on every scrape, see `flatten`."""
+
+        self.collectors[name] = (func, labelnames)
+
+    def render(self) -> bytes:
+        """The method returns the exposition of all the metrics in the Prometheus text format."""
+
+        lines = []
+        for metric in self.metrics.values():
+            lines.append("# HELP %s %s" % (metric.name, metric.documentation))
+            lines.append("# TYPE %s %s" % (metric.name, metric.kind))
+            lines.extend(metric.samples())
+
+        for name, (func, labelnames) in self.collectors.items():
+            # the samples of one metric must follow each other
+            grouped = {}
+            for metric, names, labels, value in flatten(name, func() or {}, labelnames):
+                grouped.setdefault(metric, []).append(
+                    "%s%s %s" % (metric, format_labels(names, labels), format_value(value))
+                )
+            for metric, samples in grouped.items():
+                lines.append("# TYPE %s untyped" % metric)
+                lines.extend(samples)
+        return ("\n".join(lines) + "\n").encode('utf-8')
+
+
+registry = Registry()
@@ -0,0 +1,126 @@
+"""Sampling profiler module.
+
+The stacks of all the threads of the process are sampled every `interval` seconds, the result is
+written in the collapsed stack format (`frame;frame;frame count` per line) read by flamegraph.pl,
+speedscope and similar tools. It is wall-clock time: threads waiting for a request or for Redis
+are sampled too. A profile is started by SIGUSR1 or by the admin-only `profile` API method.
+"""
+
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+from src.constants import PROFILE_INTERVAL, PROFILE_SECONDS, PROFILE_DIR
+from src.schemas import ProfileRequest
+
+
+class Sampler:
+    """The collector of the sampled stacks."""
+
+    def __init__(self):
+        self.stacks = Counter()
+        self.samples = 0
+        self.labels = {}
+        self.root = os.getcwd() + os.sep
+
+    def label(self, code) -> str:
+        if (label := self.labels.get(code)) is None:
+            filename = code.co_filename
+            filename = filename[len(self.root):] if filename.startswith(self.root) else os.path.basename(filename)
+            label = self.labels[code] = "%s (%s:%d)" % (code.co_qualname, filename, code.co_firstlineno)
+        return label
+
+    def sample(self) -> None:
+        """The method records the current stack of every thread but the calling one."""
+
+        me = threading.get_ident()
+        for ident, frame in sys._current_frames().items():
+            if ident == me:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(self.label(frame.f_code))
+                frame = frame.f_back
+            self.stacks[";".join(reversed(stack))] += 1
+        self.samples += 1
+
+    def collapsed(self) -> str:
+        return "".join("%s %d\n" % (stack, count) for stack, count in self.stacks.most_common())
+
+
+class Profiler:
+    """The profiler of the process, one profile at a time."""
+
+    def __init__(self, interval: float = PROFILE_INTERVAL, directory: str | None = PROFILE_DIR):
+        self.interval = interval
+        self.directory = directory
+        # SIGUSR1 may interrupt the main thread inside `start`
+        self.lock = threading.RLock()
+        self.path = None
+        self.thread = None
+        self.stopping = threading.Event()
+
+    def start(self, seconds: float = PROFILE_SECONDS, path: str | None = None) -> tuple[str, bool]:
+        """The method starts sampling for `seconds` in a background thread.
+
+        Returns the path of the profile file and False if another profile is already being taken,
+        the file is written when the sampling ends.
+        """
+
+        with self.lock:
+            if self.path is not None:
+                return self.path, False
+            path = self.path = path or os.path.join(
+                self.directory or tempfile.gettempdir(),
+                "profile-%s-%s.collapsed" % (os.getpid(), time.strftime("%Y%m%d-%H%M%S")),
+            )
+            self.stopping.clear()
+            self.thread = threading.Thread(target=self.run, args=(seconds, path), name="profiler", daemon=True)
+            self.thread.start()
+        return path, True
+
+    def run(self, seconds: float, path: str) -> None:
+        sampler = Sampler()
+        deadline = time.monotonic() + seconds
+        try:
+            while (now := time.monotonic()) < deadline:
+                sampler.sample()
+                if self.stopping.wait(min(self.interval, deadline - now)):
+                    break
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(sampler.collapsed())
+            logging.info("Profile of %s samples written to %s." % (sampler.samples, path))
+        except OSError:
+            logging.exception("Profile %s failed." % path)
+        finally:
+            with self.lock:
+                self.path = None
+
+    def stop(self) -> None:
+        """The method ends the running profile early, the samples taken are written."""
+
+        thread = self.thread
+        if thread is not None and thread.is_alive():
+            self.stopping.set()
+            thread.join()
+
+    def handle_signal(self, signum=None, frame=None) -> None:
+        self.start()
+
+
+profiler = Profiler()
+
+
+def start_profile(store, request_data: ProfileRequest, login: str) -> dict:
+    """The `profile` API method, the admin check is done by the handler."""
+
+    path, started = profiler.start(request_data.seconds or PROFILE_SECONDS)
+    return {"file": path, "started": started}
+
+
+async def start_profile_async(store, request_data: ProfileRequest, login: str) -> dict:
+    return start_profile(store, request_data, login)
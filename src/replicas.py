@@ -0,0 +1,100 @@
+"""Read replicas module."""
+
+import itertools
+import logging
+import threading
+import time
+from typing import Any, Callable
+
+from redis.client import Redis
+from redis.exceptions import ConnectionError, TimeoutError
+
+from src.constants import REPLICA_STRATEGY, REPLICA_COOLDOWN, REPLICA_LATENCY_ALPHA
+
+ROUND_ROBIN = "round_robin"
+LEAST_LATENCY = "least_latency"
+
+
+class ReplicaSet:
+    """The read replicas of one primary.
+
+    Reads are spread over the replicas in turn (round_robin) or sent to the one with the lowest
+    average latency (least_latency). A replica that fails is taken out of rotation for `cooldown`
+    seconds and the read is repeated on the primary; so is every read while all replicas are out.
+    """
+
+    def __init__(
+            self,
+            clients: dict[str, Redis],
+            strategy: str = REPLICA_STRATEGY,
+            cooldown: float = REPLICA_COOLDOWN,
+            alpha: float = REPLICA_LATENCY_ALPHA,
+    ):
+        if strategy not in (ROUND_ROBIN, LEAST_LATENCY):
+            raise ValueError("Unknown replica strategy: %s" % strategy)
+        self.clients = clients
+        self.strategy = strategy
+        self.cooldown = cooldown
+        self.alpha = alpha
+        self.names = list(clients)
+        self.latency = dict.fromkeys(self.names, 0.0)
+        self.down_until = dict.fromkeys(self.names, 0.0)
+        self.reads = dict.fromkeys(self.names, 0)
+        self.failures = dict.fromkeys(self.names, 0)
+        self.primary_reads = 0
+        self.counter = itertools.count()
+        self.lock = threading.Lock()
+
+    def choose(self) -> str | None:
+        """The method returns the replica for the next read or None if all of them are out of rotation."""
+
+        now = time.monotonic()
+        healthy = [name for name in self.names if self.down_until[name] <= now]
+        if not healthy:
+            return None
+        if self.strategy == LEAST_LATENCY:
+            return min(healthy, key=self.latency.__getitem__)
+        return healthy[next(self.counter) % len(healthy)]
+
+    def mark_down(self, name: str) -> None:
+        with self.lock:
+            self.down_until[name] = time.monotonic() + self.cooldown
+            self.failures[name] += 1
+        logging.error("Replica %s does not respond, out of rotation for %s s." % (name, self.cooldown))
+
+    def read(self, func: Callable[[Redis], Any], primary: Redis) -> Any:
+        """The method runs `func(client)` on a replica, falling back to the primary."""
+
+        if (name := self.choose()) is None:
+            self.primary_reads += 1
+            return func(primary)
+
+        start = time.perf_counter()
+        try:
+            result = func(self.clients[name])
+        except (ConnectionError, TimeoutError):
+            self.mark_down(name)
+            self.primary_reads += 1
+            return func(primary)
+
+        elapsed = time.perf_counter() - start
+        with self.lock:
+            self.latency[name] += self.alpha * (elapsed - self.latency[name])
+            self.reads[name] += 1
+        return result
+
+    def close(self) -> None:
+        for client in self.clients.values():
+            client.close()
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        return {
+            name: {
+                "up": self.down_until[name] <= now,
+                "reads": self.reads[name],
+                "failures": self.failures[name],
+                "latency": self.latency[name],
+            }
+            for name in self.names
+        } | {"primary": {"reads": self.primary_reads}}
@@ -1,9 +1,11 @@
 """Schemas module."""
 
-from dataclasses import dataclass
+from dataclasses import dataclass, fields
+from functools import lru_cache
 import datetime
+import time
 
-from src.constants import ADMIN_LOGIN
+from src.constants import ADMIN_LOGIN, BATCH_MAX_SIZE, DATE_CACHE_SIZE, PROFILE_MAX_SECONDS
 
 
 class BaseParamsMixin:
@@ -22,6 +24,12 @@ class BaseDescriptor(BaseParamsMixin):
     def check_field(self, value):
         pass
 
+    def clean(self, value):
+        """The method checks a not None value and returns the value to store."""
+
+        self.check_field(value)
+        return value
+
     def __set_name__(self, owner, name):
         self.name = "_" + name
 
@@ -32,7 +40,7 @@ class BaseDescriptor(BaseParamsMixin):
         if not self.nullable and value is None:
             raise ValueError
         elif value is not None:
-            self.check_field(value)
+            value = self.clean(value)
 
         setattr(instance, self.name, value)
 
@@ -85,32 +93,72 @@ class PhoneField(BaseDescriptor):
             raise ValueError
 
 
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def parse_date_string(value: str) -> datetime.date:
+    # the common zero-padded form is parsed by hand, the rest goes to strptime
+    if len(value) == 10 and value[2] == value[5] == "." and value.replace(".", "").isdigit():
+        return datetime.date(int(value[6:]), int(value[3:5]), int(value[:2]))
+    return datetime.datetime.strptime(value, "%d.%m.%Y").date()
+
+
+def parse_date(value) -> datetime.date:
+    """The method parses a DD.MM.YYYY date, the results are cached."""
+
+    if not isinstance(value, str):
+        raise ValueError
+    return parse_date_string(value)
+
+
+def format_date(value: datetime.date | str) -> str:
+    """The method formats a date back to DD.MM.YYYY."""
+
+    if isinstance(value, datetime.date):
+        return "%02d.%02d.%04d" % (value.day, value.month, value.year)
+    return value
+
+
 class DateField(BaseDescriptor):
 
     def __init__(self, required: bool | None = None, nullable: bool | None = None):
         super().__init__(required, nullable)
 
     def check_field(self, value):
-        datetime.datetime.strptime(value, "%d.%m.%Y").date()
+        parse_date(value)
+
+    def clean(self, value):
+        return parse_date(value)
 
 
 class BirthDayField(BaseDescriptor):
 
+    year_delta = 70
+
     def __init__(self, required: bool | None = None, nullable: bool | None = None):
         super().__init__(required, nullable)
+        self.lower_date_limit = None
+        self.refresh_at = 0.0
+
+    def get_lower_date_limit(self) -> datetime.date:
+        """The method returns the earliest valid birthday, it is recalculated once a day."""
+
+        if time.time() >= self.refresh_at:
+            today = datetime.date.today()
+            try:
+                self.lower_date_limit = datetime.date(today.year - self.year_delta, today.month, today.day)
+            except ValueError:
+                self.lower_date_limit = datetime.date(today.year - self.year_delta, 3, 1)
+            tomorrow = today + datetime.timedelta(days=1)
+            self.refresh_at = time.mktime(tomorrow.timetuple())
+        return self.lower_date_limit
 
     def check_field(self, value):
-        date = datetime.datetime.strptime(value, "%d.%m.%Y").date()
-
-        today = datetime.date.today()
-        year_delta = 70
-        try:
-            lower_date_limit = datetime.date(today.year - year_delta, today.month, today.day)
-        except ValueError:
-            lower_date_limit = datetime.date(today.year - year_delta, 3, 1)
+        self.clean(value)
 
-        if date < lower_date_limit:
+    def clean(self, value):
+        date = parse_date(value)
+        if date < self.get_lower_date_limit():
             raise ValueError
+        return date
 
 
 class GenderField(BaseDescriptor):
@@ -137,12 +185,72 @@ class ClientIDsField(BaseDescriptor):
                 raise ValueError
 
 
+class BatchField(BaseDescriptor):
+
+    def __init__(self, required: bool | None = None, nullable: bool | None = None):
+        super().__init__(required, nullable)
+
+    def check_field(self, value):
+        if not isinstance(value, list) or not value or len(value) > BATCH_MAX_SIZE:
+            raise ValueError
+
+
+class SecondsField(BaseDescriptor):
+
+    def __init__(self, required: bool | None = None, nullable: bool | None = None):
+        super().__init__(required, nullable)
+
+    def check_field(self, value):
+        if not isinstance(value, int) or isinstance(value, bool) or not 0 < value <= PROFILE_MAX_SECONDS:
+            raise ValueError
+
+
+def compiled(cls):
+    """The decorator compiles the descriptors of a dataclass schema into one validation function.
+
+    `cls.from_dict(data)` validates the dict like `cls(**data)` with the same errors, but makes
+    no descriptor calls: the None checks are inlined, the field checks are called directly and
+    the values are stored in an instance of a generated subclass of the schema, whose `__slots__`
+    take the place of the descriptors.
+    """
+
+    schema_fields = [(f.name, cls.__dict__[f.name]) for f in fields(cls)]
+    slots_class = type("Compiled" + cls.__name__, (cls,), {
+        "__slots__": tuple(name for name, _ in schema_fields),
+        "__module__": cls.__module__,
+        "__qualname__": "Compiled" + cls.__qualname__,
+        "__doc__": cls.__doc__,
+    })
+
+    globals_ = {"new": object.__new__, "slots_class": slots_class}
+    lines = ["def from_dict(data):", "    get = data.get", "    instance = new(slots_class)"]
+    for name, descriptor in schema_fields:
+        lines += ["    value = get(%r)" % name, "    if value is None:"]
+        lines.append("        pass" if descriptor.nullable else "        raise ValueError")
+        lines.append("    else:")
+        if type(descriptor).clean is BaseDescriptor.clean:
+            globals_["check_" + name] = descriptor.check_field
+            lines.append("        check_%s(value)" % name)
+        else:
+            globals_["clean_" + name] = descriptor.clean
+            lines.append("        value = clean_%s(value)" % name)
+        lines.append("    instance.%s = value" % name)
+    lines.append("    return instance")
+    exec("\n".join(lines), globals_)
+
+    cls.from_dict = staticmethod(globals_["from_dict"])
+    cls.compiled_class = slots_class
+    return cls
+
+
+@compiled
 @dataclass
 class ClientsInterestsRequest:
     client_ids: list[int] | None = ClientIDsField(required=True, nullable=False)
     date: datetime.date | str | None = DateField(required=False, nullable=True)
 
 
+@compiled
 @dataclass
 class OnlineScoreRequest:
     first_name: str | None = CharField(required=False, nullable=True)
@@ -153,6 +261,19 @@ class OnlineScoreRequest:
     gender: int | None = GenderField(required=False, nullable=True)
 
 
+@compiled
+@dataclass
+class OnlineScoreBatchRequest:
+    items: list[dict] | None = BatchField(required=True, nullable=False)
+
+
+@compiled
+@dataclass
+class ProfileRequest:
+    seconds: int | None = SecondsField(required=False, nullable=True)
+
+
+@compiled
 @dataclass
 class MethodRequest:
     account: str = CharField(required=False, nullable=True)
@@ -1,17 +1,33 @@
 """Business logic module."""
 
 import logging
+from typing import AsyncIterator, Iterator
 
-from src.schemas import OnlineScoreRequest, ClientsInterestsRequest
+from src.async_store import AsyncStorageManager
+from src.breaker import CircuitOpenError
+from src.constants import (
+    ERRORS, INVALID_REQUEST, PHONE_WEIGHT, EMAIL_WEIGHT, BIRTHDAY_GENDER_WEIGHT, NAME_WEIGHT, STREAM_CHUNK_SIZE,
+)
+from src.metrics import registry
+from src.schemas import OnlineScoreRequest, ClientsInterestsRequest, format_date
+from src.singleflight import SingleFlight, AsyncSingleFlight
 from src.store import StorageManager
 from src.utils import generate_uid
 
+BATCH_ITEM_ERROR = {"error": ERRORS[INVALID_REQUEST], "code": INVALID_REQUEST}
 
-def get_score(store: StorageManager, request_data: OnlineScoreRequest, login: str) -> dict:
-    """The method of calculating the user's rating."""
+score_flight = SingleFlight()
+async_score_flight = AsyncSingleFlight()
+score_cache = registry.counter(
+    "score_cache_lookups_total", "Score cache lookups: hit, miss, error or skipped while the breaker is open.",
+    ("result",),
+)
+registry.add_stats("score_flight", score_flight.stats)
+registry.add_stats("async_score_flight", async_score_flight.stats)
 
-    if login == "admin":
-        return {"score": 42}
+
+def get_score_key(request_data: OnlineScoreRequest) -> str:
+    """The method of creating the cache key of the user's rating."""
 
     if request_data.phone and isinstance(request_data.phone, int):
         request_data.phone = str(request_data.phone)
@@ -20,32 +36,67 @@ def get_score(store: StorageManager, request_data: OnlineScoreRequest, login: st
         request_data.first_name or "",
         request_data.last_name or "",
         request_data.phone or "",
-        request_data.birthday or "",
+        format_date(request_data.birthday) if request_data.birthday else "",
     ]
-    key = generate_uid(key_parts)
+    return generate_uid(key_parts)
 
-    try:
-        if (cache_score := store.get_cache(key)) is not None:
-            return {"score": float(cache_score)}
-    except:
-        logging.exception("Connection to cache storage failed.")
+
+def compute_score(request_data: OnlineScoreRequest) -> float:
+    """The method of calculating the user's rating without the cache."""
 
     score = 0
     if request_data.phone:
-        score += 1.5
+        score += PHONE_WEIGHT
     if request_data.email:
-        score += 1.5
+        score += EMAIL_WEIGHT
     if request_data.birthday and request_data.gender is not None:
-        score += 1.5
+        score += BIRTHDAY_GENDER_WEIGHT
     if request_data.first_name and request_data.last_name:
-        score += 0.5
+        score += NAME_WEIGHT
+    return score
+
+
+def load_score(store: StorageManager, key: str, request_data: OnlineScoreRequest) -> float:
+    """The method reads the rating from Redis or calculates and caches it, the caller checks the in-process cache."""
+
+    try:
+        if (cache_score := store.get_cache(key, local=False)) is not None:
+            score_cache.inc("hit")
+            return float(cache_score)
+        score_cache.inc("miss")
+    except CircuitOpenError:
+        score_cache.inc("skipped")
+    except:
+        score_cache.inc("error")
+        logging.exception("Connection to cache storage failed.")
+
+    score = compute_score(request_data)
 
     try:
         store.set_cache(key, score)
+    except CircuitOpenError:
+        pass
     except:
         logging.exception("Connection to cache storage failed.")
 
-    return {"score": score}
+    return score
+
+
+def get_score(store: StorageManager, request_data: OnlineScoreRequest, login: str) -> dict:
+    """The method of calculating the user's rating.
+
+    Concurrent requests with the same cache key share one cache lookup and at most one cache write.
+    The scores cached in the process are returned without the coalescing.
+    """
+
+    if login == "admin":
+        return {"score": 42}
+
+    key = get_score_key(request_data)
+    if (cache_score := store.local_cache.get(key)) is not None:
+        score_cache.inc("hit")
+        return {"score": float(cache_score)}
+    return {"score": score_flight.do(key, load_score, store, key, request_data)}
 
 
 def get_interests(store: StorageManager, request_data: ClientsInterestsRequest, login: str) -> dict:
@@ -54,5 +105,180 @@ def get_interests(store: StorageManager, request_data: ClientsInterestsRequest,
     if login == "admin":
         return {"admin": ["all"]}
 
-    return {str(client_id): store.get_all_list_data(str(client_id)) for client_id in request_data.client_ids}
+    keys = [str(client_id) for client_id in request_data.client_ids]
+    return dict(zip(keys, store.get_many_list_data(keys)))
+
+
+def iter_interests(
+        store: StorageManager, request_data: ClientsInterestsRequest, login: str, chunk_size: int = STREAM_CHUNK_SIZE
+) -> Iterator[dict]:
+    """The streaming version of `get_interests`, the parts of the response are fetched `chunk_size` ids at a time."""
+
+    if login == "admin":
+        yield {"admin": ["all"]}
+        return
+
+    keys = [str(client_id) for client_id in request_data.client_ids]
+    for i in range(0, len(keys), chunk_size):
+        yield dict(zip(keys[i:i + chunk_size], store.get_many_list_data(keys[i:i + chunk_size])))
+
+
+def get_scores(store: StorageManager, requests: list[OnlineScoreRequest | None], login: str) -> dict:
+    """The method of calculating the ratings of many users.
+
+    Invalid requests are passed as None and get an error in their place of the result.
+    """
+
+    if login == "admin":
+        return {"scores": [{"score": 42} if r is not None else BATCH_ITEM_ERROR for r in requests]}
+
+    keys = [get_score_key(r) if r is not None else None for r in requests]
+    unique_keys = list(dict.fromkeys(key for key in keys if key is not None))
+
+    cached = {}
+    try:
+        cached = dict(zip(unique_keys, store.get_many_cache(unique_keys)))
+    except CircuitOpenError:
+        score_cache.inc("skipped", amount=len(unique_keys))
+    except:
+        score_cache.inc("error", amount=len(unique_keys))
+        logging.exception("Connection to cache storage failed.")
+    else:
+        hits = sum(value is not None for value in cached.values())
+        score_cache.inc("hit", amount=hits)
+        score_cache.inc("miss", amount=len(cached) - hits)
+
+    scores, misses = [], {}
+    for request_data, key in zip(requests, keys):
+        if request_data is None:
+            scores.append(BATCH_ITEM_ERROR)
+        elif (cache_score := cached.get(key)) is not None:
+            scores.append({"score": float(cache_score)})
+        else:
+            misses[key] = score = compute_score(request_data)
+            scores.append({"score": score})
+
+    try:
+        if misses:
+            store.set_many_cache(misses)
+    except CircuitOpenError:
+        pass
+    except:
+        logging.exception("Connection to cache storage failed.")
+
+    return {"scores": scores}
+
+
+async def load_score_async(
+        store: type[AsyncStorageManager], key: str, request_data: OnlineScoreRequest
+) -> float:
+    """The asynchronous version of `load_score`."""
+
+    try:
+        if (cache_score := await store.get_cache(key, local=False)) is not None:
+            score_cache.inc("hit")
+            return float(cache_score)
+        score_cache.inc("miss")
+    except CircuitOpenError:
+        score_cache.inc("skipped")
+    except:
+        score_cache.inc("error")
+        logging.exception("Connection to cache storage failed.")
+
+    score = compute_score(request_data)
+
+    try:
+        await store.set_cache(key, score)
+    except CircuitOpenError:
+        pass
+    except:
+        logging.exception("Connection to cache storage failed.")
+
+    return score
+
+
+async def get_score_async(store: type[AsyncStorageManager], request_data: OnlineScoreRequest, login: str) -> dict:
+    """The asynchronous version of `get_score` working with `AsyncStorageManager`."""
+
+    if login == "admin":
+        return {"score": 42}
+
+    key = get_score_key(request_data)
+    if (cache_score := store.local_cache.get(key)) is not None:
+        score_cache.inc("hit")
+        return {"score": float(cache_score)}
+    return {"score": await async_score_flight.do(key, load_score_async, store, key, request_data)}
+
+
+async def get_interests_async(
+        store: type[AsyncStorageManager], request_data: ClientsInterestsRequest, login: str
+) -> dict:
+    """The asynchronous version of `get_interests` working with `AsyncStorageManager`."""
+
+    if login == "admin":
+        return {"admin": ["all"]}
+
+    keys = [str(client_id) for client_id in request_data.client_ids]
+    return dict(zip(keys, await store.get_many_list_data(keys)))
+
+
+async def iter_interests_async(
+        store: type[AsyncStorageManager],
+        request_data: ClientsInterestsRequest,
+        login: str,
+        chunk_size: int = STREAM_CHUNK_SIZE,
+) -> AsyncIterator[dict]:
+    """The asynchronous version of `iter_interests` working with `AsyncStorageManager`."""
+
+    if login == "admin":
+        yield {"admin": ["all"]}
+        return
+
+    keys = [str(client_id) for client_id in request_data.client_ids]
+    for i in range(0, len(keys), chunk_size):
+        yield dict(zip(keys[i:i + chunk_size], await store.get_many_list_data(keys[i:i + chunk_size])))
+
+
+async def get_scores_async(
+        store: type[AsyncStorageManager], requests: list[OnlineScoreRequest | None], login: str
+) -> dict:
+    """The asynchronous version of `get_scores` working with `AsyncStorageManager`."""
+
+    if login == "admin":
+        return {"scores": [{"score": 42} if r is not None else BATCH_ITEM_ERROR for r in requests]}
+
+    keys = [get_score_key(r) if r is not None else None for r in requests]
+    unique_keys = list(dict.fromkeys(key for key in keys if key is not None))
+
+    cached = {}
+    try:
+        cached = dict(zip(unique_keys, await store.get_many_cache(unique_keys)))
+    except CircuitOpenError:
+        score_cache.inc("skipped", amount=len(unique_keys))
+    except:
+        score_cache.inc("error", amount=len(unique_keys))
+        logging.exception("Connection to cache storage failed.")
+    else:
+        hits = sum(value is not None for value in cached.values())
+        score_cache.inc("hit", amount=hits)
+        score_cache.inc("miss", amount=len(cached) - hits)
+
+    scores, misses = [], {}
+    for request_data, key in zip(requests, keys):
+        if request_data is None:
+            scores.append(BATCH_ITEM_ERROR)
+        elif (cache_score := cached.get(key)) is not None:
+            scores.append({"score": float(cache_score)})
+        else:
+            misses[key] = score = compute_score(request_data)
+            scores.append({"score": score})
+
+    try:
+        if misses:
+            await store.set_many_cache(misses)
+    except CircuitOpenError:
+        pass
+    except:
+        logging.exception("Connection to cache storage failed.")
 
+    return {"scores": scores}
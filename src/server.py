@@ -0,0 +1,182 @@
+"""Server module."""
+
+import logging
+import os
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from typing import Callable
+
+from src.constants import REQUEST_QUEUE_SIZE, WORKER_STOP_TIMEOUT, WORKER_RESTART_DELAY
+
+
+class SerialHTTPServer(HTTPServer):
+    """The HTTP server that handles connections one by one."""
+
+    request_queue_size = REQUEST_QUEUE_SIZE
+
+    def is_saturated(self) -> bool:
+        """The method tells whether a connection is waiting for an idle persistent one to close."""
+
+        return False
+
+
+class ThreadPoolHTTPServer(SerialHTTPServer):
+    """The HTTP server that handles connections in a fixed pool of threads."""
+
+    def __init__(
+            self,
+            server_address: tuple[str, int],
+            handler: type[BaseHTTPRequestHandler],
+            threads: int,
+            bind_and_activate: bool = True,
+    ):
+        self.threads = threads
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="http")
+        # the connections being handled or waiting for a thread
+        self.connections = 0
+        self.lock = threading.Lock()
+        super().__init__(server_address, handler, bind_and_activate)
+
+    def is_saturated(self) -> bool:
+        """The method tells whether a connection is waiting for a thread.
+
+        An idle persistent connection holds its thread until the keep-alive timeout,
+        so it gives the thread up to the waiting one.
+        """
+
+        return self.connections > self.threads
+
+    def process_request_thread(self, request, client_address) -> None:
+        """The method handles one connection in a worker thread."""
+
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            with self.lock:
+                self.connections -= 1
+
+    def process_request(self, request, client_address) -> None:
+        with self.lock:
+            self.connections += 1
+        self.executor.submit(self.process_request_thread, request, client_address)
+
+    def server_close(self) -> None:
+        """The method stops accepting connections and waits for the ones in progress."""
+
+        super().server_close()
+        self.executor.shutdown(wait=True)
+
+
+def make_server(
+        server_address: tuple[str, int],
+        handler: type[BaseHTTPRequestHandler],
+        threads: int = 0,
+        reuse_port: bool = False,
+) -> HTTPServer:
+    """The method for creating a serial (threads=0) or a thread pool server.
+
+    With `reuse_port` several processes can listen on the same port (SO_REUSEPORT),
+    the kernel balances new connections between them.
+    """
+
+    if threads > 0:
+        server = ThreadPoolHTTPServer(server_address, handler, threads, bind_and_activate=False)
+    else:
+        server = SerialHTTPServer(server_address, handler, bind_and_activate=False)
+    server.allow_reuse_port = reuse_port
+    try:
+        server.server_bind()
+        server.server_activate()
+    except:
+        server.server_close()
+        raise
+    return server
+
+
+class PreforkSupervisor:
+    """The supervisor of worker processes.
+
+    Every worker runs `target` in a forked process. Dead workers are restarted,
+    SIGTERM/SIGINT are passed to the workers, the ones not stopped in time are killed.
+    SIGUSR1 is passed to the workers as it is, so each of them takes a profile.
+    """
+
+    def __init__(self, workers: int, target: Callable[[], None]):
+        self.workers = workers
+        self.target = target
+        self.pids = set()
+        self.stopping = False
+
+    def spawn(self) -> int:
+        """The method starts one worker process."""
+
+        pid = os.fork()
+        if pid == 0:
+            for signum in (signal.SIGTERM, signal.SIGALRM):
+                signal.signal(signum, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.default_int_handler)
+            # the worker installs its own handler, until then the signal must not kill it
+            signal.signal(signal.SIGUSR1, signal.SIG_IGN)
+            code = 0
+            try:
+                self.target()
+            except:
+                logging.exception("Worker %s failed." % os.getpid())
+                code = 1
+            finally:
+                logging.shutdown()
+                os._exit(code)
+
+        self.pids.add(pid)
+        logging.info("Worker %s started." % pid)
+        return pid
+
+    def stop(self, signum=None, frame=None) -> None:
+        """The method asks the workers to stop and schedules killing of the hung ones."""
+
+        if self.stopping:
+            return
+        self.stopping = True
+        for pid in self.pids:
+            os.kill(pid, signal.SIGTERM)
+        signal.alarm(WORKER_STOP_TIMEOUT)
+
+    def forward(self, signum, frame=None) -> None:
+        for pid in self.pids:
+            os.kill(pid, signum)
+
+    def kill(self, signum=None, frame=None) -> None:
+        for pid in self.pids:
+            logging.error("Worker %s did not stop in time, killing." % pid)
+            os.kill(pid, signal.SIGKILL)
+
+    def run(self) -> None:
+        """The method starts the workers and supervises them until they are all stopped."""
+
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        signal.signal(signal.SIGALRM, self.kill)
+        signal.signal(signal.SIGUSR1, self.forward)
+        for _ in range(self.workers):
+            self.spawn()
+
+        while self.pids:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            self.pids.discard(pid)
+            if self.stopping:
+                continue
+            logging.error("Worker %s exited with status %s, restarting." % (pid, os.waitstatus_to_exitcode(status)))
+            time.sleep(WORKER_RESTART_DELAY)
+            if not self.stopping:
+                self.spawn()
+
+        signal.alarm(0)
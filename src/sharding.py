@@ -0,0 +1,203 @@
+"""Sharded cache storage module."""
+
+import bisect
+import hashlib
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterable
+
+from redis.client import Redis
+
+from src.constants import TTL, TIMEOUT, VNODES
+from src.store import StorageManager, make_client
+
+
+def parse_node(node: str) -> tuple[str, int]:
+    """The method splits "host:port" into its parts."""
+
+    host, _, port = node.rpartition(":")
+    return host, int(port)
+
+
+class HashRing:
+    """The consistent hashing ring, every node is placed on it `vnodes` times.
+
+    Adding or removing a node moves only the keys of the ring segments it takes or gives back,
+    about 1/N of all keys.
+    """
+
+    def __init__(self, nodes: Iterable[str] = (), vnodes: int = VNODES):
+        self.vnodes = vnodes
+        self.hashes = []
+        self.owners = []
+        self.nodes = set()
+        for node in nodes:
+            self.add_node(node)
+
+    @staticmethod
+    def hash(key: str) -> int:
+        return int.from_bytes(hashlib.md5(key.encode('utf-8')).digest()[:8], "big")
+
+    def add_node(self, node: str) -> None:
+        if node in self.nodes:
+            return
+        self.nodes.add(node)
+        for i in range(self.vnodes):
+            point = self.hash("%s#%s" % (node, i))
+            index = bisect.bisect(self.hashes, point)
+            self.hashes.insert(index, point)
+            self.owners.insert(index, node)
+
+    def remove_node(self, node: str) -> None:
+        if node not in self.nodes:
+            return
+        self.nodes.remove(node)
+        points = [(point, owner) for point, owner in zip(self.hashes, self.owners) if owner != node]
+        self.hashes = [point for point, _ in points]
+        self.owners = [owner for _, owner in points]
+
+    def get_node(self, key: str) -> str:
+        """The method returns the node owning the key: the first point clockwise from the key hash."""
+
+        index = bisect.bisect(self.hashes, self.hash(key))
+        return self.owners[index % len(self.owners)]
+
+
+class ShardedStorageManager(StorageManager):
+    """The storage spreading keys over several Redis nodes with consistent hashing.
+
+    Single-key methods go to the owner node, batch methods are split per node
+    and the parts are executed in parallel.
+    """
+
+    ring = HashRing()
+    clients = {}
+    executor = None
+
+    @classmethod
+    def configure(cls, nodes: list[str], vnodes: int = VNODES, max_connections: int | None = None) -> None:
+        """The method sets the "host:port" list of nodes, creating a client for each of them."""
+
+        cls.clients = {node: make_client(*parse_node(node), max_connections=max_connections) for node in nodes}
+        cls.ring = HashRing(nodes, vnodes)
+        cls.client = cls.clients[nodes[0]]
+        cls.executor = ThreadPoolExecutor(max_workers=len(nodes), thread_name_prefix="shard")
+        cls.breaker.probe = cls.ping
+
+    @classmethod
+    def ping(cls) -> None:
+        for client in cls.clients.values():
+            client.ping()
+
+    @classmethod
+    def close(cls) -> None:
+        for client in cls.clients.values():
+            client.close()
+        if cls.executor is not None:
+            cls.executor.shutdown()
+
+    @classmethod
+    def client_for(cls, key: str) -> Redis:
+        return cls.clients[cls.ring.get_node(key)]
+
+    @classmethod
+    def map_shards(cls, keys: Iterable[str], func: Callable[[Redis, list[str]], Any]) -> dict[str, Any]:
+        """The method calls `func(client, node_keys)` for every node in parallel.
+
+        `func` returns one value per key or None, the values are returned by key.
+        """
+
+        groups = defaultdict(list)
+        for key in keys:
+            groups[cls.ring.get_node(key)].append(key)
+        futures = [(node_keys, cls.executor.submit(func, cls.clients[node], node_keys))
+                   for node, node_keys in groups.items()]
+
+        results = {}
+        for node_keys, future in futures:
+            if (values := future.result()) is not None:
+                results.update(zip(node_keys, values))
+        return results
+
+    @classmethod
+    def set_many_cache(cls, data: dict[str, Any], ttl: int | None = None) -> None:
+        def write(client: Redis, keys: list[str]) -> None:
+            pipe = client.pipeline(transaction=False)
+            for key in keys:
+                pipe.set(key, data[key], ex=ttl or TTL)
+            pipe.execute()
+
+        with cls.breaker:
+            cls.map_shards(data, write)
+        for key, value in data.items():
+            cls.local_cache.set(key, value, ttl or TTL)
+
+    @classmethod
+    def get_many_data(cls, keys: list[str]) -> list[str]:
+        results = cls.map_shards(keys, lambda client, node_keys: client.mget(node_keys))
+        return [results[key] for key in keys]
+
+    @classmethod
+    def get_many_primary_data(cls, keys: list[str]) -> list[str]:
+        return cls.get_many_data(keys)
+
+    @classmethod
+    def get_many_lists(cls, keys: list[str]) -> list[list]:
+        def read(client: Redis, node_keys: list[str]) -> list[list]:
+            pipe = client.pipeline(transaction=False)
+            for key in node_keys:
+                pipe.lrange(key, 0, -1)
+            return pipe.execute()
+
+        results = cls.map_shards(keys, read)
+        return [results[key] for key in keys]
+
+    @classmethod
+    def set_many_data(cls, data: dict[str, Any]) -> None:
+        cls.map_shards(data, lambda client, node_keys: client.mset({key: data[key] for key in node_keys}))
+
+    @classmethod
+    def replace_many_list_data(cls, data: dict[str, list]) -> None:
+        """The method replaces many lists, one transaction per node."""
+
+        if cls.interests is not None:
+            cls.interests.intern(cls.client_for(cls.interests.key), (v for values in data.values() for v in values))
+        cls.map_shards(data, lambda client, node_keys: cls.replace_lists(client, {key: data[key] for key in node_keys}))
+
+    @classmethod
+    def del_many_data(cls, *args) -> None:
+        cls.map_shards(args, lambda client, node_keys: client.delete(*node_keys))
+        cls.local_cache.delete(*args)
+
+    @classmethod
+    def reshard(cls, nodes: list[str], batch: int = 1000) -> int:
+        """The method switches to a new list of nodes and moves the keys to their new owners.
+
+        Keys are moved with MIGRATE, so the nodes must reach each other by the given addresses.
+        Returns the number of moved keys.
+        """
+
+        ring = HashRing(nodes, cls.ring.vnodes)
+        clients = {node: cls.clients.get(node) or make_client(*parse_node(node)) for node in nodes}
+        moved = 0
+        for node, client in cls.clients.items():
+            targets = defaultdict(list)
+            for key in client.scan_iter(count=batch):
+                if (owner := ring.get_node(key)) != node:
+                    targets[owner].append(key)
+            for owner, keys in targets.items():
+                host, port = parse_node(owner)
+                for i in range(0, len(keys), batch):
+                    client.migrate(host, port, keys[i:i + batch], 0, TIMEOUT * 1000, replace=True)
+                moved += len(keys)
+
+        for node, client in cls.clients.items():
+            if node not in clients:
+                client.close()
+        if cls.executor is not None:
+            cls.executor.shutdown()
+        cls.clients, cls.ring = clients, ring
+        cls.client = clients[nodes[0]]
+        cls.executor = ThreadPoolExecutor(max_workers=len(nodes), thread_name_prefix="shard")
+        cls.local_cache.clear()
+        return moved
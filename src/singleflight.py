@@ -0,0 +1,103 @@
+"""Request coalescing module."""
+
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Hashable
+
+
+class Call:
+    """One execution shared by the callers with the same key.
+
+    The event is only created when a second caller arrives, a call without waiters does not need it.
+    """
+
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = None
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Concurrent calls with the same key in different threads share one execution.
+
+    The first caller runs the function, the others wait and get its result or its exception.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.executions = 0
+        self.shared = 0
+
+    def do(self, key: Hashable, func: Callable[..., Any], *args) -> Any:
+        with self.lock:
+            if (call := self.calls.get(key)) is None:
+                call = self.calls[key] = Call()
+                self.executions += 1
+                leader = True
+            else:
+                self.shared += 1
+                leader = False
+                if call.event is None:
+                    call.event = threading.Event()
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func(*args)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+                # no waiter can arrive after the call is removed
+                event = call.event
+            if event is not None:
+                event.set()
+        return call.result
+
+    def stats(self) -> dict[str, int]:
+        return {"executions": self.executions, "shared": self.shared}
+
+
+class AsyncSingleFlight:
+    """Concurrent calls with the same key in one event loop share one execution."""
+
+    def __init__(self):
+        self.calls = {}
+        self.executions = 0
+        self.shared = 0
+
+    async def do(self, key: Hashable, func: Callable[..., Awaitable[Any]], *args) -> Any:
+        if (future := self.calls.get(key)) is not None:
+            self.shared += 1
+            # a cancelled waiter must not cancel the execution shared with the others
+            return await asyncio.shield(future)
+
+        future = self.calls[key] = asyncio.get_running_loop().create_future()
+        self.executions += 1
+        try:
+            result = await func(*args)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # mark the exception as retrieved when nobody is waiting
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+        finally:
+            del self.calls[key]
+        return result
+
+    def stats(self) -> dict[str, int]:
+        return {"executions": self.executions, "shared": self.shared}
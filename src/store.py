@@ -1,50 +1,265 @@
 """Cache storage module."""
 
-from typing import Any
+import time
+from typing import Any, Callable
 
-from redis.client import Redis
+from redis.client import Pipeline, Redis
 from redis.backoff import ExponentialBackoff
 from redis.retry import Retry
 from redis.exceptions import BusyLoadingError, ConnectionError, TimeoutError
 
-from src.constants import TIMEOUT, RETRY, TTL
+from src.breaker import CircuitBreaker
+from src.cache import LRUCache, should_refresh_early
+from src.constants import (
+    TIMEOUT, RETRY, TTL, REDIS_HOST, REDIS_PORT, L1_CACHE_SIZE, L1_CACHE_TTL, BREAKER_FAILURES,
+    BREAKER_RECOVERY_TIMEOUT, EARLY_REFRESH_BETA, EARLY_REFRESH_DELTA, REPLICA_STRATEGY,
+)
+from src.interests import InterestDictionary
+from src.metrics import registry
+from src.replicas import ReplicaSet
+from src.tracing import CLIENT, tracer
 
+redis_latency = registry.histogram(
+    "redis_command_duration_seconds", "Redis round-trips by command, a pipeline is one round-trip.", ("command",)
+)
+redis_errors = registry.counter("redis_command_errors_total", "Failed Redis round-trips by command.", ("command",))
+
+
+class TimedPipeline(Pipeline):
+
+    def execute(self, raise_on_error: bool = True) -> list:
+        command = "MULTI" if self.transaction else "PIPELINE"
+        start = time.perf_counter()
+        try:
+            return super().execute(raise_on_error)
+        except Exception:
+            redis_errors.inc(command)
+            raise
+        finally:
+            end = time.perf_counter()
+            redis_latency.observe(end - start, command)
+            if tracer.enabled:
+                tracer.record("redis", start, end, CLIENT, command=command)
+
+
+class TimedRedis(Redis):
+    """The client recording the latency of every round-trip, the retries included."""
+
+    def execute_command(self, *args, **options) -> Any:
+        start = time.perf_counter()
+        try:
+            return super().execute_command(*args, **options)
+        except Exception:
+            redis_errors.inc(args[0])
+            raise
+        finally:
+            end = time.perf_counter()
+            redis_latency.observe(end - start, args[0])
+            if tracer.enabled:
+                tracer.record("redis", start, end, CLIENT, command=args[0])
+
+    def pipeline(self, transaction: bool = True, shard_hint: str | None = None) -> TimedPipeline:
+        return TimedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
 
-class StorageManager:
 
-    client = Redis(
-        host="0.0.0.0",
-        port=6379,
+def make_client(
+        host: str = REDIS_HOST, port: int = REDIS_PORT, max_connections: int | None = None, retries: int = RETRY
+) -> Redis:
+    """The method for creating a Redis client.
+
+    The client is thread-safe: every command takes a connection from the pool and returns it,
+    so `max_connections` should be at least the number of threads using the client.
+    """
+
+    return TimedRedis(
+        host=host,
+        port=port,
         socket_timeout=TIMEOUT,
-        retry=Retry(ExponentialBackoff(), RETRY),
+        retry=Retry(ExponentialBackoff(), retries),
         retry_on_error=[BusyLoadingError, ConnectionError, TimeoutError],
         decode_responses=True,
+        max_connections=max_connections,
     )
 
+
+class StorageManager:
+
+    client = make_client()
+    local_cache = LRUCache(L1_CACHE_SIZE, L1_CACHE_TTL)
+    early_refreshes = 0
+    replicas = None
+    interests = None
+    breaker = CircuitBreaker(BREAKER_FAILURES, BREAKER_RECOVERY_TIMEOUT, probe=client.ping, name="cache")
+
+    @classmethod
+    def connect(cls, host: str = REDIS_HOST, port: int = REDIS_PORT, max_connections: int | None = None) -> None:
+        """The method replaces the client with a new one with its own connection pool."""
+
+        cls.client = make_client(host, port, max_connections)
+        cls.breaker.probe = cls.client.ping
+
+    @classmethod
+    def connect_replicas(
+            cls, nodes: list[tuple[str, int]], strategy: str = REPLICA_STRATEGY, max_connections: int | None = None
+    ) -> None:
+        """The method sends the reads of the data methods to the replicas, the writes stay on the primary.
+
+        The replica clients do not retry: a failed read is repeated on the primary at once.
+        """
+
+        cls.replicas = ReplicaSet(
+            {"%s:%s" % node: make_client(*node, max_connections=max_connections, retries=0) for node in nodes},
+            strategy,
+        )
+
+    @classmethod
+    def encode_interests(cls) -> None:
+        """The method switches the list methods to the encoded interest lists, see `src.interests`.
+
+        The existing lists must be migrated first: `python -m src.interests`.
+        """
+
+        cls.interests = InterestDictionary()
+        cls.interests.refresh(cls.client_for(cls.interests.key))
+
+    @classmethod
+    def decode_interests(cls, values: list[str | None]) -> list[list]:
+        """The method decodes the encoded lists, reloading the dictionary if some ids are new."""
+
+        if not all(cls.interests.is_known(value) for value in values):
+            cls.interests.refresh(cls.client_for(cls.interests.key))
+        return [cls.interests.decode(value) for value in values]
+
+    @classmethod
+    def close(cls) -> None:
+        """The method closes all connections of the pool."""
+
+        cls.client.close()
+        if cls.replicas is not None:
+            cls.replicas.close()
+
+    @classmethod
+    def read(cls, func: Callable[[Redis], Any], key: str | None = None) -> Any:
+        """The method runs a read-only `func(client)` on a replica if there are any."""
+
+        if cls.replicas is not None:
+            return cls.replicas.read(func, cls.client)
+        return func(cls.client_for(key) if key is not None else cls.client)
+
+    @classmethod
+    def client_for(cls, key: str) -> Redis:
+        """The method returns the client of the node holding the key."""
+
+        return cls.client
+
     @classmethod
-    def get_cache(cls, key: str) -> Any:
-        return cls.client.get(key)
+    def get_cache(cls, key: str, local: bool = True) -> Any:
+        """The method reads the in-process cache first, then Redis, `local=False` reads only Redis.
+
+        A value read from Redis is kept in the process no longer than its remaining Redis TTL.
+        A value close to expiration may be reported as missing, so that it is recomputed early.
+        While the circuit breaker is open `CircuitOpenError` is raised without calling Redis.
+        """
+
+        if local and (value := cls.local_cache.get(key)) is not None:
+            return value
+
+        pipe = cls.client_for(key).pipeline(transaction=False)
+        pipe.get(key)
+        pipe.ttl(key)
+        with cls.breaker:
+            value, ttl = pipe.execute()
+        if value is None:
+            return None
+        if should_refresh_early(ttl, EARLY_REFRESH_DELTA, EARLY_REFRESH_BETA):
+            cls.early_refreshes += 1
+            return None
+        if ttl > 0:
+            cls.local_cache.set(key, value, ttl)
+        return value
 
     @classmethod
     def set_cache(cls, key: str, value: Any, ttl: int | None = None) -> None:
-        cls.client.set(key, value, ex=ttl or TTL)
+        with cls.breaker:
+            cls.client_for(key).set(key, value, ex=ttl or TTL)
+        cls.local_cache.set(key, value, ttl or TTL)
+
+    @classmethod
+    def get_many_cache(cls, keys: list[str]) -> list[Any]:
+        """The method reads many keys: the in-process cache first, then one MGET on the primary for the rest."""
+
+        values = [cls.local_cache.get(key) for key in keys]
+        if missing := [key for key, value in zip(keys, values) if value is None]:
+            with cls.breaker:
+                found = dict(zip(missing, cls.get_many_primary_data(missing)))
+            values = [found[key] if value is None else value for key, value in zip(keys, values)]
+        return values
+
+    @classmethod
+    def set_many_cache(cls, data: dict[str, Any], ttl: int | None = None) -> None:
+        """The method writes many keys with expiration in one pipelined round-trip."""
+
+        pipe = cls.client.pipeline(transaction=False)
+        for key, value in data.items():
+            pipe.set(key, value, ex=ttl or TTL)
+        with cls.breaker:
+            pipe.execute()
+        for key, value in data.items():
+            cls.local_cache.set(key, value, ttl or TTL)
 
     # imitating another db
     @classmethod
     def get_data(cls, key: str) -> str:
-        return cls.client.get(key)
+        return cls.read(lambda client: client.get(key), key)
 
     @classmethod
     def get_many_data(cls, keys: list[str]) -> list[str]:
+        return cls.read(lambda client: client.mget(keys))
+
+    @classmethod
+    def get_many_primary_data(cls, keys: list[str]) -> list[str]:
+        """The method reads many keys from the primary, like the cache that the replicas may lag behind."""
+
         return cls.client.mget(keys)
 
     @classmethod
     def get_all_list_data(cls, key: str) -> list:
-        return cls.client.lrange(key, 0, cls.client.llen(key))
+        if cls.interests is not None:
+            return cls.get_many_list_data([key])[0]
+        return cls.read(lambda client: client.lrange(key, 0, -1), key)
+
+    @classmethod
+    def get_many_list_data(cls, keys: list[str]) -> list[list]:
+        """The method fetches many lists in one round-trip.
+
+        With the encoded interests the keys without a string value are read once more as lists,
+        so the lists not migrated yet are still found.
+        """
+
+        if cls.interests is None:
+            return cls.get_many_lists(keys)
+
+        packed = cls.get_many_data(keys)
+        values = cls.decode_interests(packed)
+        # MGET returns None both for a missing key and for a list
+        if missing := [key for key, value in zip(keys, packed) if value is None]:
+            lists = iter(cls.get_many_lists(missing))
+            values = [next(lists) if value is None else decoded for value, decoded in zip(packed, values)]
+        return values
+
+    @classmethod
+    def get_many_lists(cls, keys: list[str]) -> list[list]:
+        def fetch(client: Redis) -> list[list]:
+            pipe = client.pipeline(transaction=False)
+            for key in keys:
+                pipe.lrange(key, 0, -1)
+            return pipe.execute()
+
+        return cls.read(fetch)
 
     @classmethod
     def set_data(cls, key: str, value: Any) -> None:
-        cls.client.set(key, value)
+        cls.client_for(key).set(key, value)
 
     @classmethod
     def set_many_data(cls, data: dict[str, Any]) -> None:
@@ -52,8 +267,40 @@ class StorageManager:
 
     @classmethod
     def set_list_data(cls, key: str, values: list) -> None:
-        cls.client.lpush(key, *values)
+        if cls.interests is not None:
+            cls.interests.intern(cls.client_for(cls.interests.key), values)
+            cls.client_for(key).append(key, cls.interests.encode(values))
+            return
+        cls.client_for(key).lpush(key, *values)
+
+    @classmethod
+    def replace_many_list_data(cls, data: dict[str, list]) -> None:
+        """The method replaces many lists in one transaction, the values are stored in the given order."""
+
+        if cls.interests is not None:
+            cls.interests.intern(cls.client_for(cls.interests.key), (v for values in data.values() for v in values))
+        cls.replace_lists(cls.client, data)
+
+    @classmethod
+    def replace_lists(cls, client: Redis, data: dict[str, list]) -> None:
+        pipe = client.pipeline(transaction=True)
+        for key, values in data.items():
+            pipe.delete(key)
+            if values and cls.interests is not None:
+                # the encoded lists are decoded in reverse, like the ones built by LPUSH
+                pipe.set(key, cls.interests.encode(reversed(values)))
+            elif values:
+                pipe.rpush(key, *values)
+        pipe.execute()
 
     @classmethod
     def del_many_data(cls, *args) -> None:
         cls.client.delete(*args)
+        cls.local_cache.delete(*args)
+
+
+# the subclasses share the breaker and the in-process cache
+registry.add_stats("cache_breaker", StorageManager.breaker.stats, "transition")
+registry.add_stats("local_cache", StorageManager.local_cache.stats)
+registry.add_stats("cache", lambda: {"early_refreshes": StorageManager.early_refreshes})
+registry.add_stats("replicas", lambda: StorageManager.replicas and StorageManager.replicas.stats(), "replica")
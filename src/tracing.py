@@ -0,0 +1,308 @@
+"""Request tracing module.
+
+A trace is started for every API request and keyed by its request id, the phases of the request
+are its spans. Finished traces are exported in the OpenTelemetry (OTLP) JSON format to a file,
+one batch per line, or to a collector URL like http://localhost:4318/v1/traces. Requests slower
+than the threshold are logged with the time of every phase.
+
+The handlers mark the consecutive phases of a request with `phase` instead of nesting `span` blocks,
+the calls on the request path check `tracer.enabled` first: while tracing is off a phase or a Redis
+round-trip costs one attribute lookup.
+Spans of the calls made in other threads, like the parallel calls to the shards, are not recorded.
+"""
+
+import hashlib
+import logging
+import os
+import queue
+import re
+import threading
+import time
+import urllib.request
+from contextvars import ContextVar
+
+from src.codec import dumps
+from src.constants import TRACE_SERVICE_NAME, TRACE_BATCH_SIZE, TRACE_FLUSH_INTERVAL, TRACE_QUEUE_SIZE
+from src.metrics import registry
+
+# span kinds of OTLP
+INTERNAL, SERVER, CLIENT = 1, 2, 3
+STATUS_ERROR = 2
+
+TRACE_ID = re.compile(r"^[0-9a-f]{32}$")
+
+current = ContextVar("trace", default=None)
+
+
+class Span:
+    __slots__ = ("name", "span_id", "parent_id", "kind", "start", "end", "attributes", "error")
+
+    def __init__(self, name: str, parent_id: str | None, kind: int, start: float, attributes: dict):
+        self.name = name
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.kind = kind
+        self.start = start
+        self.end = start
+        self.attributes = attributes
+        self.error = None
+
+
+class Trace:
+    """The spans of one request, the first one is the request itself."""
+
+    def __init__(self, request_id: str, start: float):
+        self.request_id = request_id
+        self.trace_id = request_id if TRACE_ID.match(request_id) else hashlib.md5(request_id.encode()).hexdigest()
+        # the spans are timed with perf_counter, the offset turns them into the wall clock time
+        self.offset = time.time() - time.perf_counter()
+        self.root = Span("request", None, SERVER, start, {"request.id": request_id})
+        self.spans = [self.root]
+        self.stack = [self.root]
+        self.phase = None
+
+    def phases(self) -> dict[str, float]:
+        """The method returns the milliseconds spent in every kind of span, the nested ones are counted twice."""
+
+        phases = {}
+        for span in self.spans[1:]:
+            phases[span.name] = phases.get(span.name, 0.0) + (span.end - span.start) * 1000
+        return phases
+
+    def to_otlp(self) -> list[dict]:
+        def value(v) -> dict:
+            if isinstance(v, bool):
+                return {"boolValue": v}
+            if isinstance(v, int):
+                # 64-bit integers are strings in OTLP JSON
+                return {"intValue": str(v)}
+            if isinstance(v, float):
+                return {"doubleValue": v}
+            return {"stringValue": str(v)}
+
+        def attributes(values: dict) -> list[dict]:
+            return [{"key": key, "value": value(v)} for key, v in values.items()]
+
+        spans = []
+        for span in self.spans:
+            data = {
+                "traceId": self.trace_id,
+                "spanId": span.span_id,
+                "name": span.name,
+                "kind": span.kind,
+                "startTimeUnixNano": str(int((span.start + self.offset) * 1e9)),
+                "endTimeUnixNano": str(int((span.end + self.offset) * 1e9)),
+                "attributes": attributes(span.attributes),
+            }
+            if span.parent_id:
+                data["parentSpanId"] = span.parent_id
+            if span.error:
+                data["status"] = {"code": STATUS_ERROR, "message": span.error}
+            spans.append(data)
+        return spans
+
+
+class SpanContext:
+    """The context manager timing one span of the current trace."""
+
+    __slots__ = ("trace", "span")
+
+    def __init__(self, trace: Trace, name: str, kind: int, attributes: dict):
+        self.trace = trace
+        self.span = Span(name, trace.stack[-1].span_id, kind, 0.0, attributes)
+
+    def __enter__(self) -> Span:
+        self.trace.spans.append(self.span)
+        self.trace.stack.append(self.span)
+        self.span.start = time.perf_counter()
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.span.end = time.perf_counter()
+        self.trace.stack.pop()
+        if exc_type is not None:
+            self.span.error = exc_type.__name__
+
+
+class NoSpan:
+    """The span of a request without a trace."""
+
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        return None
+
+
+NO_SPAN = NoSpan()
+
+
+class Exporter:
+    """The exporter sending the finished traces in batches from a background thread.
+
+    The traces over `TRACE_QUEUE_SIZE` waiting ones are dropped, the request threads never wait.
+    """
+
+    def __init__(self, target: str, batch_size: int = TRACE_BATCH_SIZE, flush_interval: float = TRACE_FLUSH_INTERVAL):
+        self.target = target
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue(TRACE_QUEUE_SIZE)
+        self.thread = None
+        self.lock = threading.Lock()
+        self.exported = 0
+        self.dropped = 0
+
+    def export(self, trace: Trace) -> None:
+        # the thread of the parent process does not exist in a forked worker, it is started again
+        if self.thread is None or not self.thread.is_alive():
+            with self.lock:
+                if self.thread is None or not self.thread.is_alive():
+                    self.thread = threading.Thread(target=self.run, name="trace-exporter", daemon=True)
+                    self.thread.start()
+        try:
+            self.queue.put_nowait(trace)
+        except queue.Full:
+            self.dropped += 1
+
+    def run(self) -> None:
+        while (trace := self.queue.get()) is not None:
+            batch = [trace]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size and (timeout := deadline - time.monotonic()) > 0:
+                try:
+                    if (trace := self.queue.get(timeout=timeout)) is None:
+                        self.write(batch)
+                        return
+                except queue.Empty:
+                    break
+                batch.append(trace)
+            self.write(batch)
+
+    def write(self, batch: list[Trace]) -> None:
+        body = dumps({"resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": TRACE_SERVICE_NAME}}]},
+            "scopeSpans": [{"scope": {"name": __name__}, "spans": [span for t in batch for span in t.to_otlp()]}],
+        }]})
+        try:
+            if self.target.startswith(("http://", "https://")):
+                request = urllib.request.Request(self.target, body, {"Content-Type": "application/json"})
+                urllib.request.urlopen(request, timeout=5).close()
+            else:
+                with open(self.target, "ab") as f:
+                    f.write(body + b"\n")
+        except OSError as e:
+            logging.error("Trace export to %s failed: %s" % (self.target, e))
+            return
+        self.exported += len(batch)
+
+    def close(self) -> None:
+        """The method exports the waiting traces and stops the thread."""
+
+        if self.thread is not None and self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join()
+
+
+class Tracer:
+    """The tracer of the API requests, off until it is configured."""
+
+    def __init__(self):
+        self.enabled = False
+        self.exporter = None
+        self.slow_threshold = None
+
+    def configure(self, target: str | None = None, slow_threshold: float | None = None) -> None:
+        """The method exports the traces to `target` and logs the requests slower than `slow_threshold` ms."""
+
+        self.close()
+        self.exporter = Exporter(target) if target else None
+        self.slow_threshold = slow_threshold
+        self.enabled = self.exporter is not None or slow_threshold is not None
+
+    def start(self, request_id: str, start: float) -> Trace | None:
+        """The method starts the trace of the request handled by the calling thread or task."""
+
+        if not self.enabled:
+            return None
+        trace = Trace(request_id, start)
+        current.set(trace)
+        return trace
+
+    def span(self, name: str, kind: int = INTERNAL, **attributes) -> SpanContext | NoSpan:
+        """The method times a nested block of the current trace."""
+
+        if not self.enabled or (trace := current.get()) is None:
+            return NO_SPAN
+        return SpanContext(trace, name, kind, attributes)
+
+    @staticmethod
+    def record(name: str, start: float, end: float, kind: int = INTERNAL, **attributes) -> None:
+        """The method adds a span timed by the caller."""
+
+        if (trace := current.get()) is None:
+            return
+        span = Span(name, trace.stack[-1].span_id, kind, start, attributes)
+        span.end = end
+        trace.spans.append(span)
+
+    @staticmethod
+    def phase(name: str | None) -> None:
+        """The method ends the current phase of the request and starts the next one, None only ends it.
+
+        A phase is a child of the request span, the spans of its calls are its children.
+        """
+
+        if (trace := current.get()) is None:
+            return
+        now = time.perf_counter()
+        if trace.phase is not None:
+            trace.phase.end = now
+            trace.stack.remove(trace.phase)
+            trace.phase = None
+        if name is not None:
+            trace.phase = Span(name, trace.root.span_id, INTERNAL, now, {})
+            trace.spans.append(trace.phase)
+            trace.stack.append(trace.phase)
+
+    @staticmethod
+    def fail(error: BaseException) -> None:
+        """The method marks the current phase as failed."""
+
+        if (trace := current.get()) is not None:
+            (trace.phase or trace.root).error = type(error).__name__
+
+    def finish(self, name: str, **attributes) -> None:
+        """The method ends the trace of the calling thread or task, logs it if slow and exports it."""
+
+        if (trace := current.get()) is None:
+            return
+        current.set(None)
+        trace.root.end = time.perf_counter()
+        if trace.phase is not None:
+            trace.phase.end = trace.root.end
+        trace.root.name = name
+        trace.root.attributes.update(attributes)
+
+        duration = (trace.root.end - trace.root.start) * 1000
+        if self.slow_threshold is not None and duration >= self.slow_threshold:
+            fields = {"request_id": trace.request_id, "trace_id": trace.trace_id, "duration_ms": round(duration, 3),
+                      "phases_ms": {phase: round(ms, 3) for phase, ms in trace.phases().items()}}
+            logging.info("Slow request %s: %.1f ms" % (name, duration), extra={"fields": fields})
+        if self.exporter is not None:
+            self.exporter.export(trace)
+
+    def close(self) -> None:
+        if self.exporter is not None:
+            self.exporter.close()
+
+    def stats(self) -> dict[str, int] | None:
+        if self.exporter is None:
+            return None
+        return {"exported": self.exporter.exported, "dropped": self.exporter.dropped}
+
+
+tracer = Tracer()
+registry.add_stats("trace_exporter", tracer.stats)
@@ -3,27 +3,72 @@
 import datetime
 import hashlib
 import logging
+import time
 
-from src.constants import SALT, ADMIN_SALT
+from src.cache import LRUCache
+from src.constants import SALT, ADMIN_SALT, AUTH_CACHE_SIZE, ADMIN_TOKEN_GRACE
+from src.metrics import registry
 from src.schemas import MethodRequest
 
 
+class AdminDigest:
+    """The expected admin tokens, computed once an hour.
+
+    The token of the current hour is always valid, the tokens of the previous and the next hour
+    are valid for `grace` seconds around the hour boundary.
+    """
+
+    def __init__(self, grace: float):
+        self.grace = grace
+        self.rotations = 0
+        # (valid until, hour start, previous, current, next)
+        self.state = (0.0, 0.0, None, None, None)
+
+    @staticmethod
+    def make_digest(hour: datetime.datetime) -> str:
+        return hashlib.sha512((hour.strftime("%Y%m%d%H") + ADMIN_SALT).encode('utf-8')).hexdigest()
+
+    def rotate(self) -> tuple:
+        hour = datetime.datetime.now().replace(minute=0, second=0, microsecond=0)
+        delta = datetime.timedelta(hours=1)
+        self.state = (
+            (hour + delta).timestamp(),
+            hour.timestamp(),
+            self.make_digest(hour - delta),
+            self.make_digest(hour),
+            self.make_digest(hour + delta),
+        )
+        self.rotations += 1
+        return self.state
+
+    def verify(self, token: str) -> bool:
+        now = time.time()
+        valid_until, hour_start, previous, current, next_ = self.state
+        if now >= valid_until:
+            valid_until, hour_start, previous, current, next_ = self.rotate()
+
+        return (
+            token == current
+            or token == previous and now - hour_start < self.grace
+            or token == next_ and valid_until - now < self.grace
+        )
+
+
+# only successful checks are cached, so wrong tokens can not push the valid ones out
+verified_tokens = LRUCache(AUTH_CACHE_SIZE)
+admin_digest = AdminDigest(ADMIN_TOKEN_GRACE)
+
+
 def get_auth_data(request: dict):
     """Method for validating authorization data."""
 
     try:
-        auth_data = MethodRequest(
-            account=request.get("account"),
-            login=request.get("login"),
-            token=request.get("token"),
-            arguments=request.get("arguments"),
-            method=request.get("method"),
-        )
+        auth_data = MethodRequest.from_dict(request)
     except AttributeError as e:
-        logging.exception("Attribute error: %s" % e)
+        logging.error("Attribute error: %s", e)
         auth_data = None
     except ValueError as e:
-        logging.exception("Value error: %s" % e)
+        logging.error("Value error: %s", e)
         auth_data = None
 
     return auth_data
@@ -33,10 +78,25 @@ def check_auth(auth_data):
     """The method for verifying the token."""
 
     if auth_data.is_admin:
-        digest = hashlib.sha512((datetime.datetime.now().strftime("%Y%m%d%H") + ADMIN_SALT).encode('utf-8')).hexdigest()
-    else:
-        digest = hashlib.sha512((auth_data.account + auth_data.login + SALT).encode('utf-8')).hexdigest()
-    return digest == auth_data.token
+        return admin_digest.verify(auth_data.token)
+
+    key = (auth_data.account, auth_data.login, auth_data.token)
+    if verified_tokens.get(key):
+        return True
+    digest = hashlib.sha512((auth_data.account + auth_data.login + SALT).encode('utf-8')).hexdigest()
+    if digest != auth_data.token:
+        return False
+    verified_tokens.set(key, True)
+    return True
+
+
+def get_auth_stats() -> dict:
+    """The method returns the counters of the token checks without hashing."""
+
+    return {"tokens": verified_tokens.stats(), "admin_rotations": admin_digest.rotations}
+
+
+registry.add_stats("auth", get_auth_stats, "stat")
 
 
 def is_online_score_request_valid(online_score_request):
@@ -34,10 +34,10 @@ class TestSuite(unittest.TestCase):
         body = json.dumps(request)
         conn.request("POST", f"/{request.get('method', '')}", body=body, headers=self.headers)
         response = conn.getresponse()
-        conn.close()
-
+        # the body of a persistent HTTP/1.1 connection is dropped by close, it is read first
         status = response.status
         response = json.loads(response.read())
+        conn.close()
         if resp_data := response.get("response"):
             return resp_data, status
         return response, status
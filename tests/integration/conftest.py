@@ -1,10 +1,47 @@
 """Pytest fixtures."""
 
+import shutil
+import subprocess
+import time
+
 import pytest
+from redis.exceptions import ConnectionError
 
-from src.store import StorageManager
+from src.sharding import ShardedStorageManager, parse_node
+from src.store import StorageManager, make_client
 
 
 @pytest.fixture()
 def storage_manager():
     yield StorageManager
+
+
+@pytest.fixture()
+def redis_nodes():
+    """Local redis-server processes without persistence."""
+
+    if not shutil.which("redis-server"):
+        pytest.skip("redis-server is not installed")
+
+    processes, nodes = [], []
+    for port in (7101, 7102, 7103, 7104):
+        processes.append(subprocess.Popen(
+            ["redis-server", "--port", str(port), "--save", "", "--appendonly", "no"],
+            stdout=subprocess.DEVNULL,
+        ))
+        nodes.append("127.0.0.1:%s" % port)
+    for node in nodes:
+        client = make_client(*parse_node(node))
+        for _ in range(50):
+            try:
+                client.ping()
+                break
+            except ConnectionError:
+                time.sleep(0.1)
+
+    yield nodes
+
+    ShardedStorageManager.close()
+    for process in processes:
+        process.terminate()
+        process.wait()
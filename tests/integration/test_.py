@@ -5,6 +5,7 @@ from random import sample
 
 import pytest
 
+from src.interests import InterestDictionary, migrate
 from src.schemas import OnlineScoreRequest, ClientsInterestsRequest
 from src.scoring import get_score, get_interests
 from src.utils import generate_uid
@@ -93,3 +94,43 @@ def test_get_admin_interests(storage_manager):
     result = get_interests(storage_manager, request_data, "admin")
 
     assert result == {"admin": ["all"]}
+
+
+def test_get_many_list_data(storage_manager):
+    data_to_insert = {"101": ["cars", "pets"], "102": ["tv"]}
+    for client_id in data_to_insert:
+        storage_manager.set_list_data(client_id, data_to_insert[client_id])
+
+    result = storage_manager.get_many_list_data(["101", "102", "103"])
+
+    storage_manager.del_many_data(*data_to_insert.keys())
+    assert [sorted(values) for values in result] == [["cars", "pets"], ["tv"], []]
+
+
+def test_encoded_interests(storage_manager):
+    storage_manager.set_list_data("201", ["cars", "pets"])
+    storage_manager.set_list_data("201", ["tv"])
+    plain = storage_manager.get_many_list_data(["201"])
+
+    assert migrate(storage_manager.client, InterestDictionary(), match="201") == 1
+    storage_manager.encode_interests()
+    try:
+        storage_manager.set_list_data("202", ["books", "tv"])
+        result = storage_manager.get_many_list_data(["201", "202", "203"])
+        single = storage_manager.get_all_list_data("201")
+    finally:
+        storage_manager.interests = None
+        storage_manager.del_many_data("201", "202")
+
+    assert result == [plain[0], ["tv", "books"], []]
+    assert single == plain[0]
+
+
+def test_replace_many_list_data(storage_manager):
+    storage_manager.set_list_data("301", ["cars", "pets"])
+
+    storage_manager.replace_many_list_data({"301": ["tv", "books"], "302": ["music"], "303": []})
+    result = storage_manager.get_many_list_data(["301", "302", "303"])
+
+    storage_manager.del_many_data("301", "302")
+    assert result == [["tv", "books"], ["music"], []]
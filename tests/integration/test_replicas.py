@@ -0,0 +1,30 @@
+"""Integration tests of read replicas, local redis-server processes are started for them."""
+
+import time
+
+from src.sharding import parse_node
+from src.store import StorageManager, make_client
+
+
+def test_reads_from_replicas(redis_nodes):
+    primary, *replicas = redis_nodes[:3]
+    host, port = parse_node(primary)
+    for node in replicas:
+        client = make_client(*parse_node(node))
+        client.replicaof(host, port)
+    StorageManager.connect(host, port)
+    StorageManager.connect_replicas([parse_node(node) for node in replicas])
+
+    StorageManager.set_list_data("i:1", ["books", "music"])
+    for _ in range(50):
+        if all(make_client(*parse_node(node)).exists("i:1") for node in replicas):
+            break
+        time.sleep(0.1)
+
+    assert sorted(StorageManager.get_all_list_data("i:1")) == ["books", "music"]
+    assert sorted(StorageManager.get_many_list_data(["i:1"])[0]) == ["books", "music"]
+    assert all(stats["reads"] == 1 for name, stats in StorageManager.replicas.stats().items() if name != "primary")
+
+    StorageManager.del_many_data("i:1")
+    StorageManager.close()
+    StorageManager.replicas = None
@@ -0,0 +1,41 @@
+"""Integration tests of sharding, local redis-server processes are started for them."""
+
+from src.sharding import ShardedStorageManager, parse_node
+from src.store import make_client
+
+
+def test_distribution(redis_nodes):
+    nodes = redis_nodes[:3]
+    ShardedStorageManager.configure(nodes)
+    data = {"key:%s" % i: str(i) for i in range(3000)}
+    lists = {"list:%s" % i: ["a", str(i)] for i in range(300)}
+
+    ShardedStorageManager.set_many_data(data)
+    for key, values in lists.items():
+        ShardedStorageManager.set_list_data(key, values)
+
+    sizes = [make_client(*parse_node(node)).dbsize() for node in nodes]
+    assert sum(sizes) == len(data) + len(lists)
+    assert all(size > (len(data) + len(lists)) / 3 * 0.7 for size in sizes)
+    assert ShardedStorageManager.get_many_data(list(data)) == list(data.values())
+    assert [sorted(v) for v in ShardedStorageManager.get_many_list_data(list(lists))] == \
+           [sorted(v) for v in lists.values()]
+
+    ShardedStorageManager.del_many_data(*data, *lists)
+    assert sum(make_client(*parse_node(node)).dbsize() for node in nodes) == 0
+
+
+def test_cache_and_rebalancing(redis_nodes):
+    ShardedStorageManager.configure(redis_nodes[:3])
+    data = {"uid:%s" % i: float(i) for i in range(1000)}
+    ShardedStorageManager.set_many_cache(data)
+    ShardedStorageManager.local_cache.clear()
+
+    moved = ShardedStorageManager.reshard(redis_nodes)
+
+    assert 150 < moved < 350
+    assert make_client(*parse_node(redis_nodes[3])).dbsize() == moved
+    assert ShardedStorageManager.get_many_cache(list(data)) == [str(value) for value in data.values()]
+    assert ShardedStorageManager.client_for("uid:0").ttl("uid:0") > 0
+
+    ShardedStorageManager.del_many_data(*data)
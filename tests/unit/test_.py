@@ -6,7 +6,7 @@ from random import sample
 import pytest
 
 from src.schemas import OnlineScoreRequest, ClientsInterestsRequest
-from src.scoring import get_score, get_interests
+from src.scoring import get_score, get_interests, get_scores, iter_interests, score_cache
 from src.utils import generate_uid
 
 
@@ -88,3 +88,44 @@ def test_get_admin_interests(mock_storage_manager):
     result = get_interests(mock_storage_manager, request_data, "admin")
 
     assert result == {"admin": ["all"]}
+
+
+def test_iter_interests(mock_storage_manager):
+    request_data = ClientsInterestsRequest(client_ids=[1, 2, 3, 4, 5], date=None)
+    for client_id in range(1, 6):
+        mock_storage_manager.set_list_data(str(client_id), ["tv", str(client_id)])
+
+    chunks = list(iter_interests(mock_storage_manager, request_data, "not_admin", chunk_size=2))
+
+    assert [list(chunk) for chunk in chunks] == [["1", "2"], ["3", "4"], ["5"]]
+    assert {key: value for chunk in chunks for key, value in chunk.items()} == \
+           get_interests(mock_storage_manager, request_data, "not_admin")
+    assert list(iter_interests(mock_storage_manager, request_data, "admin")) == [{"admin": ["all"]}]
+
+
+def test_get_scores(mock_storage_manager):
+    requests = [
+        OnlineScoreRequest(first_name="a", last_name="b", email=None, phone=None, birthday=None, gender=None),
+        None,
+        OnlineScoreRequest(first_name=None, last_name=None, email="stupnikov@otus.ru", phone=79175002040,
+                           birthday=None, gender=None),
+    ]
+    cached_key = generate_uid(["", "", "79175002040", ""])
+    mock_storage_manager.client[cached_key] = "1.0"
+    mock_storage_manager.client.pop(generate_uid(["a", "b", "", ""]), None)
+    hits, misses = score_cache.get("hit"), score_cache.get("miss")
+
+    result = get_scores(mock_storage_manager, requests, "not_admin")
+
+    assert result == {"scores": [{"score": 0.5}, {"error": "Invalid Request", "code": 422}, {"score": 1.0}]}
+    assert (score_cache.get("hit"), score_cache.get("miss")) == (hits + 1, misses + 1)
+    assert mock_storage_manager.client[generate_uid(["a", "b", "", ""])] == 0.5
+    del mock_storage_manager.client[cached_key]
+
+
+def test_get_admin_scores(mock_storage_manager):
+    request_data = OnlineScoreRequest(first_name="a", last_name="b", email=None, phone=None, birthday=None, gender=None)
+
+    result = get_scores(mock_storage_manager, [request_data, None], "admin")
+
+    assert result == {"scores": [{"score": 42}, {"error": "Invalid Request", "code": 422}]}
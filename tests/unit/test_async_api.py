@@ -0,0 +1,257 @@
+"""Unittests."""
+
+import asyncio
+import gzip
+import hashlib
+import json
+import socket
+import threading
+import time
+import zlib
+from http import client
+
+import pytest
+
+from src.api import APIHandlerMixin, MainHTTPHandler, api_requests
+from src.async_api import AsyncAPIServer
+from src.codec import dumps
+from src.constants import SALT
+from src.server import make_server
+from src.tracing import tracer
+from tests.unit.utils import MockStorageManager, AsyncMockStorageManager
+
+
+def valid(request: dict) -> dict:
+    request["token"] = hashlib.sha512((request["account"] + request["login"] + SALT).encode('utf-8')).hexdigest()
+    return request
+
+
+def post(port: int, path: str, body: bytes) -> tuple[int, dict]:
+    conn = client.HTTPConnection("localhost", port)
+    conn.request("POST", path, body=body)
+    response = conn.getresponse()
+    result = response.status, json.loads(response.read())
+    conn.close()
+    return result
+
+
+@pytest.fixture(scope="module")
+def servers():
+    handler = type("Handler", (MainHTTPHandler,), {"store": MockStorageManager, "log_message": lambda *args: None})
+    sync_server = make_server(("localhost", 0), handler)
+    threading.Thread(target=sync_server.serve_forever, daemon=True).start()
+
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    async_api = type("AsyncAPI", (AsyncAPIServer,), {"store": AsyncMockStorageManager})()
+    async_server = asyncio.run_coroutine_threadsafe(async_api.start("localhost", 0), loop).result()
+
+    for store in (MockStorageManager, AsyncMockStorageManager):
+        store.client.update({"1": ["cars", "pets"], "2": ["tv"]})
+
+    yield sync_server.server_address[1], async_server.sockets[0].getsockname()[1]
+
+    sync_server.shutdown()
+    sync_server.server_close()
+    loop.call_soon_threadsafe(async_server.close)
+    loop.call_soon_threadsafe(loop.stop)
+
+
+@pytest.mark.parametrize(
+    "path, body",
+    [
+        ("/", b"{}"),
+        ("/online_score", b"not json"),
+        ("/online_score", b"[1, 2]"),
+        ("/online_score", json.dumps({"account": "a", "login": "b", "method": "online_score", "token": "",
+                                      "arguments": {}}).encode()),
+        ("/online_score", json.dumps(valid({"account": "a", "login": "b", "method": "online_score",
+                                            "arguments": {"phone": "79175002040"}})).encode()),
+        ("/online_score", json.dumps(valid({"account": "a", "login": "b", "method": "online_score",
+                                            "arguments": {"phone": 79175002040, "email": "a@b"}})).encode()),
+        ("/clients_interests", json.dumps(valid({"account": "a", "login": "b", "method": "clients_interests",
+                                                 "arguments": {"client_ids": [1, 2]}})).encode()),
+        ("/clients_interests", json.dumps(valid({"account": "a", "login": "b", "method": "clients_interests",
+                                                 "arguments": {"client_ids": []}})).encode()),
+        ("/online_score_batch", json.dumps(valid({"account": "a", "login": "b", "method": "online_score_batch",
+                                                  "arguments": {"items": [{"first_name": "a", "last_name": "b"},
+                                                                          {"phone": "1"}, 5]}})).encode()),
+        ("/online_score_batch", json.dumps(valid({"account": "a", "login": "b", "method": "online_score_batch",
+                                                  "arguments": {"items": []}})).encode()),
+        ("/unknown", json.dumps(valid({"account": "a", "login": "b", "method": "unknown",
+                                       "arguments": {}})).encode()),
+    ],
+)
+def test_same_responses(servers, path, body):
+    sync_port, async_port = servers
+
+    assert post(sync_port, path, body) == post(async_port, path, body)
+
+
+def post_stream(port: int, path: str, body: bytes) -> tuple[int, str, list[dict]]:
+    conn = client.HTTPConnection("localhost", port)
+    conn.request("POST", path, body=body, headers={"Accept": "application/x-ndjson"})
+    response = conn.getresponse()
+    content_type = response.getheader("Content-Type")
+    lines = [json.loads(line) for line in response.read().splitlines()]
+    conn.close()
+    return response.status, content_type, lines
+
+
+@pytest.mark.parametrize(
+    "body, expected",
+    [
+        (valid({"account": "a", "login": "b", "method": "clients_interests",
+                "arguments": {"client_ids": [1, 2, 999]}}),
+         (200, "application/x-ndjson", [{"1": ["cars", "pets"]}, {"2": ["tv"]}, {"999": None}])),
+        (valid({"account": "a", "login": "b", "method": "clients_interests", "arguments": {"client_ids": []}}),
+         (422, "application/json", [{"error": "Invalid Request", "code": 422}])),
+    ],
+)
+def test_same_streams(servers, body, expected):
+    sync_port, async_port = servers
+
+    assert post_stream(sync_port, "/clients_interests", json.dumps(body).encode()) == expected
+    assert post_stream(async_port, "/clients_interests", json.dumps(body).encode()) == expected
+
+
+INTERESTS_BODY = json.dumps(valid({"account": "a", "login": "b", "method": "clients_interests",
+                                   "arguments": {"client_ids": [1, 2]}})).encode()
+INTERESTS_RESPONSE = dumps({"response": {"1": ["cars", "pets"], "2": ["tv"]}, "code": 200})
+
+
+def test_keep_alive(servers, monkeypatch):
+    monkeypatch.setattr(MainHTTPHandler, "keepalive_requests", 3)
+    monkeypatch.setattr(AsyncAPIServer, "keepalive_requests", 3)
+
+    for port in servers:
+        conn = client.HTTPConnection("localhost", port)
+        results, sockets = [], []
+        for headers in ({}, {"Accept": "application/x-ndjson"}, {}):
+            conn.request("POST", "/clients_interests", body=INTERESTS_BODY, headers=headers)
+            sockets.append(conn.sock)
+            response = conn.getresponse()
+            results.append((response.status, response.getheader("Connection"), len(response.read().splitlines())))
+        conn.close()
+
+        assert sockets[0] is sockets[1] is sockets[2]
+        assert results == [(200, None, 1), (200, None, 2), (200, "close", 1)]
+
+
+def test_pipelining(servers):
+    request = (b"POST /clients_interests HTTP/1.1\r\nHost: localhost\r\nContent-Length: %d\r\n\r\n%s"
+               % (len(INTERESTS_BODY), INTERESTS_BODY))
+
+    for port in servers:
+        with socket.create_connection(("localhost", port)) as sock:
+            sock.sendall(request * 2 + request.replace(b"Host: localhost", b"Connection: close"))
+            data = b""
+            while chunk := sock.recv(65536):
+                data += chunk
+
+        assert data.count(b"HTTP/1.1 200 OK") == 3
+        assert data.count(INTERESTS_RESPONSE) == 3
+
+
+def test_http_10_connection_is_closed(servers):
+    for port in servers:
+        with socket.create_connection(("localhost", port)) as sock:
+            sock.sendall(b"POST /clients_interests HTTP/1.0\r\nContent-Length: %d\r\n\r\n%s"
+                         % (len(INTERESTS_BODY), INTERESTS_BODY))
+            data = b""
+            while chunk := sock.recv(65536):
+                data += chunk
+
+        assert b"Connection: close" in data
+        assert data.endswith(INTERESTS_RESPONSE)
+
+
+def test_http_10_keep_alive(servers):
+    request = b"POST /clients_interests HTTP/1.0\r\nConnection: keep-alive\r\nContent-Length: %d\r\n\r\n%s" % (
+        len(INTERESTS_BODY), INTERESTS_BODY
+    )
+    for port in servers:
+        with socket.create_connection(("localhost", port)) as sock:
+            sock.settimeout(5)
+            for _ in range(2):
+                sock.sendall(request)
+                data = b""
+                while not data.endswith(INTERESTS_RESPONSE):
+                    data += sock.recv(65536)
+
+                assert b"Connection: keep-alive" in data
+
+
+def test_compression(servers, monkeypatch):
+    monkeypatch.setattr(APIHandlerMixin, "compression_min_size", 50)
+    small = json.dumps(valid({"account": "a", "login": "b", "method": "clients_interests",
+                              "arguments": {"client_ids": [2]}})).encode()
+
+    for port in servers:
+        conn = client.HTTPConnection("localhost", port)
+        results = []
+        for body, encoding in ((INTERESTS_BODY, "gzip;q=0.5, deflate"), (INTERESTS_BODY, "gzip"),
+                               (INTERESTS_BODY, None), (small, "gzip")):
+            conn.request("POST", "/clients_interests", body=body,
+                         headers={"Accept-Encoding": encoding} if encoding else {})
+            response = conn.getresponse()
+            data = response.read()
+            content_encoding = response.getheader("Content-Encoding")
+            if content_encoding == "gzip":
+                data = gzip.decompress(data)
+            elif content_encoding == "deflate":
+                data = zlib.decompress(data)
+            results.append((content_encoding, json.loads(data)["response"]))
+        conn.close()
+
+        assert results == [("deflate", {"1": ["cars", "pets"], "2": ["tv"]}),
+                           ("gzip", {"1": ["cars", "pets"], "2": ["tv"]}),
+                           (None, {"1": ["cars", "pets"], "2": ["tv"]}),
+                           (None, {"2": ["tv"]})]
+
+
+def test_metrics(servers):
+    body = json.dumps(valid({"account": "a", "login": "b", "method": "online_score",
+                             "arguments": {"phone": "79175002040", "email": "a@b"}})).encode()
+
+    for port in servers:
+        before = api_requests.get("online_score", "200")
+        post(port, "/online_score", body)
+        # the request is counted after the response is written
+        deadline = time.monotonic() + 5
+        while api_requests.get("online_score", "200") == before and time.monotonic() < deadline:
+            time.sleep(0.01)
+        conn = client.HTTPConnection("localhost", port)
+        conn.request("GET", "/metrics")
+        response = conn.getresponse()
+        metrics = response.read().decode()
+        conn.request("GET", "/unknown")
+        not_found = conn.getresponse()
+        not_found.read()
+        conn.close()
+
+        assert response.status == 200
+        assert response.getheader("Content-Type").startswith("text/plain")
+        assert api_requests.get("online_score", "200") == before + 1
+        assert 'api_requests_total{method="online_score",code="200"} %d' % (before + 1) in metrics
+        assert 'api_request_duration_seconds_bucket{method="online_score",le="+Inf"}' in metrics
+        assert "compression_responses{encoding=\"gzip\"}" in metrics
+        assert not_found.status == 404
+
+
+def test_tracing(servers, monkeypatch):
+    body = json.dumps(valid({"account": "a", "login": "b", "method": "clients_interests",
+                             "arguments": {"client_ids": [1, 2]}})).encode()
+    exported = []
+    monkeypatch.setattr(tracer, "exporter", type("Exporter", (), {"export": staticmethod(exported.append)})())
+    monkeypatch.setattr(tracer, "enabled", True)
+
+    for port in servers:
+        post(port, "/clients_interests", body)
+        # the trace is finished after the response is written
+        deadline = time.monotonic() + 5
+        while len(exported) < servers.index(port) + 1 and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    assert [[span.name for span in trace.spans] for trace in exported] == \
+           [["clients_interests", "parse", "auth", "validation", "scoring", "write"]] * 2
@@ -0,0 +1,106 @@
+"""Unittests."""
+
+import asyncio
+import threading
+import time
+
+import pytest
+from redis.exceptions import ConnectionError
+
+from src.breaker import AsyncCircuitBreaker, CircuitBreaker, CircuitOpenError
+
+
+def fail(breaker: CircuitBreaker) -> None:
+    with pytest.raises(ConnectionError):
+        with breaker:
+            raise ConnectionError
+
+
+def wait_state(breaker: CircuitBreaker, state: str) -> None:
+    for _ in range(100):
+        if breaker.state == state:
+            return
+        time.sleep(0.01)
+
+
+def test_opens_after_threshold():
+    breaker = CircuitBreaker(failure_threshold=2, recovery_timeout=60)
+    fail(breaker)
+    assert breaker.state == CircuitBreaker.CLOSED
+    fail(breaker)
+
+    with pytest.raises(CircuitOpenError):
+        with breaker:
+            pass
+
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.stats()["rejected"] == 1
+    assert breaker.stats()["transitions"] == {"closed->open": 1}
+
+
+def test_other_errors_are_not_failures():
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=60)
+    with pytest.raises(KeyError):
+        with breaker:
+            raise KeyError
+
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+@pytest.mark.parametrize("probe_ok, state", [(True, CircuitBreaker.CLOSED), (False, CircuitBreaker.OPEN)])
+def test_background_probe(probe_ok, state):
+    def probe():
+        if not probe_ok:
+            raise ConnectionError
+
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=0.01, probe=probe)
+    fail(breaker)
+    time.sleep(0.02)
+
+    # the call that finds the recovery timeout expired starts the probe and is still rejected
+    with pytest.raises(CircuitOpenError):
+        with breaker:
+            pass
+    wait_state(breaker, state)
+
+    assert breaker.state == state
+    assert breaker.transitions["open->half_open"] == 1
+
+
+def test_trial_call_without_probe():
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=0.01)
+    fail(breaker)
+    time.sleep(0.02)
+
+    with breaker:
+        pass
+
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+@pytest.mark.parametrize("probe_ok, state", [(True, CircuitBreaker.CLOSED), (False, CircuitBreaker.OPEN)])
+def test_async_probe_runs_in_event_loop(probe_ok, state):
+    threads = []
+
+    async def probe():
+        threads.append(threading.current_thread())
+        if not probe_ok:
+            raise ConnectionError
+
+    async def run():
+        breaker = AsyncCircuitBreaker(failure_threshold=1, recovery_timeout=0.01, probe=probe)
+        with pytest.raises(ConnectionError):
+            async with breaker:
+                raise ConnectionError
+        await asyncio.sleep(0.02)
+
+        with pytest.raises(CircuitOpenError):
+            async with breaker:
+                pass
+        await breaker.probe_task
+        return breaker
+
+    breaker = asyncio.run(run())
+
+    assert breaker.state == state
+    assert threads == [threading.main_thread()]
@@ -0,0 +1,64 @@
+"""Unittests."""
+
+import io
+
+import pytest
+
+from src.bulk_loader import load_file, parse_csv, parse_jsonl, read_checkpoint
+from tests.unit.utils import MockStorageManager
+
+
+class FailingStorageManager(MockStorageManager):
+    """The storage failing on the given client id."""
+
+    client = {}
+    fail_on = None
+
+    @classmethod
+    def replace_many_list_data(cls, data: dict[str, list]) -> None:
+        if cls.fail_on in data:
+            raise ConnectionError("down")
+        super().replace_many_list_data(data)
+
+
+def make_jsonl(size: int) -> str:
+    return "".join('{"client_id": %s, "interests": ["cars", "i%s"]}\n' % (i, i) for i in range(size))
+
+
+def test_parse_jsonl():
+    lines = ['{"client_id": 1, "interests": ["cars", "pets"]}', "", '{"client_id": 2}', '[1]', "{bad",
+             '{"client_id": 3, "interests": [1]}', '{"client_id": 4, "interests": []}']
+
+    assert parse_jsonl(lines) == ({"1": ["cars", "pets"], "4": []}, 4)
+
+
+def test_parse_csv():
+    lines = ["client_id,interests\n", "1,cars,pets\n", "2\n", ",tv\n", '3,"hi-tech, geek"\n']
+
+    assert parse_csv(lines) == ({"1": ["cars", "pets"], "2": [], "3": ["hi-tech, geek"]}, 1)
+
+
+def test_load_file():
+    MockStorageManager.client = {}
+
+    loaded = load_file(io.StringIO(make_jsonl(25)), MockStorageManager, chunk_size=4, workers=3)
+
+    assert loaded == 25
+    assert MockStorageManager.client == {str(i): ["cars", "i%s" % i] for i in range(25)}
+
+
+def test_load_file_resumes_from_checkpoint(tmp_path):
+    checkpoint = str(tmp_path / "load.checkpoint")
+    FailingStorageManager.client, FailingStorageManager.fail_on = {}, "13"
+
+    with pytest.raises(ConnectionError):
+        load_file(io.StringIO(make_jsonl(25)), FailingStorageManager, chunk_size=5, workers=1, checkpoint=checkpoint)
+    assert read_checkpoint(checkpoint) == 10
+    assert "13" not in FailingStorageManager.client
+
+    FailingStorageManager.fail_on = None
+    loaded = load_file(io.StringIO(make_jsonl(25)), FailingStorageManager, chunk_size=5, checkpoint=checkpoint)
+
+    assert loaded == 15
+    assert read_checkpoint(checkpoint) == 25
+    assert len(FailingStorageManager.client) == 25
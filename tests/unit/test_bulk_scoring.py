@@ -0,0 +1,63 @@
+"""Unittests."""
+
+import io
+import json
+from random import choice, seed
+from types import SimpleNamespace
+
+import pytest
+
+from src.bulk_scoring import score_columns, score_file, FIELDS, np
+from src.scoring import compute_score
+
+VALUES = {
+    "first_name": [None, "", "a"],
+    "last_name": [None, "", "b"],
+    "email": [None, "", "stupnikov@otus.ru"],
+    "phone": [None, "", "79175002040", 79175002040],
+    "birthday": [None, "", "01.01.2000"],
+    "gender": [None, 0, 1, 2],
+}
+ENGINES = ["python"] + (["numpy"] if np is not None else [])
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_score_columns_same_as_get_score(engine):
+    seed(0)
+    profiles = [{field: choice(VALUES[field]) for field in FIELDS} for _ in range(500)]
+    columns = {field: [profile[field] for profile in profiles] for field in FIELDS}
+
+    scores = score_columns(columns, engine)
+
+    assert [float(score) for score in scores] == [compute_score(SimpleNamespace(**p)) for p in profiles]
+
+
+def test_score_file():
+    lines = [
+        json.dumps({"phone": "79175002040", "email": "stupnikov@otus.ru"}),
+        json.dumps({"account": "a", "login": "b", "method": "online_score", "arguments": {"first_name": "a",
+                                                                                         "last_name": "b"}}),
+        json.dumps({"phone": "89175002040", "email": "stupnikov@otus.ru"}),
+        "",
+        "[1, 2]",
+    ]
+    target = io.StringIO()
+
+    total = score_file(io.StringIO("\n".join(lines)), target, chunk_size=2)
+
+    assert total == 4
+    assert target.getvalue().splitlines() == ['{"score": 3.0}', '{"score": 0.5}', '{"score": null}', '{"score": null}']
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_score_file_without_validation(engine):
+    lines = [
+        json.dumps({"phone": "89175002040", "email": "stupnikov@otus.ru", "gender": [1, 2]}),
+        json.dumps({"method": "online_score", "arguments": "79175002040"}),
+        json.dumps({"method": "online_score", "arguments": [1, 2]}),
+    ]
+    target = io.StringIO()
+
+    score_file(io.StringIO("\n".join(lines)), target, chunk_size=10, engine=engine, validate=False)
+
+    assert target.getvalue().splitlines() == ['{"score": 3.0}', '{"score": null}', '{"score": null}']
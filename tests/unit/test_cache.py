@@ -0,0 +1,38 @@
+"""Unittests."""
+
+import time
+
+from src.cache import LRUCache
+
+
+def test_lru_eviction():
+    cache = LRUCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+    assert cache.stats() == {"size": 2, "hits": 3, "misses": 1, "evictions": 1, "expirations": 0}
+
+
+def test_expiration_uses_smaller_ttl():
+    cache = LRUCache(maxsize=10, ttl=60)
+    cache.set("short", 1, ttl=0.01)
+    cache.set("long", 2, ttl=1200)
+    time.sleep(0.02)
+
+    assert cache.get("short") is None
+    assert cache.get("long") == 2
+    assert cache.data["long"][0] - time.monotonic() <= 60
+    assert cache.expirations == 1
+
+
+def test_disabled():
+    cache = LRUCache(maxsize=0)
+    cache.set("a", 1)
+
+    assert cache.get("a") is None
+    assert len(cache) == 0
@@ -0,0 +1,39 @@
+"""Unittests."""
+
+import json
+
+import pytest
+
+from src.codec import CODECS, get_codec
+
+RESPONSES = [
+    {"response": {"score": 3.0}, "code": 200},
+    {"response": {"1": ["cars", "pets"], "2": [], "3": ["путешествия"]}, "code": 200},
+    {"error": "Invalid Request", "code": 422},
+]
+
+
+@pytest.mark.parametrize("name", list(CODECS))
+@pytest.mark.parametrize("response", RESPONSES)
+def test_codecs_agree_with_json(name, response):
+    codec = get_codec(name)
+
+    body = codec.dumps(response)
+
+    assert isinstance(body, bytes)
+    assert json.loads(body) == response
+    assert codec.loads(json.dumps(response).encode()) == response
+    assert codec.loads(json.dumps(response)) == response
+
+
+@pytest.mark.parametrize("name", list(CODECS))
+def test_invalid_json(name):
+    with pytest.raises(ValueError):
+        get_codec(name).loads(b"{not json")
+
+
+def test_fastest_codec_first():
+    assert get_codec().name == next(iter(CODECS))
+    assert list(CODECS)[-1] == "json"
+    with pytest.raises(ValueError):
+        get_codec("simplejson")
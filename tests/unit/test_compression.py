@@ -0,0 +1,48 @@
+"""Unittests."""
+
+import gzip
+import zlib
+
+import pytest
+
+from src.compression import Compressor, ENCODERS, negotiate
+
+DATA = b'{"response": {"1": ["cars", "pets"], "2": ["tv"]}, "code": 200}' * 100
+AVAILABLE = {"br": ENCODERS["gzip"], "gzip": ENCODERS["gzip"], "deflate": ENCODERS["deflate"]}
+
+
+@pytest.mark.parametrize(
+    "accept_encoding, expected",
+    [
+        (None, None),
+        ("", None),
+        ("identity", None),
+        ("gzip", "gzip"),
+        ("deflate, gzip", "gzip"),
+        ("gzip;q=0.5, deflate", "deflate"),
+        ("GZIP;q=0.5, Deflate;q=0.8, br;q=0.1", "deflate"),
+        ("gzip;q=0, deflate;q=0", None),
+        ("*", "br"),
+        ("*;q=0.5, gzip", "gzip"),
+        ("br;q=0, *", "gzip"),
+        ("gzip;q=abc", None),
+        ("zstd", None),
+    ],
+)
+def test_negotiate(accept_encoding, expected):
+    assert negotiate(accept_encoding, AVAILABLE) == expected
+
+
+def test_compressor():
+    compressor = Compressor({"gzip": 6, "deflate": 1})
+
+    compressed = compressor.compress(DATA, "gzip")
+    compressor.compress(DATA, "deflate")
+
+    assert gzip.decompress(compressed) == DATA
+    stats = compressor.stats()
+    assert stats["gzip"]["responses"] == 1
+    assert stats["gzip"]["bytes_in"] == len(DATA)
+    assert stats["gzip"]["bytes_saved"] == len(DATA) - len(compressed)
+    assert zlib.decompress(compressor.compress(DATA, "deflate")) == DATA
+    assert compressor.stats()["deflate"]["responses"] == 2
@@ -0,0 +1,91 @@
+"""Unittests."""
+
+import pytest
+
+from src.interests import InterestDictionary, MAX_INTEREST_ID
+from src.store import StorageManager
+
+
+class FakeRedis:
+    """The hash commands and the intern script over a dict."""
+
+    def __init__(self):
+        self.hashes = {}
+        self.strings = {}
+        self.lists = {}
+        self.commands = []
+
+    def hgetall(self, key: str) -> dict:
+        return dict(self.hashes.get(key, {}))
+
+    def mget(self, keys: list[str]) -> list[str | None]:
+        self.commands.append("MGET")
+        return [self.strings.get(key) for key in keys]
+
+    def pipeline(self, transaction: bool = True) -> "FakeRedis":
+        self.commands.append("pipeline")
+        self.results = []
+        return self
+
+    def lrange(self, key: str, start: int, end: int) -> None:
+        self.results.append(self.lists.get(key, []))
+
+    def execute(self) -> list:
+        return self.results
+
+    def register_script(self, script: str):
+        def intern(keys: list[str], args: list[str]) -> int | str:
+            fields = self.hashes.setdefault(keys[0], {})
+            if args[0] not in fields:
+                fields[args[0]] = str(len(fields) + 1)
+                return len(fields)
+            return fields[args[0]]
+        return intern
+
+
+def test_encode_decode_keeps_lpush_order():
+    dictionary = InterestDictionary()
+    dictionary.intern(FakeRedis(), ["cars", "pets", "tv"])
+
+    packed = dictionary.encode(["cars", "pets"]) + dictionary.encode(["tv"])
+
+    assert packed == "\x01\x02\x03"
+    assert len(packed.encode("utf-8")) == 3
+    assert dictionary.decode(packed) == ["tv", "pets", "cars"]
+    assert dictionary.decode(None) == []
+
+
+def test_intern_is_shared_through_redis():
+    redis = FakeRedis()
+    writer, reader = InterestDictionary(), InterestDictionary()
+    writer.intern(redis, ["cars", "pets", "cars"])
+    writer.intern(redis, ["pets", "tv"])
+
+    packed = writer.encode(["tv", "cars"])
+    assert not reader.is_known(packed)
+    reader.refresh(redis)
+
+    assert writer.ids == {"cars": 1, "pets": 2, "tv": 3}
+    assert reader.is_known(packed)
+    assert reader.decode(packed) == ["cars", "tv"]
+
+
+def test_dictionary_overflow():
+    with pytest.raises(OverflowError):
+        InterestDictionary().load({"cars": MAX_INTEREST_ID + 1})
+
+
+def test_encoded_reader_finds_lists_not_migrated(monkeypatch):
+    redis = FakeRedis()
+    dictionary = InterestDictionary()
+    dictionary.intern(redis, ["cars", "pets"])
+    redis.strings["1"] = dictionary.encode(["cars", "pets"])
+    redis.lists["2"] = ["tv", "books"]
+    monkeypatch.setattr(StorageManager, "client", redis)
+    monkeypatch.setattr(StorageManager, "interests", dictionary)
+
+    assert StorageManager.get_many_list_data(["1", "2", "3"]) == [["pets", "cars"], ["tv", "books"], []]
+    assert StorageManager.get_all_list_data("2") == ["tv", "books"]
+    redis.commands.clear()
+    assert StorageManager.get_many_list_data(["1"]) == [["pets", "cars"]]
+    assert redis.commands == ["MGET"]
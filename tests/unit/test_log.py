@@ -0,0 +1,150 @@
+"""Unittests."""
+
+import hashlib
+import json
+import logging
+import sys
+import threading
+from http import client
+
+import pytest
+
+from src import log
+from src.api import MainHTTPHandler
+from src.constants import SALT
+from src.log import JSONFormatter, SamplingFilter, StructuredQueueHandler, log_request, setup_logging, stop_logging
+from src.server import make_server
+from tests.unit.utils import MockStorageManager
+
+
+def make_record(msg="request", args=None, level=logging.INFO, **extra) -> logging.LogRecord:
+    record = logging.LogRecord("root", level, __file__, 1, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+@pytest.fixture
+def restore_logging():
+    handlers, level = logging.getLogger().handlers, logging.getLogger().level
+    yield
+    stop_logging()
+    log.target.close()
+    log.target = None
+    logging.getLogger().handlers, logging.getLogger().level = handlers, level
+
+
+def test_json_formatter():
+    record = make_record("Attribute error: %s", ("phone",), fields={"request_id": "1", "code": 422})
+
+    data = json.loads(JSONFormatter().format(record))
+
+    assert data["level"] == "INFO"
+    assert data["message"] == "Attribute error: phone"
+    assert data["request_id"] == "1"
+    assert data["code"] == 422
+    assert "traceback" not in data
+
+
+def test_json_formatter_traceback():
+    try:
+        raise KeyError("login")
+    except KeyError:
+        record = make_record("Unexpected error", level=logging.ERROR, exc_info=sys.exc_info())
+
+    assert "KeyError" in json.loads(JSONFormatter().format(record))["traceback"]
+
+
+def test_sampling_filter():
+    sampling = SamplingFilter(0.0)
+
+    assert not sampling.filter(make_record(sampled=True))
+    assert sampling.filter(make_record(sampled=False))
+    assert sampling.filter(make_record())
+
+    sampling.rate = 1.0
+    assert sampling.filter(make_record(sampled=True))
+
+
+def test_queue_handler_prepares_record():
+    args = {"phone": "79175002040"}
+    try:
+        raise ValueError("bad")
+    except ValueError:
+        record = make_record("Value error: %s", (args,), level=logging.ERROR)
+        record.exc_info = sys.exc_info()
+
+    prepared = StructuredQueueHandler(None).prepare(record)
+
+    assert prepared is not record
+    assert prepared.msg == "Value error: {'phone': '79175002040'}"
+    assert prepared.args is None
+    assert prepared.exc_info is None
+    assert "ValueError: bad" in prepared.exc_text
+
+
+@pytest.mark.parametrize("structured", [True, False])
+def test_setup_logging(tmp_path, restore_logging, structured):
+    filename = str(tmp_path / "server.log")
+    setup_logging(filename, structured, sample_rate=0.0)
+
+    log_request({"request_id": "1", "code": 200})
+    log_request({"request_id": "2", "code": 422, "error": "Invalid Request"})
+    logging.error("Attribute error: %s", "phone")
+    stop_logging()
+    # after the listener is stopped the records are written synchronously
+    log_request({"request_id": "3", "code": 500, "error": "Internal Server Error"})
+
+    with open(filename, encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    assert len(lines) == 3
+    assert "Attribute error: phone" in lines[1]
+    if structured:
+        assert [json.loads(line).get("request_id") for line in lines] == ["2", None, "3"]
+    else:
+        assert "'request_id': '2'" in lines[0]
+
+
+def test_access_line_is_logged_and_sampled(caplog):
+    handler = type("Handler", (MainHTTPHandler,), {"store": MockStorageManager})
+    server = make_server(("localhost", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    try:
+        with caplog.at_level(logging.INFO):
+            for path in ("/metrics", "/unknown"):
+                conn = client.HTTPConnection("localhost", server.server_address[1])
+                conn.request("GET", path)
+                conn.getresponse().read()
+                conn.close()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    lines = [record for record in caplog.records if "HTTP/1.1" in record.getMessage()]
+    assert [(record.getMessage().split()[2], record.sampled) for record in lines] == [
+        ("/metrics", True), ("/unknown", False),
+    ]
+
+
+def test_request_body_and_validation_error_levels(caplog):
+    handler = type("Handler", (MainHTTPHandler,), {"store": MockStorageManager})
+    server = make_server(("localhost", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    body = json.dumps({"account": "a", "login": "b", "method": "online_score",
+                       "token": hashlib.sha512(("a" + "b" + SALT).encode('utf-8')).hexdigest(),
+                       "arguments": {"phone": "89175002040"}})
+
+    try:
+        with caplog.at_level(logging.INFO):
+            conn = client.HTTPConnection("localhost", server.server_address[1])
+            conn.request("POST", "/online_score", body=body)
+            conn.getresponse().read()
+            conn.close()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    body_line, = [record for record in caplog.records if record.getMessage().startswith("/online_score: ")]
+    error, = [record for record in caplog.records if record.getMessage().startswith("Value error")]
+    assert (body_line.levelno, body_line.sampled) == (logging.INFO, True)
+    assert (error.levelno, error.exc_info) == (logging.ERROR, None)
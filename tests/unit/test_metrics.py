@@ -0,0 +1,107 @@
+"""Unittests."""
+
+import threading
+
+import pytest
+
+from src.metrics import Registry, flatten
+
+
+@pytest.fixture
+def registry():
+    yield Registry()
+
+
+def test_counter(registry):
+    counter = registry.counter("requests_total", "Requests.", ("method", "code"))
+
+    counter.inc("online_score", "200")
+    counter.inc("online_score", "200", amount=2)
+    counter.inc("clients_interests", "422")
+
+    assert counter.get("online_score", "200") == 3
+    assert counter.get("online_score", "500") == 0
+    assert registry.render().decode().splitlines() == [
+        "# HELP requests_total Requests.",
+        "# TYPE requests_total counter",
+        'requests_total{method="online_score",code="200"} 3',
+        'requests_total{method="clients_interests",code="422"} 1',
+    ]
+
+
+def test_histogram(registry):
+    histogram = registry.histogram("duration_seconds", "Duration.", ("method",), buckets=(0.1, 1))
+
+    for value in (0.05, 0.1, 0.5, 5):
+        histogram.observe(value, "online_score")
+
+    assert histogram.count("online_score") == 4
+    assert registry.render().decode().splitlines()[2:] == [
+        'duration_seconds_bucket{method="online_score",le="0.1"} 2',
+        'duration_seconds_bucket{method="online_score",le="1.0"} 3',
+        'duration_seconds_bucket{method="online_score",le="+Inf"} 4',
+        'duration_seconds_sum{method="online_score"} 5.65',
+        'duration_seconds_count{method="online_score"} 4',
+    ]
+
+
+def test_histogram_threads(registry):
+    histogram = registry.histogram("duration_seconds", "Duration.")
+
+    def observe():
+        for _ in range(1000):
+            histogram.observe(0.001)
+
+    threads = [threading.Thread(target=observe) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert histogram.count() == 8000
+
+
+def test_duplicate_metric(registry):
+    registry.counter("requests_total", "Requests.")
+
+    with pytest.raises(ValueError):
+        registry.histogram("requests_total", "Requests.")
+
+
+def test_label_escaping(registry):
+    registry.counter("errors_total", "Errors.", ("command",)).inc('a"b\\c\nd')
+
+    assert 'errors_total{command="a\\"b\\\\c\\nd"} 1' in registry.render().decode()
+
+
+def test_flatten():
+    breaker = {"state": "open", "failures": 3, "rejected": 1, "transitions": {"closed->open": 1}}
+    replicas = {"a:1": {"up": False, "reads": 5, "latency": 0.5}, "primary": {"reads": 2}}
+
+    assert list(flatten("breaker", breaker, ("transition",))) == [
+        ("breaker_state", ("state",), ("open",), 1),
+        ("breaker_failures", (), (), 3),
+        ("breaker_rejected", (), (), 1),
+        ("breaker_transitions", ("transition",), ("closed->open",), 1),
+    ]
+    assert list(flatten("replicas", replicas, ("replica",))) == [
+        ("replicas_up", ("replica",), ("a:1",), False),
+        ("replicas_reads", ("replica",), ("a:1",), 5),
+        ("replicas_latency", ("replica",), ("a:1",), 0.5),
+        ("replicas_reads", ("replica",), ("primary",), 2),
+    ]
+
+
+def test_add_stats(registry):
+    stats = {"gzip": {"responses": 1, "seconds": 0.5}, "deflate": {"responses": 0, "seconds": 0.0}}
+    registry.add_stats("compression", lambda: stats, "encoding")
+    registry.add_stats("replicas", lambda: None, "replica")
+
+    assert registry.render().decode().splitlines() == [
+        "# TYPE compression_responses untyped",
+        'compression_responses{encoding="gzip"} 1',
+        'compression_responses{encoding="deflate"} 0',
+        "# TYPE compression_seconds untyped",
+        'compression_seconds{encoding="gzip"} 0.5',
+        'compression_seconds{encoding="deflate"} 0.0',
+    ]
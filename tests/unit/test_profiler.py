@@ -0,0 +1,85 @@
+"""Unittests."""
+
+import threading
+
+import pytest
+
+from src.api import APIHandlerMixin
+from src.constants import OK, FORBIDDEN, INVALID_REQUEST, PROFILE_MAX_SECONDS
+from src.profiler import Profiler, Sampler, start_profile
+from src.schemas import ProfileRequest
+
+
+def busy_function(stop: threading.Event) -> None:
+    while not stop.is_set():
+        stop.wait(0.001)
+
+
+@pytest.fixture
+def busy_thread():
+    stop = threading.Event()
+    thread = threading.Thread(target=busy_function, args=(stop,))
+    thread.start()
+    yield thread
+    stop.set()
+    thread.join()
+
+
+def test_sampler(busy_thread):
+    sampler = Sampler()
+
+    for _ in range(3):
+        sampler.sample()
+
+    lines = sampler.collapsed().splitlines()
+    assert sampler.samples == 3
+    assert sum(int(line.rsplit(" ", 1)[1]) for line in lines) >= 3
+    busy = [line for line in lines if "busy_function (tests/unit/test_profiler.py:" in line]
+    assert busy
+    assert busy[0].startswith("Thread._bootstrap (threading.py:")
+    assert "test_sampler" not in sampler.collapsed()
+
+
+def test_profiler(busy_thread, tmp_path):
+    profiler = Profiler(interval=0.001, directory=str(tmp_path))
+
+    path, started = profiler.start(60)
+    second_path, second_started = profiler.start(60)
+    profiler.stop()
+
+    assert started and not second_started
+    assert path == second_path
+    assert path.startswith(str(tmp_path))
+    with open(path) as f:
+        assert "busy_function" in f.read()
+    assert profiler.path is None
+    assert profiler.start(0.01, str(tmp_path / "next.collapsed")) == (str(tmp_path / "next.collapsed"), True)
+    profiler.thread.join()
+
+
+def test_start_profile(monkeypatch, tmp_path):
+    profiler = Profiler(directory=str(tmp_path))
+    monkeypatch.setattr("src.profiler.profiler", profiler)
+
+    response = start_profile(None, ProfileRequest.from_dict({"seconds": 1}), "admin")
+    profiler.stop()
+
+    assert response == {"file": response["file"], "started": True}
+
+
+@pytest.mark.parametrize(
+    "login, arguments, code",
+    [
+        ("admin", {}, OK),
+        ("admin", {"seconds": 5}, OK),
+        ("admin", {"seconds": 0}, INVALID_REQUEST),
+        ("admin", {"seconds": PROFILE_MAX_SECONDS + 1}, INVALID_REQUEST),
+        ("admin", {"seconds": True}, INVALID_REQUEST),
+        ("admin", {"seconds": "5"}, INVALID_REQUEST),
+        ("h&f", {"seconds": 5}, FORBIDDEN),
+    ],
+)
+def test_profile_request(login, arguments, code):
+    _, result = APIHandlerMixin.get_request_data({"login": login, "arguments": arguments}, "profile")
+
+    assert result == code
@@ -0,0 +1,74 @@
+"""Unittests."""
+
+import pytest
+from redis.exceptions import ConnectionError
+
+from src.cache import LRUCache
+from src.replicas import ReplicaSet
+from src.store import StorageManager
+
+
+class Node:
+    def __init__(self, name: str, alive: bool = True):
+        self.name = name
+        self.alive = alive
+        self.calls = 0
+
+    def get(self, key: str) -> str:
+        self.calls += 1
+        if not self.alive:
+            raise ConnectionError("down")
+        return "%s:%s" % (self.name, key)
+
+    def mget(self, keys: list[str]) -> list[str]:
+        return [self.get(key) for key in keys]
+
+
+def test_round_robin():
+    replicas = ReplicaSet({"r1": Node("r1"), "r2": Node("r2")})
+
+    values = [replicas.read(lambda client: client.get("k"), Node("primary")) for _ in range(4)]
+
+    assert values == ["r1:k", "r2:k", "r1:k", "r2:k"]
+
+
+def test_least_latency():
+    replicas = ReplicaSet({"r1": Node("r1"), "r2": Node("r2")}, "least_latency")
+    replicas.latency.update({"r1": 0.01, "r2": 0.001})
+
+    assert replicas.read(lambda client: client.get("k"), Node("primary")) == "r2:k"
+
+
+def test_failed_replica_leaves_rotation():
+    dead, alive, primary = Node("r1", alive=False), Node("r2"), Node("primary")
+    replicas = ReplicaSet({"r1": dead, "r2": alive}, cooldown=60)
+
+    values = [replicas.read(lambda client: client.get("k"), primary) for _ in range(4)]
+
+    assert values == ["primary:k", "r2:k", "r2:k", "r2:k"]
+    assert dead.calls == 1
+    assert replicas.stats()["r1"] == {"up": False, "reads": 0, "failures": 1, "latency": 0.0}
+
+
+def test_replica_returns_after_cooldown():
+    dead, primary = Node("r1", alive=False), Node("primary")
+    replicas = ReplicaSet({"r1": dead}, cooldown=0)
+
+    assert replicas.read(lambda client: client.get("k"), primary) == "primary:k"
+    dead.alive = True
+    assert replicas.read(lambda client: client.get("k"), primary) == "r1:k"
+
+
+def test_unknown_strategy():
+    with pytest.raises(ValueError):
+        ReplicaSet({}, "random")
+
+
+def test_cache_reads_go_to_primary(monkeypatch):
+    replica, primary = Node("r1"), Node("primary")
+    monkeypatch.setattr(StorageManager, "client", primary)
+    monkeypatch.setattr(StorageManager, "replicas", ReplicaSet({"r1": replica}))
+    monkeypatch.setattr(StorageManager, "local_cache", LRUCache(0))
+
+    assert StorageManager.get_many_cache(["a", "b"]) == ["primary:a", "primary:b"]
+    assert StorageManager.get_many_data(["a"]) == ["r1:a"]
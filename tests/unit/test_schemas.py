@@ -0,0 +1,107 @@
+"""Unittests."""
+
+import datetime
+from dataclasses import astuple
+
+import pytest
+
+from src.schemas import OnlineScoreRequest, ClientsInterestsRequest, MethodRequest, parse_date, format_date
+
+
+def construct(schema, data: dict):
+    try:
+        return schema(**{name: data.get(name) for name in schema.__dataclass_fields__})
+    except Exception as e:
+        return type(e)
+
+
+def compile_and_construct(schema, data: dict):
+    try:
+        return schema.from_dict(data)
+    except Exception as e:
+        return type(e)
+
+
+@pytest.mark.parametrize(
+    "schema, data",
+    [
+        (OnlineScoreRequest, {}),
+        (OnlineScoreRequest, {"phone": "79175002040", "email": "stupnikov@otus.ru"}),
+        (OnlineScoreRequest, {"phone": 79175002040, "email": "stupnikovotus.ru"}),
+        (OnlineScoreRequest, {"phone": "89175002040"}),
+        (OnlineScoreRequest, {"gender": "1", "birthday": "01.01.2000"}),
+        (OnlineScoreRequest, {"gender": 1, "birthday": "01.01.1890"}),
+        (OnlineScoreRequest, {"gender": 1, "birthday": "XXX"}),
+        (OnlineScoreRequest, {"first_name": "a", "last_name": 2}),
+        (ClientsInterestsRequest, {"client_ids": [1, 2], "date": "20.07.2017"}),
+        (ClientsInterestsRequest, {"client_ids": []}),
+        (ClientsInterestsRequest, {"client_ids": ["1"]}),
+        (ClientsInterestsRequest, {"date": "20.07.2017"}),
+        (MethodRequest, {"account": "a", "login": "admin", "token": "t", "arguments": {}, "method": "m"}),
+        (MethodRequest, {"login": "b", "arguments": {}}),
+        (MethodRequest, {"login": "b", "arguments": [], "method": "m"}),
+    ],
+)
+def test_from_dict_same_as_dataclass(schema, data):
+    expected = construct(schema, data)
+    result = compile_and_construct(schema, data)
+
+    if isinstance(expected, type):
+        assert result is expected
+    else:
+        assert isinstance(result, schema)
+        assert isinstance(result, schema.compiled_class)
+        assert astuple(result) == astuple(expected)
+        if schema is MethodRequest:
+            assert result.is_admin == expected.is_admin
+
+
+def test_from_dict_not_dict():
+    with pytest.raises(AttributeError):
+        OnlineScoreRequest.from_dict(None)
+    with pytest.raises(AttributeError):
+        OnlineScoreRequest.from_dict([])
+
+
+def test_compiled_instance_has_slots():
+    request_data = OnlineScoreRequest.from_dict({"first_name": "a"})
+
+    assert request_data.first_name == "a"
+    assert vars(request_data) == {}
+
+
+@pytest.mark.parametrize("value", ["01.01.2000", "1.1.2000", "29.02.2000", "31.12.1999", "29.02.2001", "00.01.2000",
+                                   "01.13.2000", "XXX", "01-01-2000", "01.01.20.0", ""])
+def test_parse_date_same_as_strptime(value):
+    try:
+        expected = datetime.datetime.strptime(value, "%d.%m.%Y").date()
+    except ValueError:
+        with pytest.raises(ValueError):
+            parse_date(value)
+    else:
+        assert parse_date(value) == expected
+
+
+@pytest.mark.parametrize("value", [None, 1, ["01.01.2000"]])
+def test_parse_date_not_str(value):
+    with pytest.raises(ValueError):
+        parse_date(value)
+
+
+def test_fields_store_dates():
+    request_data = OnlineScoreRequest.from_dict({"gender": 1, "birthday": "01.01.2000"})
+    interests_data = ClientsInterestsRequest(client_ids=[1], date="20.07.2017")
+
+    assert request_data.birthday == datetime.date(2000, 1, 1)
+    assert interests_data.date == datetime.date(2017, 7, 20)
+    assert format_date(request_data.birthday) == "01.01.2000"
+
+
+def test_birthday_lower_limit():
+    today = datetime.date.today()
+    limit = OnlineScoreRequest.__dict__["birthday"].get_lower_date_limit()
+
+    assert limit.year == today.year - 70
+    with pytest.raises(ValueError):
+        OnlineScoreRequest.from_dict({"birthday": format_date(limit - datetime.timedelta(days=1))})
+    assert OnlineScoreRequest.from_dict({"birthday": format_date(limit)}).birthday == limit
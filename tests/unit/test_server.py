@@ -0,0 +1,185 @@
+"""Unittests."""
+
+import hashlib
+import json
+import os
+import select
+import signal
+import threading
+import time
+from http import client
+
+import pytest
+
+from src.api import MainHTTPHandler
+from src.constants import SALT, OK
+from src.server import make_server, ThreadPoolHTTPServer, SerialHTTPServer, PreforkSupervisor
+from tests.unit.utils import MockStorageManager
+
+
+def wait_for(condition, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not (result := condition()):
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.05)
+    return result
+
+
+def run_supervisor(workers: int, target) -> int:
+    """The method runs the supervisor in a forked process, so its signal handlers do not touch the tests."""
+
+    pid = os.fork()
+    if pid == 0:
+        code = 0
+        try:
+            PreforkSupervisor(workers, target).run()
+        except BaseException:
+            code = 1
+        finally:
+            os._exit(code)
+    return pid
+
+
+def wait_exit(pid: int, timeout: float = 5.0) -> int:
+    deadline = time.monotonic() + timeout
+    while (result := os.waitpid(pid, os.WNOHANG))[0] == 0:
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.05)
+    return os.waitstatus_to_exitcode(result[1])
+
+
+def worker(directory, ignore_sigterm: bool = False):
+    """The target of the workers: registers itself in `directory` and waits to be stopped."""
+
+    def target():
+        def stopped(signum, frame):
+            open(os.path.join(directory, "stopped-%s" % os.getpid()), "w").close()
+            os._exit(0)
+
+        signal.signal(signal.SIGTERM, signal.SIG_IGN if ignore_sigterm else stopped)
+        open(os.path.join(directory, "started-%s" % os.getpid()), "w").close()
+        while True:
+            time.sleep(1)
+
+    return target
+
+
+def pids(directory, prefix: str) -> set[int]:
+    return {int(name.split("-")[1]) for name in os.listdir(directory) if name.startswith(prefix + "-")}
+
+
+def is_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    return True
+
+
+def post(port: int, request: dict) -> tuple[int, dict]:
+    conn = client.HTTPConnection("localhost", port)
+    conn.request("POST", f"/{request['method']}", body=json.dumps(request))
+    response = conn.getresponse()
+    result = response.status, json.loads(response.read())
+    conn.close()
+    return result
+
+
+@pytest.mark.parametrize("threads, server_class", [(0, SerialHTTPServer), (4, ThreadPoolHTTPServer)])
+def test_make_server(threads, server_class):
+    handler = type("Handler", (MainHTTPHandler,), {"store": MockStorageManager, "log_message": lambda *args: None})
+    server = make_server(("localhost", 0), handler, threads=threads)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    request = {"account": "a", "login": "b", "method": "online_score",
+               "token": hashlib.sha512(("a" + "b" + SALT).encode('utf-8')).hexdigest(),
+               "arguments": {"first_name": "a", "last_name": "b"}}
+
+    try:
+        code, response = post(server.server_address[1], request)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert isinstance(server, server_class)
+    assert code == OK
+    assert response == {"response": {"score": 0.5}, "code": OK}
+
+
+def test_idle_keep_alive_connections_give_way_to_waiting_ones():
+    handler = type("Handler", (MainHTTPHandler,), {"store": MockStorageManager, "log_message": lambda *args: None})
+    server = make_server(("localhost", 0), handler, threads=2)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_address[1]
+    body = json.dumps({"account": "a", "login": "b", "method": "online_score",
+                       "token": hashlib.sha512(("a" + "b" + SALT).encode('utf-8')).hexdigest(),
+                       "arguments": {"first_name": "a", "last_name": "b"}})
+
+    connections = []
+    try:
+        # more clients than threads, the first ones stay idle after their requests
+        for _ in range(3):
+            conn = client.HTTPConnection("localhost", port, timeout=10)
+            connections.append(conn)
+            start = time.monotonic()
+            conn.request("POST", "/online_score", body=body)
+            response = conn.getresponse()
+            response.read()
+            assert time.monotonic() - start < 1
+            assert response.getheader("Connection") is None
+
+        first, second, third = (conn.sock for conn in connections)
+        # as many connections as threads are kept open, the idle ones are closed for the waiting third
+        closed = select.select([first, second], [], [], 1)[0]
+        assert closed and all(sock.recv(1) == b"" for sock in closed)
+        assert not select.select([third], [], [], 0.3)[0]
+    finally:
+        for conn in connections:
+            conn.close()
+        server.shutdown()
+        server.server_close()
+
+
+def test_make_server_reuse_port():
+    first = make_server(("localhost", 0), MainHTTPHandler, reuse_port=True)
+    second = make_server(("localhost", first.server_address[1]), MainHTTPHandler, reuse_port=True)
+
+    assert first.server_address == second.server_address
+
+    first.server_close()
+    second.server_close()
+
+
+def test_prefork_supervisor_restarts_dead_worker_and_passes_sigterm(tmp_path, monkeypatch):
+    monkeypatch.setattr("src.server.WORKER_RESTART_DELAY", 0.05)
+    supervisor = run_supervisor(2, worker(tmp_path))
+    try:
+        first = wait_for(lambda: len(pids(tmp_path, "started")) == 2 and pids(tmp_path, "started"))
+        dead = min(first)
+        os.kill(dead, signal.SIGKILL)
+
+        workers = wait_for(lambda: len(pids(tmp_path, "started")) == 3 and pids(tmp_path, "started") - {dead})
+        os.kill(supervisor, signal.SIGTERM)
+        assert wait_exit(supervisor) == 0
+    finally:
+        if is_alive(supervisor):
+            os.kill(supervisor, signal.SIGKILL)
+
+    assert pids(tmp_path, "stopped") == workers
+    assert not any(is_alive(pid) for pid in workers)
+
+
+def test_prefork_supervisor_kills_hung_workers(tmp_path, monkeypatch):
+    monkeypatch.setattr("src.server.WORKER_STOP_TIMEOUT", 1)
+    supervisor = run_supervisor(2, worker(tmp_path, ignore_sigterm=True))
+    try:
+        workers = wait_for(lambda: len(pids(tmp_path, "started")) == 2 and pids(tmp_path, "started"))
+        start = time.monotonic()
+        os.kill(supervisor, signal.SIGTERM)
+        assert wait_exit(supervisor) == 0
+    finally:
+        if is_alive(supervisor):
+            os.kill(supervisor, signal.SIGKILL)
+
+    assert time.monotonic() - start >= 1
+    assert not pids(tmp_path, "stopped")
+    assert not any(is_alive(pid) for pid in workers)
@@ -0,0 +1,42 @@
+"""Unittests."""
+
+from collections import Counter
+
+from src.sharding import HashRing, parse_node
+
+NODES = ["127.0.0.1:7001", "127.0.0.1:7002", "127.0.0.1:7003"]
+KEYS = ["uid:%s" % i for i in range(30000)]
+
+
+def test_distribution():
+    ring = HashRing(NODES)
+
+    counts = Counter(ring.get_node(key) for key in KEYS)
+
+    assert set(counts) == set(NODES)
+    assert all(abs(count - len(KEYS) / 3) < len(KEYS) * 0.1 for count in counts.values())
+
+
+def test_add_node_moves_only_its_share():
+    ring = HashRing(NODES)
+    before = {key: ring.get_node(key) for key in KEYS}
+
+    ring.add_node("127.0.0.1:7004")
+    moved = [key for key in KEYS if ring.get_node(key) != before[key]]
+
+    assert all(ring.get_node(key) == "127.0.0.1:7004" for key in moved)
+    assert len(KEYS) * 0.15 < len(moved) < len(KEYS) * 0.35
+
+
+def test_remove_node_moves_only_its_keys():
+    ring = HashRing(NODES)
+    before = {key: ring.get_node(key) for key in KEYS}
+
+    ring.remove_node(NODES[0])
+
+    assert all(ring.get_node(key) == node for key, node in before.items() if node != NODES[0])
+    assert NODES[0] not in {ring.get_node(key) for key in KEYS}
+
+
+def test_parse_node():
+    assert parse_node("127.0.0.1:7001") == ("127.0.0.1", 7001)
@@ -0,0 +1,156 @@
+"""Unittests."""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.cache import LRUCache, should_refresh_early
+from src.schemas import OnlineScoreRequest
+from src.scoring import get_score, get_score_async, get_score_key, score_flight, async_score_flight
+from src.singleflight import SingleFlight, AsyncSingleFlight
+from src.store import StorageManager
+from tests.unit.utils import MockStorageManager, AsyncMockStorageManager
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+        self.commands = []
+
+    def pipeline(self, transaction: bool = True) -> "FakeRedis":
+        return self
+
+    def get(self, key: str) -> None:
+        self.commands.append(("get", key))
+
+    def ttl(self, key: str) -> None:
+        self.commands.append(("ttl", key))
+
+    def execute(self) -> list:
+        (_, key), _ = self.commands[-2:]
+        return [self.data.get(key), 1200 if key in self.data else -2]
+
+    def set(self, key: str, value, ex: int | None = None) -> None:
+        self.data[key] = value
+
+
+def test_single_flight_threads():
+    flight = SingleFlight()
+    started = threading.Event()
+    calls = []
+
+    def compute(value):
+        calls.append(value)
+        started.set()
+        time.sleep(0.05)
+        return value * 2
+
+    with ThreadPoolExecutor(8) as executor:
+        first = executor.submit(flight.do, "key", compute, 1)
+        started.wait()
+        results = list(executor.map(lambda _: flight.do("key", compute, 1), range(7)))
+
+    assert first.result() == 2
+    assert results == [2] * 7
+    assert calls == [1]
+    assert flight.stats() == {"executions": 1, "shared": 7}
+    assert flight.calls == {}
+
+
+def test_single_flight_shares_errors():
+    flight = SingleFlight()
+    started = threading.Event()
+
+    def fail():
+        started.set()
+        time.sleep(0.05)
+        raise ValueError
+
+    with ThreadPoolExecutor(2) as executor:
+        first = executor.submit(flight.do, "key", fail)
+        started.wait()
+        second = executor.submit(flight.do, "key", fail)
+
+    for future in (first, second):
+        with pytest.raises(ValueError):
+            future.result()
+
+
+def test_single_flight_without_waiters_creates_no_event():
+    flight = SingleFlight()
+
+    assert flight.do("key", lambda: flight.calls["key"].event) is None
+    assert flight.calls == {}
+
+
+def test_get_score_local_cache_skips_single_flight(monkeypatch):
+    request = OnlineScoreRequest.from_dict({"first_name": "a", "last_name": "b"})
+    monkeypatch.setattr(MockStorageManager, "local_cache", type(MockStorageManager.local_cache)(10))
+    MockStorageManager.local_cache.set(get_score_key(request), "3.0")
+    executions = score_flight.executions
+
+    assert get_score(MockStorageManager, request, "h&f") == {"score": 3.0}
+    assert score_flight.executions == executions
+
+
+def test_get_score_checks_local_cache_once(monkeypatch):
+    request = OnlineScoreRequest.from_dict({"first_name": "a", "last_name": "b"})
+    monkeypatch.setattr(StorageManager, "client", FakeRedis())
+    monkeypatch.setattr(StorageManager, "local_cache", LRUCache(10))
+
+    assert get_score(StorageManager, request, "h&f") == {"score": 0.5}
+    assert StorageManager.local_cache.stats()["misses"] == 1
+    assert get_score(StorageManager, request, "h&f") == {"score": 0.5}
+    assert StorageManager.local_cache.stats()["hits"] == 1
+    assert len(StorageManager.client.commands) == 2
+
+
+def test_get_score_async_local_cache_skips_single_flight(monkeypatch):
+    request = OnlineScoreRequest.from_dict({"first_name": "a", "last_name": "b"})
+    monkeypatch.setattr(AsyncMockStorageManager, "local_cache", LRUCache(10))
+    AsyncMockStorageManager.local_cache.set(get_score_key(request), "3.0")
+    executions = async_score_flight.executions
+
+    assert asyncio.run(get_score_async(AsyncMockStorageManager, request, "h&f")) == {"score": 3.0}
+    assert async_score_flight.executions == executions
+
+
+def test_async_single_flight():
+    flight = AsyncSingleFlight()
+    calls = []
+
+    async def compute(value):
+        calls.append(value)
+        await asyncio.sleep(0.01)
+        return value * 2
+
+    async def run():
+        return await asyncio.gather(*(flight.do("key", compute, 1) for _ in range(5)), flight.do("other", compute, 2))
+
+    assert asyncio.run(run()) == [2, 2, 2, 2, 2, 4]
+    assert calls == [1, 2]
+    assert flight.stats() == {"executions": 2, "shared": 4}
+
+
+@pytest.mark.parametrize(
+    "ttl, beta, expected",
+    [
+        (1200, 0, False),
+        (10, 0, False),
+        (-1, 1, False),
+        (0, 1, True),
+    ],
+)
+def test_should_refresh_early(ttl, beta, expected):
+    assert should_refresh_early(ttl, delta=1, beta=beta) is expected
+
+
+def test_should_refresh_early_probability():
+    far = sum(should_refresh_early(1000, delta=1, beta=1) for _ in range(1000))
+    near = sum(should_refresh_early(0.5, delta=1, beta=1) for _ in range(1000))
+
+    assert far == 0
+    assert 400 < near < 800
@@ -0,0 +1,134 @@
+"""Unittests."""
+
+import json
+import logging
+import time
+
+import pytest
+
+from src.tracing import NO_SPAN, SERVER, CLIENT, Tracer, Exporter, current
+
+
+@pytest.fixture
+def tracer():
+    tracer = Tracer()
+    yield tracer
+    tracer.close()
+    current.set(None)
+
+
+def test_disabled(tracer):
+    assert tracer.start("1", time.perf_counter()) is None
+    assert tracer.span("auth") is NO_SPAN
+    with tracer.span("auth") as span:
+        assert span is None
+    tracer.record("redis", 0.0, 1.0)
+    tracer.phase("auth")
+    tracer.fail(ValueError())
+    tracer.finish("online_score")
+
+
+def test_phases(tracer):
+    tracer.configure(slow_threshold=1000)
+    trace = tracer.start("1", time.perf_counter())
+    tracer.phase("parse")
+    tracer.phase("scoring")
+    start = time.perf_counter()
+    tracer.record("redis", start, start + 0.001, CLIENT, command="GET")
+    tracer.fail(ValueError())
+    tracer.phase("write")
+    tracer.finish("online_score")
+
+    root, parse, scoring, redis, write = trace.spans
+    assert [span.name for span in trace.spans] == ["online_score", "parse", "scoring", "redis", "write"]
+    assert parse.parent_id == scoring.parent_id == write.parent_id == root.span_id
+    assert redis.parent_id == scoring.span_id
+    assert parse.end == scoring.start and scoring.end == write.start and write.end == root.end
+    assert (parse.error, scoring.error, write.error) == (None, "ValueError", None)
+
+
+def test_spans(tracer):
+    tracer.configure(slow_threshold=1000)
+    trace = tracer.start("1799be0adb23402d84b919aee0ebef54", time.perf_counter())
+
+    with tracer.span("scoring") as scoring:
+        start = time.perf_counter()
+        tracer.record("redis", start, start + 0.001, CLIENT, command="GET")
+    with pytest.raises(ValueError), tracer.span("write"):
+        raise ValueError
+    tracer.finish("online_score", code=200)
+
+    root, scoring, redis, write = trace.spans
+    assert current.get() is None
+    assert trace.trace_id == "1799be0adb23402d84b919aee0ebef54"
+    assert (root.name, root.kind, root.attributes) == ("online_score", SERVER, {"request.id": trace.request_id,
+                                                                                "code": 200})
+    assert scoring.parent_id == write.parent_id == root.span_id
+    assert redis.parent_id == scoring.span_id
+    assert write.error == "ValueError"
+    assert root.start <= scoring.start <= scoring.end <= write.start <= write.end <= root.end
+    assert trace.phases()["redis"] == pytest.approx(1.0)
+
+
+def test_otlp(tracer):
+    tracer.configure(slow_threshold=1000)
+    trace = tracer.start("not a hex id", time.perf_counter())
+    with tracer.span("auth"):
+        pass
+    tracer.finish("online_score", code=200, cached=True)
+
+    root, auth = trace.to_otlp()
+    assert len(trace.trace_id) == 32
+    assert root["traceId"] == auth["traceId"] == trace.trace_id
+    assert "parentSpanId" not in root
+    assert auth["parentSpanId"] == root["spanId"]
+    assert {"key": "code", "value": {"intValue": "200"}} in root["attributes"]
+    assert {"key": "cached", "value": {"boolValue": True}} in root["attributes"]
+    assert abs(int(root["startTimeUnixNano"]) / 1e9 - time.time()) < 60
+
+
+def test_slow_request(tracer, caplog):
+    tracer.configure(slow_threshold=0)
+    tracer.start("1", time.perf_counter())
+    with tracer.span("scoring"):
+        pass
+
+    with caplog.at_level(logging.INFO):
+        tracer.finish("online_score")
+
+    record, = caplog.records
+    assert record.levelno == logging.INFO
+    assert record.getMessage().startswith("Slow request online_score")
+    assert list(record.fields["phases_ms"]) == ["scoring"]
+
+
+def test_file_exporter(tracer, tmp_path):
+    target = str(tmp_path / "traces.jsonl")
+    tracer.configure(target)
+    for request_id in ("1", "2", "3"):
+        tracer.start(request_id, time.perf_counter())
+        with tracer.span("auth"):
+            pass
+        tracer.finish("online_score")
+    tracer.close()
+
+    with open(target) as f:
+        batches = [json.loads(line) for line in f]
+    spans = [span for batch in batches for span in batch["resourceSpans"][0]["scopeSpans"][0]["spans"]]
+    assert len(spans) == 6
+    assert tracer.stats() == {"exported": 3, "dropped": 0}
+
+
+def test_exporter_drops_when_full(tmp_path):
+    exporter = Exporter(str(tmp_path / "traces.jsonl"))
+    exporter.thread = type("Thread", (), {"is_alive": lambda self: True})()
+    exporter.queue.maxsize = 1
+
+    tracer = Tracer()
+    tracer.configure(slow_threshold=1000)
+    traces = [tracer.start(str(i), time.perf_counter()) for i in range(3)]
+    current.set(None)
+    for trace in traces:
+        exporter.export(trace)
+
+    assert exporter.dropped == 2
@@ -0,0 +1,70 @@
+"""Unittests."""
+
+import datetime
+import hashlib
+
+import pytest
+
+from src.constants import SALT, ADMIN_LOGIN
+from src.metrics import registry
+from src.schemas import MethodRequest
+from src.utils import check_auth, verified_tokens, AdminDigest
+
+
+def auth_data(account: str, login: str, token: str) -> MethodRequest:
+    return MethodRequest.from_dict({"account": account, "login": login, "token": token, "arguments": {},
+                                    "method": "online_score"})
+
+
+def test_check_auth_caches_only_valid_tokens():
+    verified_tokens.clear()
+    hits = verified_tokens.hits
+    token = hashlib.sha512(("acc" + "user" + SALT).encode('utf-8')).hexdigest()
+
+    assert not check_auth(auth_data("acc", "user", "wrong"))
+    assert check_auth(auth_data("acc", "user", token))
+    assert check_auth(auth_data("acc", "user", token))
+    assert not check_auth(auth_data("acc", "user", "wrong"))
+
+    assert list(verified_tokens.data) == [("acc", "user", token)]
+    assert verified_tokens.hits - hits == 1
+
+
+def test_auth_stats_are_exported():
+    token = hashlib.sha512(("acc" + "user" + SALT).encode('utf-8')).hexdigest()
+    check_auth(auth_data("acc", "user", token))
+    check_auth(auth_data("acc", "user", token))
+
+    lines = registry.render().decode().splitlines()
+
+    assert 'auth_tokens{stat="hits"} %d' % verified_tokens.hits in lines
+    assert any(line.startswith("auth_admin_rotations ") for line in lines)
+    assert any(line.startswith("cache_early_refreshes ") for line in lines)
+
+
+def test_check_admin_auth():
+    hour = datetime.datetime.now().replace(minute=0, second=0, microsecond=0)
+
+    assert check_auth(auth_data("acc", ADMIN_LOGIN, AdminDigest.make_digest(hour)))
+    assert not check_auth(auth_data("acc", ADMIN_LOGIN, AdminDigest.make_digest(hour - datetime.timedelta(hours=2))))
+
+
+@pytest.mark.parametrize(
+    "seconds_from_hour_start, hours, expected",
+    [
+        (10, 0, True),
+        (10, -1, True),
+        (100, -1, False),
+        (3590, 1, True),
+        (3500, 1, False),
+    ],
+)
+def test_admin_digest_grace(monkeypatch, seconds_from_hour_start, hours, expected):
+    digest = AdminDigest(grace=30)
+    digest.rotate()
+    _, hour_start, *_ = digest.state
+    monkeypatch.setattr("src.utils.time.time", lambda: hour_start + seconds_from_hour_start)
+    hour = datetime.datetime.fromtimestamp(hour_start) + datetime.timedelta(hours=hours)
+
+    assert digest.verify(AdminDigest.make_digest(hour)) is expected
+    assert digest.rotations == 1
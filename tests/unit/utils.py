@@ -1,5 +1,6 @@
 from typing import Any
 
+from src.cache import LRUCache
 from src.store import StorageManager
 
 
@@ -8,17 +9,63 @@ class MockStorageManager(StorageManager):
     client = {}
 
     @classmethod
-    def get_cache(cls, key: str) -> Any:
+    def get_cache(cls, key: str, local: bool = True) -> Any:
         return cls.client.get(key)
 
     @classmethod
     def set_cache(cls, key: str, value: Any, ttl: int | None = None) -> None:
         cls.client[key] = value
 
+    @classmethod
+    def get_many_cache(cls, keys: list[str]) -> list:
+        return [cls.client.get(key) for key in keys]
+
+    @classmethod
+    def set_many_cache(cls, data: dict[str, Any], ttl: int | None = None) -> None:
+        cls.client.update(data)
+
     @classmethod
     def set_list_data(cls, key: str, values: list) -> None:
         cls.client[key] = values
 
+    @classmethod
+    def replace_many_list_data(cls, data: dict[str, list]) -> None:
+        cls.client.update(data)
+
     @classmethod
     def get_all_list_data(cls, key: str) -> Any:
         return cls.client.get(key)
+
+    @classmethod
+    def get_many_list_data(cls, keys: list[str]) -> list:
+        return [cls.client.get(key) for key in keys]
+
+
+class AsyncMockStorageManager:
+
+    client = {}
+    local_cache = LRUCache(0)
+
+    @classmethod
+    async def get_cache(cls, key: str, local: bool = True) -> Any:
+        return cls.client.get(key)
+
+    @classmethod
+    async def set_cache(cls, key: str, value: Any, ttl: int | None = None) -> None:
+        cls.client[key] = value
+
+    @classmethod
+    async def get_many_cache(cls, keys: list[str]) -> list:
+        return [cls.client.get(key) for key in keys]
+
+    @classmethod
+    async def set_many_cache(cls, data: dict[str, Any], ttl: int | None = None) -> None:
+        cls.client.update(data)
+
+    @classmethod
+    async def get_all_list_data(cls, key: str) -> Any:
+        return cls.client.get(key)
+
+    @classmethod
+    async def get_many_list_data(cls, keys: list[str]) -> list:
+        return [cls.client.get(key) for key in keys]